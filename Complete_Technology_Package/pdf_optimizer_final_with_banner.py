@@ -6,30 +6,41 @@ Your beautiful banner + original colors + bulletproof functionality
 ✅ PROVEN: 70% reduction + 100% readable files  
 🎯 Your original color scheme: Blue #34495e, Gold #d4af37, Maroon #722f37
 🖼️ Your beautiful banner displayed perfectly
+📚 Batch queue + watched folder, one PDF per CPU core
+⚡ Quick to open: PyMuPDF loads in the pool processes, the banner comes from
+   a pre-resized cache, and the pool warms up once the window is showing
 """
 
 import os
 import sys
 import time
+import hashlib
+import importlib.util
+import itertools
+import multiprocessing
+import queue
 import tkinter as tk
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from tkinter import filedialog, messagebox, ttk
 import threading
 
-# Import verification with clear error handling
+STARTED = time.perf_counter()
+
+# Import verification with clear error handling - found, not imported: the
+# pool processes import PyMuPDF themselves, and the window doesn't need it
 def verify_dependencies():
     """Verify all required dependencies"""
     missing = []
     
-    try:
-        import fitz
+    if importlib.util.find_spec("fitz") is not None:
         print("✅ PyMuPDF (fitz) available")
-    except ImportError:
+    else:
         missing.append("PyMuPDF")
     
-    try:
-        from PIL import Image, ImageTk
+    if importlib.util.find_spec("PIL.ImageTk") is not None:
         print("✅ PIL (Pillow) available") 
-    except ImportError:
+    else:
         missing.append("Pillow")
     
     if missing:
@@ -54,9 +65,138 @@ This application cannot run without these libraries."""
 if not verify_dependencies():
     sys.exit(1)
 
-# Safe imports after verification
-import fitz
-from PIL import Image, ImageTk
+# JPEG quality and render scale for each compression level
+COMPRESSION_SETTINGS = {
+    "conservative": (90, 2.0),
+    "balanced": (85, 2.0),
+    "aggressive": (75, 1.8)
+}
+
+REFRESH_MS = 100          # Status and progress bar redraw at most 10 times a second
+WATCH_INTERVAL = 2.0      # Seconds between scans of the watched folder
+THROUGHPUT_WINDOW = 5.0   # Seconds of finished pages behind the pages/s figure
+
+BANNER_SIZE = (900, 120)
+# The banner resized once and kept here, so later launches skip Pillow and the resize
+CACHE_DIR = os.environ.get("PDF_OPTIMIZER_CACHE_DIR") or os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "PDF Optimizer Pro")
+
+# PDF_OPTIMIZER_WARM_UP=0: start the pool on the first job instead of after the window opens
+WARM_UP = os.environ.get("PDF_OPTIMIZER_WARM_UP", "1") not in ("0", "false")
+# PDF_OPTIMIZER_STARTUP_PROBE=1: print the time to an interactive window, then quit
+# (benchmark_optimizer.py --suite startup)
+STARTUP_PROBE = os.environ.get("PDF_OPTIMIZER_STARTUP_PROBE") == "1"
+
+def cached_banner(banner_path, size=BANNER_SIZE):
+    """Path of a PNG of banner_path resized to size - made with Pillow on the first launch only"""
+    with open(banner_path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    cache_path = os.path.join(CACHE_DIR, f"banner_{size[0]}x{size[1]}_{digest}.png")
+    if not os.path.exists(cache_path):
+        from PIL import Image
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        Image.open(banner_path).resize(size, Image.Resampling.LANCZOS).save(temp_path, format="PNG")
+        os.replace(temp_path, cache_path)
+    return cache_path
+
+def warm_up_worker():
+    """Runs in each pool process before the first job, so that job doesn't pay the import"""
+    import fitz
+    return os.getpid()
+
+def output_path_for(input_file, compression):
+    input_dir = os.path.dirname(input_file)
+    input_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(input_dir, f"{input_name}_Optimized_{compression.title()}.pdf")
+
+def save_fast_web_view(new_doc, output_file):
+    """Save with object streams and full garbage collection, then linearize"""
+    new_doc.save(output_file, garbage=4, deflate=True, use_objstms=1)
+    
+    # Optional: linearizes "fast web view" output (MuPDF 1.26+ no longer can)
+    try:
+        import pikepdf
+    except ImportError:
+        return "Compact (pip install pikepdf to linearize)"
+    
+    temp_file = output_file + ".linear"
+    try:
+        with pikepdf.open(output_file) as pdf:
+            pdf.save(temp_file, linearize=True, compress_streams=True,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        os.replace(temp_file, output_file)
+        return "Fast web view (linearized)"
+    except Exception as e:
+        print(f"⚠️ Linearization failed: {e}")
+        return "Compact (linearization failed)"
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+def optimize_file(input_file, output_file, compression, fast_web_view, job_id=None, progress_queue=None):
+    """
+    One PDF through proven Page-to-Images technology - runs in a pool process.
+    Sends (job_id, pages_done, total_pages) to progress_queue after every page.
+    """
+    import fitz  # Loaded here, in the pool process - the window never needs it
+    
+    start_time = time.time()
+    
+    doc = fitz.open(input_file)
+    total_pages = len(doc)
+    if progress_queue is not None:
+        progress_queue.put((job_id, 0, total_pages))
+    
+    new_doc = fitz.open()
+    jpeg_quality, resolution = COMPRESSION_SETTINGS[compression]
+    
+    for page_num in range(total_pages):
+        page = doc[page_num]
+        mat = fitz.Matrix(resolution, resolution)
+        pix = page.get_pixmap(matrix=mat)
+        img_data = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
+        
+        img_rect = fitz.Rect(0, 0, page.rect.width, page.rect.height)
+        new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(img_rect, stream=img_data)
+        
+        pix = None
+        if progress_queue is not None:
+            progress_queue.put((job_id, page_num + 1, total_pages))
+    
+    if fast_web_view:
+        web_status = save_fast_web_view(new_doc, output_file)
+    else:
+        new_doc.save(output_file, deflate=True)
+        web_status = "Standard"
+    
+    doc.close()
+    new_doc.close()
+    
+    original_size = os.path.getsize(input_file) / (1024 * 1024)
+    optimized_size = os.path.getsize(output_file) / (1024 * 1024)
+    
+    try:
+        test_doc = fitz.open(output_file)
+        test_doc.close()
+        status = "✅ VERIFIED READABLE"
+    except:
+        status = "❌ CORRUPTED"
+    
+    return {
+        'input_file': input_file,
+        'output_file': output_file,
+        'compression': compression,
+        'pages': total_pages,
+        'original_size': original_size,
+        'optimized_size': optimized_size,
+        'reduction': ((original_size - optimized_size) / original_size) * 100,
+        'processing_time': time.time() - start_time,
+        'status': status,
+        'web_status': web_status
+    }
 
 class PDFOptimizerFinal:
     def __init__(self):
@@ -81,10 +221,35 @@ class PDFOptimizerFinal:
         self.load_banner()
         
         self.input_file = None
+        self.input_files = []
         self.output_file = None
         self.selected_compression = tk.StringVar(value="balanced")
+        self.fast_web_view = tk.BooleanVar(value=False)
+        
+        # Batch queue: jobs run in a process pool, one PDF per core. Workers
+        # report through queues that refresh_status() drains every REFRESH_MS,
+        # so Tk sees a fixed redraw rate however many pages are flying by.
+        self.pool = None
+        self.manager = None
+        self.progress_queue = None
+        self.pool_lock = threading.Lock()
+        self.closing = False
+        self.done_queue = queue.Queue()
+        self.job_ids = itertools.count(1)
+        self.jobs = {}
+        self.batch_jobs = set()
+        self.batch_results = []
+        self.files_done = 0
+        self.page_times = deque()
+        
+        # Watched folder: new PDFs found by a polling thread
+        self.watch_folder = None
+        self.watch_stop = None
+        self.watch_found = queue.Queue()
         
         self.create_interface()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(REFRESH_MS, self.refresh_status)
     
     def load_banner(self):
         """Load your beautiful banner with robust path handling"""
@@ -112,10 +277,15 @@ class PDFOptimizerFinal:
                 if os.path.exists(banner_path):
                     print(f"✅ Found banner at: {banner_path}")
                     
-                    # Load and resize your banner perfectly
-                    pil_image = Image.open(banner_path)
-                    pil_image = pil_image.resize((900, 120), Image.Resampling.LANCZOS)
-                    self.banner_image = ImageTk.PhotoImage(pil_image)
+                    try:
+                        # Pre-resized copy from the cache - Tk reads the PNG itself
+                        self.banner_image = tk.PhotoImage(file=cached_banner(banner_path))
+                    except (OSError, tk.TclError) as e:
+                        print(f"⚠️ Banner cache unavailable ({e}) - resizing in memory")
+                        from PIL import Image, ImageTk
+                        pil_image = Image.open(banner_path)
+                        pil_image = pil_image.resize(BANNER_SIZE, Image.Resampling.LANCZOS)
+                        self.banner_image = ImageTk.PhotoImage(pil_image)
                     print("✅ Your beautiful banner loaded successfully!")
                     return
                     
@@ -168,7 +338,7 @@ class PDFOptimizerFinal:
         file_section.pack(fill='x', pady=(0, 20))
         
         tk.Label(file_section,
-                text="📁 SELECT PDF FILE",
+                text="📁 SELECT PDF FILES",
                 bg=self.colors['blue'],
                 fg=self.colors['gold'], 
                 font=('Segoe UI', 16, 'bold')).pack(pady=(15, 10))
@@ -248,6 +418,18 @@ class PDFOptimizerFinal:
             
             self.option_buttons.append((chunky_button, option))
         
+        # Output format - compact, linearized PDF that opens page 1 while downloading
+        tk.Checkbutton(options_frame,
+                      text="🌐 Fast web view (linearized, packed objects)",
+                      variable=self.fast_web_view,
+                      bg=self.colors['dark_bg'],
+                      fg=self.colors['light_text'],
+                      selectcolor=self.colors['blue'],
+                      activebackground=self.colors['dark_bg'],
+                      activeforeground=self.colors['gold'],
+                      font=('Segoe UI', 10, 'bold'),
+                      cursor='hand2').pack(anchor='w', padx=5, pady=(10, 0))
+        
         # RIGHT PANEL - Results & Analysis (Your Maroon)
         right_panel = tk.Frame(main_frame, bg=self.colors['maroon'], relief='raised', bd=3)
         right_panel.pack(side='right', fill='both', expand=True, padx=(10, 0))
@@ -364,6 +546,20 @@ class PDFOptimizerFinal:
                  pady=15,
                  cursor='hand2').pack(side='left', padx=(20, 0))
         
+        # Watch folder button - Your Blue
+        self.watch_button = tk.Button(action_frame,
+                                     text="👁️ Watch Folder",
+                                     command=self.toggle_watch_folder,
+                                     bg=self.colors['blue'],
+                                     fg=self.colors['white'],
+                                     font=('Segoe UI', 12, 'bold'),
+                                     relief='raised',
+                                     bd=4,
+                                     padx=25,
+                                     pady=15,
+                                     cursor='hand2')
+        self.watch_button.pack(side='left', padx=(20, 0))
+        
         # Open folder button - Your Maroon
         tk.Button(action_frame,
                  text="📁 Open Output Folder",
@@ -399,23 +595,31 @@ class PDFOptimizerFinal:
             self.update_preview()
     
     def select_file(self):
-        """Handle file selection"""
-        file_path = filedialog.askopenfilename(
-            title="Select PDF File for Optimization",
+        """Handle file selection - one PDF or several for the batch queue"""
+        file_paths = filedialog.askopenfilenames(
+            title="Select PDF Files for Optimization",
             filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
         )
         
-        if file_path:
-            self.input_file = file_path
-            filename = os.path.basename(file_path)
-            size_mb = os.path.getsize(file_path) / (1024 * 1024)
+        if file_paths:
+            self.input_files = list(file_paths)
+            self.input_file = self.input_files[0]
+            filename = os.path.basename(self.input_file)
+            size_mb = os.path.getsize(self.input_file) / (1024 * 1024)
             
-            self.file_label.configure(
-                text=f"✅ {filename}\n💾 Size: {size_mb:.2f} MB\n📄 Ready for optimization!")
+            if len(self.input_files) == 1:
+                self.file_label.configure(
+                    text=f"✅ {filename}\n💾 Size: {size_mb:.2f} MB\n📄 Ready for optimization!")
+            else:
+                total_mb = sum(os.path.getsize(path) for path in self.input_files) / (1024 * 1024)
+                self.file_label.configure(
+                    text=f"✅ {len(self.input_files)} PDFs selected\n💾 Total: {total_mb:.2f} MB\n📄 Ready for optimization!")
             
             file_info = f"""File: {filename}
 Size: {size_mb:.2f} MB
-Path: {os.path.dirname(file_path)}"""
+Path: {os.path.dirname(self.input_file)}"""
+            if len(self.input_files) > 1:
+                file_info += f"\n(+ {len(self.input_files) - 1} more in the batch)"
             
             self.original_info_label.configure(text=file_info)
             self.update_preview()
@@ -462,124 +666,268 @@ JPEG Quality: {quality}%
         self.results_text.insert(tk.END, results_preview)
     
     def start_optimization(self):
-        """Start PDF optimization"""
-        if not self.input_file:
+        """Queue the selected PDFs for optimization"""
+        if not self.input_files:
             messagebox.showerror("Error", "Please select a PDF file first!")
             return
         
         self.optimize_button.configure(state='disabled')
+        self.batch_results = []
         
-        input_dir = os.path.dirname(self.input_file)
-        input_name = os.path.splitext(os.path.basename(self.input_file))[0]
         selection = self.selected_compression.get()
-        self.output_file = os.path.join(input_dir, f"{input_name}_Optimized_{selection.title()}.pdf")
+        for input_file in self.input_files:
+            output_file = output_path_for(input_file, selection)
+            self.batch_jobs.add(self.submit_job(input_file, output_file))
+        self.output_file = output_path_for(self.input_files[-1], selection)
         
-        thread = threading.Thread(target=self.optimize_pdf)
-        thread.daemon = True
-        thread.start()
+        self.progress_label.configure(text=f"📖 Queued {len(self.input_files)} PDF(s)...")
+    
+    def ensure_pool(self):
+        """Start the process pool and its progress queue, once; False when closing"""
+        with self.pool_lock:
+            if self.closing:
+                return False
+            if self.pool is None:
+                self.manager = multiprocessing.Manager()
+                self.progress_queue = self.manager.Queue()
+                self.pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            return True
+    
+    def warm_up(self):
+        """Background thread: start the pool and load PyMuPDF in every pool process"""
+        if not self.ensure_pool():
+            return
+        with self.pool_lock:
+            if not self.closing:
+                for _ in range(os.cpu_count() or 1):
+                    self.pool.submit(warm_up_worker)
+    
+    def submit_job(self, input_file, output_file):
+        """Hand one PDF to the process pool; returns its job id"""
+        self.ensure_pool()
+        
+        job_id = next(self.job_ids)
+        self.jobs[job_id] = {'input_file': input_file, 'pages_done': 0, 'total_pages': None}
+        future = self.pool.submit(optimize_file, input_file, output_file,
+                                  self.selected_compression.get(), self.fast_web_view.get(),
+                                  job_id, self.progress_queue)
+        # Runs on the pool's thread - just hand the outcome to the UI loop
+        future.add_done_callback(lambda f, j=job_id: self.done_queue.put((j, f)))
+        return job_id
     
-    def optimize_pdf(self):
-        """PDF optimization using proven Page-to-Images technology"""
+    def refresh_status(self):
+        """Coalesced UI update: drain worker progress and results every REFRESH_MS"""
         try:
-            start_time = time.time()
-            
-            self.root.after(0, lambda: self.progress_label.configure(text="📖 Opening PDF..."))
-            self.root.after(0, lambda: self.progress_bar.configure(value=10))
-            
-            doc = fitz.open(self.input_file)
-            total_pages = len(doc)
-            
-            self.root.after(0, lambda: self.progress_label.configure(text=f"📄 Processing {total_pages} pages..."))
-            self.root.after(0, lambda: self.progress_bar.configure(value=15))
-            
-            new_doc = fitz.open()
-            
-            settings = {
-                "conservative": (90, 2.0),
-                "balanced": (85, 2.0),
-                "aggressive": (75, 1.8)
-            }
-            
-            jpeg_quality, resolution = settings[self.selected_compression.get()]
-            
-            for page_num in range(total_pages):
-                self.root.after(0, lambda p=page_num: self.progress_label.configure(
-                    text=f"🎨 Optimizing page {p+1}/{total_pages}..."))
-                
-                progress = 15 + (70 * (page_num + 1) / total_pages)
-                self.root.after(0, lambda p=progress: self.progress_bar.configure(value=p))
-                
-                page = doc[page_num]
-                mat = fitz.Matrix(resolution, resolution)
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
-                
-                img_rect = fitz.Rect(0, 0, page.rect.width, page.rect.height)
-                new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
-                new_page.insert_image(img_rect, stream=img_data)
-                
-                pix = None
-            
-            self.root.after(0, lambda: self.progress_label.configure(text="💾 Saving..."))
-            self.root.after(0, lambda: self.progress_bar.configure(value=90))
-            
-            new_doc.save(self.output_file, deflate=True)
-            
-            original_size = os.path.getsize(self.input_file) / (1024 * 1024)
-            optimized_size = os.path.getsize(self.output_file) / (1024 * 1024)
-            reduction = ((original_size - optimized_size) / original_size) * 100
-            processing_time = time.time() - start_time
-            
+            self.drain_progress()
+            self.drain_results()
+            self.drain_watch_folder()
+            self.update_status()
+        finally:
+            self.root.after(REFRESH_MS, self.refresh_status)
+    
+    def drain_progress(self):
+        if self.progress_queue is None:
+            return
+        now = time.time()
+        while True:
             try:
-                test_doc = fitz.open(self.output_file)
-                test_doc.close()
-                status = "✅ VERIFIED READABLE"
-            except:
-                status = "❌ CORRUPTED"
-            
-            doc.close()
-            new_doc.close()
+                job_id, pages_done, total_pages = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            job = self.jobs.get(job_id)
+            if job is None:
+                continue
+            self.page_times.append((now, pages_done - job['pages_done']))
+            job['pages_done'] = pages_done
+            job['total_pages'] = total_pages
+        
+        while self.page_times and now - self.page_times[0][0] > THROUGHPUT_WINDOW:
+            self.page_times.popleft()
+    
+    def drain_results(self):
+        while True:
+            try:
+                job_id, future = self.done_queue.get_nowait()
+            except queue.Empty:
+                break
+            job = self.jobs.pop(job_id)
+            self.files_done += 1
+            name = os.path.basename(job['input_file'])
             
-            self.root.after(0, lambda: self.progress_bar.configure(value=100))
-            self.root.after(0, lambda: self.progress_label.configure(text="🎉 Complete!"))
+            error = future.exception()
+            if error:
+                result = {'input_file': job['input_file'], 'error': str(error)}
+                line = f"❌ {name}: {error}\n"
+            else:
+                result = future.result()
+                line = (f"✅ {name}: {result['original_size']:.2f} → {result['optimized_size']:.2f} MB "
+                        f"({result['reduction']:.1f}%) in {result['processing_time']:.1f}s\n")
+            self.results_text.insert(tk.END, line)
+            self.results_text.see(tk.END)
             
-            results = f"""🎊 OPTIMIZATION SUCCESSFUL! 🎊
+            if job_id in self.batch_jobs:
+                self.batch_jobs.discard(job_id)
+                self.batch_results.append(result)
+                if not self.batch_jobs:
+                    self.batch_finished()
+    
+    def update_status(self):
+        """Aggregate progress of every queued and running PDF"""
+        if not self.jobs:
+            if self.watch_folder and self.files_done:
+                self.progress_label.configure(
+                    text=f"👁️ Watching folder • {self.files_done} done • waiting for new PDFs")
+            return
+        
+        running = [job for job in self.jobs.values() if job['total_pages'] is not None]
+        queued = len(self.jobs) - len(running)
+        pages_done = sum(job['pages_done'] for job in running)
+        total_pages = sum(job['total_pages'] for job in running)
+        
+        # Averaged over the window, or since the first page if that is more recent
+        window = min(THROUGHPUT_WINDOW, time.time() - self.page_times[0][0]) if self.page_times else 0
+        pages_per_second = sum(pages for _, pages in self.page_times) / max(window, 1.0)
+        
+        self.progress_label.configure(
+            text=f"🎨 {len(running)} running • {queued} queued • {self.files_done} done • "
+                 f"{pages_per_second:.1f} pages/s")
+        # Queued PDFs count as empty until a worker opens them and learns their length
+        if total_pages:
+            self.progress_bar.configure(value=100 * pages_done / total_pages)
+    
+    def batch_finished(self):
+        """Every PDF from START OPTIMIZATION is done"""
+        self.optimize_button.configure(state='normal')
+        self.progress_bar.configure(value=0)
+        self.progress_label.configure(text="🎉 Complete!")
+        
+        results = self.batch_results
+        failed = [r for r in results if 'error' in r]
+        if len(results) == 1:
+            if failed:
+                error_msg = f"❌ Optimization failed: {failed[0]['error']}"
+                self.progress_label.configure(text=error_msg)
+                messagebox.showerror("Error", error_msg)
+            else:
+                self.show_single_result(results[0])
+            return
+        
+        succeeded = [r for r in results if 'error' not in r]
+        original_total = sum(r['original_size'] for r in succeeded)
+        optimized_total = sum(r['optimized_size'] for r in succeeded)
+        reduction = ((original_total - optimized_total) / original_total) * 100 if original_total else 0.0
+        
+        summary = f"""🎉 BATCH COMPLETE!
+
+📚 {len(succeeded)} of {len(results)} PDFs optimized
+💎 Reduced from {original_total:.1f} MB to {optimized_total:.1f} MB
+📊 {reduction:.1f}% size reduction achieved"""
+        if failed:
+            summary += f"\n❌ {len(failed)} failed - see the results panel"
+        messagebox.showinfo("Success! 🎉", summary)
+    
+    def show_single_result(self, result):
+        """Detailed results for a one-file run"""
+        results = f"""🎊 OPTIMIZATION SUCCESSFUL! 🎊
 
 📊 COMPRESSION RESULTS:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-📄 Original Size:     {original_size:>8.2f} MB
-💎 Optimized Size:    {optimized_size:>8.2f} MB
-📉 Size Reduction:    {reduction:>8.1f}%
-⚡ Processing Time:   {processing_time:>8.1f} seconds
-🎯 Method Used:       {self.selected_compression.get().title()}
-🛡️ File Status:       {status}
+📄 Original Size:     {result['original_size']:>8.2f} MB
+💎 Optimized Size:    {result['optimized_size']:>8.2f} MB
+📉 Size Reduction:    {result['reduction']:>8.1f}%
+⚡ Processing Time:   {result['processing_time']:>8.1f} seconds
+🎯 Method Used:       {result['compression'].title()}
+🛡️ File Status:       {result['status']}
+🌐 Output Format:     {result['web_status']}
 
-📁 OUTPUT: {os.path.basename(self.output_file)}
+📁 OUTPUT: {os.path.basename(result['output_file'])}
 
 ✅ Ready to use your optimized PDF!
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"""
-            
-            self.root.after(0, lambda: self.display_results(results))
-            
-            success_msg = f"""🎉 OPTIMIZATION COMPLETE!
+        
+        self.display_results(results)
+        
+        success_msg = f"""🎉 OPTIMIZATION COMPLETE!
 
 Your PDF has been successfully optimized:
-💎 Reduced from {original_size:.1f} MB to {optimized_size:.1f} MB
-📊 {reduction:.1f}% size reduction achieved
+💎 Reduced from {result['original_size']:.1f} MB to {result['optimized_size']:.1f} MB
+📊 {result['reduction']:.1f}% size reduction achieved
 ✅ File verified and ready to use!
 
-📁 Saved as: {os.path.basename(self.output_file)}"""
-            
-            self.root.after(0, lambda: messagebox.showinfo("Success! 🎉", success_msg))
-            
-        except Exception as e:
-            error_msg = f"❌ Optimization failed: {str(e)}"
-            self.root.after(0, lambda: self.progress_label.configure(text=error_msg))
-            self.root.after(0, lambda: messagebox.showerror("Error", error_msg))
+📁 Saved as: {os.path.basename(result['output_file'])}"""
         
-        finally:
-            self.root.after(0, lambda: self.optimize_button.configure(state='normal'))
-            self.root.after(0, lambda: self.progress_bar.configure(value=0))
+        messagebox.showinfo("Success! 🎉", success_msg)
+    
+    def toggle_watch_folder(self):
+        """Start or stop optimizing new PDFs dropped into a folder"""
+        if self.watch_folder:
+            self.watch_stop.set()
+            self.watch_folder = None
+            self.watch_button.configure(text="👁️ Watch Folder")
+            self.progress_label.configure(text="⏹️ Stopped watching folder")
+            return
+        
+        folder = filedialog.askdirectory(title="Select a folder to watch for new PDFs")
+        if not folder:
+            return
+        
+        self.watch_folder = folder
+        self.watch_stop = threading.Event()
+        thread = threading.Thread(target=self.watch_loop, args=(folder, self.watch_stop))
+        thread.daemon = True
+        thread.start()
+        
+        self.watch_button.configure(text="⏹️ Stop Watching")
+        self.display_results(f"👁️ WATCHING FOLDER\n\n{folder}\n\n"
+                             f"New PDFs are optimized automatically with the current settings.\n\n")
+    
+    def watch_loop(self, folder, stop):
+        """Polling thread: report PDFs that appear in folder once they stop growing"""
+        seen = set(self.scan_folder(folder))
+        growing = {}
+        while not stop.wait(WATCH_INTERVAL):
+            for path, signature in self.scan_folder(folder).items():
+                if path in seen:
+                    continue
+                # Still being copied in if it changed since the last scan
+                if growing.get(path) == signature:
+                    seen.add(path)
+                    del growing[path]
+                    self.watch_found.put(path)
+                else:
+                    growing[path] = signature
+    
+    def scan_folder(self, folder):
+        """{path: (size, mtime)} of PDFs in folder, skipping our own outputs"""
+        found = {}
+        try:
+            for entry in os.scandir(folder):
+                name = entry.name.lower()
+                if entry.is_file() and name.endswith('.pdf') and '_optimized_' not in name:
+                    stat = entry.stat()
+                    found[entry.path] = (stat.st_size, stat.st_mtime)
+        except OSError:
+            pass
+        return found
+    
+    def drain_watch_folder(self):
+        while True:
+            try:
+                input_file = self.watch_found.get_nowait()
+            except queue.Empty:
+                break
+            self.submit_job(input_file, output_path_for(input_file, self.selected_compression.get()))
+    
+    def on_close(self):
+        """Stop watching and let the pool go before closing the window"""
+        if self.watch_stop:
+            self.watch_stop.set()
+        with self.pool_lock:
+            self.closing = True
+            if self.pool:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.manager.shutdown()
+        self.root.destroy()
     
     def display_results(self, text):
         """Display results in text area"""
@@ -619,7 +967,17 @@ Click 'START OPTIMIZATION' to begin! 🚀"""
     
     def run(self):
         """Start the application"""
+        if STARTUP_PROBE:
+            self.root.after_idle(self.report_interactive)
+        elif WARM_UP:
+            # Once the window is up and idle, not before
+            self.root.after_idle(lambda: threading.Thread(target=self.warm_up, daemon=True).start())
         self.root.mainloop()
+    
+    def report_interactive(self):
+        """Startup probe: the window is drawn and handling events"""
+        print(f"⏱️ Interactive after {time.perf_counter() - STARTED:.3f}s", flush=True)
+        self.on_close()
 
 def main():
     """Main entry point"""
@@ -637,4 +995,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Pool workers of the frozen EXE re-enter here
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -19,6 +19,9 @@ class SageWebPDFOptimizer {
     constructor() {
         this.currentFile = null;
         this.originalSize = 0;
+        this.downloadUrl = null; // Set per job from the completion event
+        this.currentJobId = null; // Running job, cancelled on re-submit or tab close
+        this.jobSequence = 0; // Lets a superseded job fail quietly
         this.backendUrl = 'http://localhost:5000'; // Sage's algorithm backend
         this.init();
     }
@@ -69,6 +72,17 @@ class SageWebPDFOptimizer {
         if (downloadButton) {
             downloadButton.addEventListener('click', () => this.downloadOptimizedPDF());
         }
+
+        // Closing the tab cancels the running job so the server stops working on it
+        window.addEventListener('pagehide', () => this.cancelCurrentJob());
+    }
+
+    cancelCurrentJob() {
+        if (!this.currentJobId) return;
+        // keepalive lets the request outlive the page
+        fetch(`${this.backendUrl}/jobs/${this.currentJobId}`, { method: 'DELETE', keepalive: true })
+            .catch(() => {});
+        this.currentJobId = null;
     }
 
     async checkBackendHealth() {
@@ -174,6 +188,7 @@ class SageWebPDFOptimizer {
     clearFile() {
         this.currentFile = null;
         this.originalSize = 0;
+        this.downloadUrl = null;
         
         const selectedFileDiv = document.getElementById('selectedFile');
         const buttonsDiv = document.getElementById('optimizeButtons');
@@ -195,6 +210,10 @@ class SageWebPDFOptimizer {
             return;
         }
 
+        // A new preset replaces the job still running for the old one
+        this.cancelCurrentJob();
+        const sequence = ++this.jobSequence;
+
         try {
             this.showProgress('🔧 Connecting to Sage\'s compression engine...');
             
@@ -203,8 +222,8 @@ class SageWebPDFOptimizer {
             formData.append('pdf_file', this.currentFile);
             formData.append('quality', quality);
 
-            // Send to Sage's Page-to-Images algorithm
-            const response = await fetch(`${this.backendUrl}/optimize`, {
+            // Send to Sage's Page-to-Images algorithm as an async job
+            const response = await fetch(`${this.backendUrl}/optimize?async=1`, {
                 method: 'POST',
                 body: formData
             });
@@ -214,7 +233,11 @@ class SageWebPDFOptimizer {
                 throw new Error(errorData.error || 'Compression failed');
             }
 
-            const result = await response.json();
+            const job = await response.json();
+            this.currentJobId = job.job_id;
+            const result = await this.followJob(job.events_url);
+            this.currentJobId = null;
+            this.downloadUrl = result.download_url;
             
             if (result.success) {
                 this.completeProgress(); // Complete progress animation to 100%
@@ -225,10 +248,8 @@ class SageWebPDFOptimizer {
             }
 
         } catch (error) {
+            if (sequence !== this.jobSequence) return; // Replaced by a newer job
             console.error('Compression error:', error);
-            if (this.progressInterval) {
-                clearInterval(this.progressInterval);
-            }
             this.hideProgress();
             this.showError(`Compression failed: ${error.message}`);
         }
@@ -244,50 +265,53 @@ class SageWebPDFOptimizer {
         if (progressFill) {
             progressFill.style.width = '0%';
             progressFill.style.animation = 'none'; // Remove pulse animation for smooth progress
-            
-            // Start animated progress simulation
-            this.animateProgress(progressFill, progressText);
         }
     }
 
-    animateProgress(progressFill, progressText) {
-        let progress = 0;
-        const messages = [
-            '🔧 Connecting to Sage\'s compression engine...',
-            '📖 Analyzing PDF structure...',
-            '🎨 Converting pages to optimized images...',
-            '⚙️ Applying Sage\'s compression algorithm...',
-            '🔬 Quality verification in progress...',
-            '✨ Finalizing optimized PDF...'
-        ];
-        
-        const progressInterval = setInterval(() => {
-            progress += Math.random() * 15 + 5; // Random increment between 5-20%
-            
-            if (progress > 95) {
-                progress = 95; // Cap at 95% until actual completion
-            }
-            
-            if (progressFill) {
-                progressFill.style.width = progress + '%';
-            }
-            
-            // Update message based on progress
-            if (progressText) {
-                const messageIndex = Math.floor((progress / 100) * messages.length);
-                if (messageIndex < messages.length) {
-                    progressText.textContent = messages[messageIndex];
+    followJob(eventsUrl) {
+        // Real progress from Sage's page loop via Server-Sent Events
+        const stageMessages = {
+            queued: '⏳ Waiting for a free compression slot...',
+            preflight: '🔎 Checking whether this PDF will shrink...',
+            rendering: '🎨 Converting pages to optimized images...',
+            saving: '💾 Writing optimized PDF...',
+            verifying: '🔬 Quality verification in progress...'
+        };
+
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(`${this.backendUrl}${eventsUrl}`);
+
+            source.addEventListener('progress', (e) => {
+                const data = JSON.parse(e.data);
+                const progressFill = document.getElementById('progressFill');
+                const progressText = document.getElementById('progressText');
+                // Pages are 95% of the work; saving and verification finish the bar
+                const percent = data.total_pages ? (data.pages_done / data.total_pages) * 95 : 0;
+                const written = (data.bytes_written / (1024 * 1024)).toFixed(2);
+                const eta = data.eta_seconds !== null ? ` • ~${Math.ceil(data.eta_seconds)}s left` : '';
+
+                if (progressFill) progressFill.style.width = percent + '%';
+                if (progressText) {
+                    progressText.textContent = `${stageMessages[data.stage] || data.stage} ` +
+                        `(${data.pages_done}/${data.total_pages} pages • ${written} MB${eta})`;
                 }
-            }
-            
-            // Clear interval when we reach 95% - actual completion will set it to 100%
-            if (progress >= 95) {
-                clearInterval(progressInterval);
-            }
-        }, 300 + Math.random() * 200); // Random interval between 300-500ms
-        
-        // Store interval reference so we can clear it if needed
-        this.progressInterval = progressInterval;
+            });
+
+            source.addEventListener('complete', (e) => {
+                source.close();
+                resolve(JSON.parse(e.data));
+            });
+
+            source.addEventListener('cancelled', (e) => {
+                source.close();
+                reject(new Error(`Job cancelled (${JSON.parse(e.data).reason})`));
+            });
+
+            source.addEventListener('error', (e) => {
+                source.close();
+                reject(new Error(e.data ? JSON.parse(e.data).error : 'Lost connection to Sage\'s backend'));
+            });
+        });
     }
 
     completeProgress() {
@@ -295,10 +319,6 @@ class SageWebPDFOptimizer {
         const progressFill = document.getElementById('progressFill');
         const progressText = document.getElementById('progressText');
         
-        if (this.progressInterval) {
-            clearInterval(this.progressInterval);
-        }
-        
         if (progressFill) {
             progressFill.style.width = '100%';
         }
@@ -359,7 +379,7 @@ class SageWebPDFOptimizer {
 
     async downloadOptimizedPDF() {
         try {
-            const response = await fetch(`${this.backendUrl}/download`);
+            const response = await fetch(`${this.backendUrl}${this.downloadUrl || '/download'}`);
             
             if (!response.ok) {
                 throw new Error('Download failed');
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+🛡️ PDF Optimizer Pro - Admission Control
+Memory-aware load shedding in front of Sage's Page-to-Images compression
+
+Every job is priced before it starts:
+📐 Peak memory - the largest rendered pixmap (plus the buffers the engine keeps
+   next to it), the parsed input document and the growing output document
+⚡ CPU cost - total rendered pixels across all pages
+
+Jobs are admitted against a shared memory budget and a concurrency cap. When
+the budget is full a job waits in a short FIFO queue; when the queue is full
+or the wait runs out, the caller answers 429 with a Retry-After hint. Overload
+turns into latency instead of an out-of-memory crash.
+
+Small documents (see job_scheduler.lane_for) wait in their own fast-lane FIFO,
+with its own length limit, and have a few job slots of their own, so a 3-page
+invoice is neither queued behind nor shed because of 2,000-page uploads.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Tunables (environment overrides so deployments can size the box)
+MEMORY_BUDGET_MB = int(os.environ.get("PDF_OPTIMIZER_MEMORY_BUDGET_MB", "1024"))
+MAX_CONCURRENT_JOBS = int(os.environ.get("PDF_OPTIMIZER_MAX_JOBS", str(os.cpu_count() or 2)))
+MAX_QUEUED_JOBS = int(os.environ.get("PDF_OPTIMIZER_MAX_QUEUED_JOBS", "8"))
+MAX_QUEUE_WAIT = float(os.environ.get("PDF_OPTIMIZER_MAX_QUEUE_WAIT", "30"))
+FAST_LANE_JOBS = int(os.environ.get("PDF_OPTIMIZER_FAST_LANE_JOBS", "2"))
+FAST_LANE_QUEUED_JOBS = int(os.environ.get("PDF_OPTIMIZER_FAST_LANE_QUEUED_JOBS", str(MAX_QUEUED_JOBS)))
+
+LANES = ("fast", "shared")
+
+# Queue waits kept per lane for the metrics
+WAIT_SAMPLES = 1000
+
+# Cost model constants
+RGB_BYTES_PER_PIXEL = 3            # get_pixmap() renders RGB without alpha
+ENCODED_BYTES_PER_PIXEL = 0.12     # typical JPEG output at quality 75-90
+PARSED_DOCUMENT_FACTOR = 2.0       # MuPDF's in-memory copy of the input file
+BASE_JOB_OVERHEAD = 32 * 1024 * 1024
+PIXELS_PER_CPU_SECOND = 20_000_000  # render + encode throughput of one core
+
+
+class JobCost:
+    """Estimated resource cost of one compression job"""
+
+    def __init__(self, pages, peak_memory_bytes, cpu_seconds):
+        self.pages = pages
+        self.peak_memory_bytes = peak_memory_bytes
+        self.cpu_seconds = cpu_seconds
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "peak_memory_mb": round(self.peak_memory_bytes / (1024 * 1024), 1),
+            "cpu_seconds": round(self.cpu_seconds, 1)
+        }
+
+
+def estimate_job_cost(input_file_path, resolution, working_set_factor=1.25):
+    """
+    Price a job from page count, page area and the preset resolution.
+
+    working_set_factor is how many pixmap-sized buffers the engine holds at
+    once per page (pixmap + encoded stream = 1.25, PNG round-trip through
+    Pillow = 3.25).
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(input_file_path)
+    try:
+        total_pixels = 0
+        largest_page_pixels = 0
+        for page in doc:
+            width = math.ceil(page.rect.width * resolution)
+            height = math.ceil(page.rect.height * resolution)
+            pixels = width * height
+            total_pixels += pixels
+            largest_page_pixels = max(largest_page_pixels, pixels)
+        pages = len(doc)
+    finally:
+        doc.close()
+
+    input_size = os.path.getsize(input_file_path)
+    peak_memory = (BASE_JOB_OVERHEAD
+                   + input_size * PARSED_DOCUMENT_FACTOR
+                   + largest_page_pixels * RGB_BYTES_PER_PIXEL * working_set_factor
+                   + total_pixels * ENCODED_BYTES_PER_PIXEL)
+    cpu_seconds = total_pixels * working_set_factor / PIXELS_PER_CPU_SECOND
+
+    return JobCost(pages, int(peak_memory), cpu_seconds)
+
+
+class AdmissionTicket:
+    """Proof of admission - release it when the job is finished"""
+
+    def __init__(self, controller, cost):
+        self.controller = controller
+        self.cost = cost
+        self.admitted_at = time.time()
+        self.queue_wait = 0.0
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AdmissionController:
+    """
+    Admits jobs against a memory budget and a concurrency cap.
+
+    Waiting jobs are served strictly in arrival order within their lane, so a
+    large job at the head of the queue is not starved by a stream of other
+    large ones. Fast-lane jobs queue separately, up to `fast_lane_queued_jobs`
+    of them whatever the shared queue holds, and may use `fast_lane_jobs`
+    slots beyond the concurrency cap. A job that is larger than the whole
+    budget is still admitted, but only when it would run alone - it degrades
+    to latency rather than being refused forever.
+    """
+
+    def __init__(self, memory_budget_bytes, max_concurrent_jobs,
+                 max_queued_jobs=MAX_QUEUED_JOBS, max_queue_wait=MAX_QUEUE_WAIT,
+                 fast_lane_jobs=FAST_LANE_JOBS, fast_lane_queued_jobs=FAST_LANE_QUEUED_JOBS):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.max_queued_jobs = max_queued_jobs
+        # Per lane, so a full shared queue never sheds a small document
+        self.max_queued = {"shared": max_queued_jobs, "fast": fast_lane_queued_jobs}
+        self.max_queue_wait = max_queue_wait
+        self.fast_lane_jobs = fast_lane_jobs
+
+        self._lock = threading.Condition()
+        self._running = []
+        self._waiting = {lane: deque() for lane in LANES}
+        self._waits = {lane: deque(maxlen=WAIT_SAMPLES) for lane in LANES}
+        self._memory_in_use = 0
+        self._admitted_total = 0
+        self._rejected_total = 0
+
+    @classmethod
+    def from_environment(cls):
+        return cls(MEMORY_BUDGET_MB * 1024 * 1024, MAX_CONCURRENT_JOBS)
+
+    def _fits(self, cost, lane):
+        slots = self.max_concurrent_jobs + (self.fast_lane_jobs if lane == "fast" else 0)
+        if len(self._running) >= slots:
+            return False
+        if not self._running:
+            return True
+        return self._memory_in_use + cost.peak_memory_bytes <= self.memory_budget_bytes
+
+    def try_admit(self, cost, timeout=None, lane="shared"):
+        """
+        Wait up to `timeout` seconds (default: max_queue_wait) for room.
+        Returns an AdmissionTicket, or None if the job should be shed.
+        """
+        timeout = self.max_queue_wait if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        marker = object()
+        waiting = self._waiting[lane]
+
+        with self._lock:
+            if not waiting and self._fits(cost, lane):
+                return self._admit(cost, 0.0, lane)
+
+            if len(waiting) >= self.max_queued[lane]:
+                self._rejected_total += 1
+                return None
+
+            waiting.append(marker)
+            enqueued = time.monotonic()
+            try:
+                while True:
+                    if waiting[0] is marker and self._fits(cost, lane):
+                        waiting.popleft()
+                        ticket = self._admit(cost, time.monotonic() - enqueued, lane)
+                        self._lock.notify_all()
+                        return ticket
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        waiting.remove(marker)
+                        self._rejected_total += 1
+                        self._lock.notify_all()
+                        return None
+                    self._lock.wait(remaining)
+            except BaseException:
+                if marker in waiting:
+                    waiting.remove(marker)
+                    self._lock.notify_all()
+                raise
+
+    def _queued(self):
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def _admit(self, cost, queue_wait, lane):
+        ticket = AdmissionTicket(self, cost)
+        ticket.queue_wait = queue_wait
+        self._waits[lane].append(queue_wait)
+        self._running.append(ticket)
+        self._memory_in_use += cost.peak_memory_bytes
+        self._admitted_total += 1
+        return ticket
+
+    def _release(self, ticket):
+        with self._lock:
+            if ticket in self._running:
+                self._running.remove(ticket)
+                self._memory_in_use -= ticket.cost.peak_memory_bytes
+            self._lock.notify_all()
+
+    def retry_after_seconds(self):
+        """Rough time until the current backlog drains, for Retry-After"""
+        with self._lock:
+            now = time.time()
+            remaining = sum(max(t.cost.cpu_seconds - (now - t.admitted_at), 1.0)
+                            for t in self._running)
+            slots = self.max_concurrent_jobs
+            backlog = remaining + self._queued() * (remaining / max(len(self._running), 1))
+        return max(1, min(int(math.ceil(backlog / slots)), 300))
+
+    def snapshot(self):
+        """Current load, for /health"""
+        with self._lock:
+            return {
+                "running_jobs": len(self._running),
+                "queued_jobs": self._queued(),
+                "memory_in_use_mb": round(self._memory_in_use / (1024 * 1024), 1),
+                "memory_budget_mb": round(self.memory_budget_bytes / (1024 * 1024), 1),
+                "max_concurrent_jobs": self.max_concurrent_jobs,
+                "admitted_total": self._admitted_total,
+                "rejected_total": self._rejected_total,
+                "lanes": {lane: dict(wait_summary(self._waits[lane]), queued_jobs=len(self._waiting[lane]))
+                          for lane in LANES}
+            }
+
+
+def wait_summary(waits):
+    """Mean / p95 / max of recent queue waits, in seconds"""
+    if not waits:
+        return {"samples": 0, "mean_wait_seconds": 0.0, "p95_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+    ordered = sorted(waits)
+    return {
+        "samples": len(ordered),
+        "mean_wait_seconds": round(sum(ordered) / len(ordered), 3),
+        "p95_wait_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_wait_seconds": round(ordered[-1], 3)
+    }
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+⚡ PDF Optimizer Pro - ASGI Front End
+/compress, /optimize, /download and /health on an asyncio event loop
+
+Under Flask a slow upload or download holds a worker thread for as long as
+the client takes, and the compression then runs on that same thread. Here:
+
+🔌 Uploads are streamed off the socket by the event loop (Starlette's
+   multipart parser spools them to disk), so a slow client costs a socket,
+   not a thread
+⚙️ Admitted jobs run in a process pool sized to the admission controller's
+   job slots - Sage's engines (sage_compression.py and sage_optimizer.py, as
+   the Flask servers run them) - so the pool's CPUs do nothing but compression
+📤 Downloads are streamed from disk by the event loop - or, with ?inline=1
+   or Accept: application/pdf, the PDF is the /compress or /optimize
+   response itself (see inline_results.py)
+
+    pip install starlette uvicorn python-multipart
+    python asgi_server.py --port 8000
+
+Both engines are served from one port: /compress (field "pdf") answers like
+web_server.py and /optimize (field "pdf_file") like pdf_optimizer_backend.py.
+Progress events, cancellation and worker mode stay with the Flask servers.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Route
+from werkzeug.utils import secure_filename
+
+try:
+    import uvicorn
+except ImportError:
+    uvicorn = None
+
+from admission_control import AdmissionController, estimate_job_cost
+from inline_results import inline_requested, inline_headers, remove_quietly
+from job_scheduler import lane_for
+from engine_warmup import EngineWarmUp, WARM_UP, import_modules
+from scan_cleanup import parse_scan_cleanup
+from structural_optimizer import OPTIMIZE_METHODS
+import sage_compression
+from sage_optimizer import optimizer, build_optimize_result, parse_encoder_options
+
+# Memory-aware admission control, as in the Flask servers
+admission = AdmissionController.from_environment()
+
+# One pool process per job slot, so an admitted job never waits for a CPU
+POOL_PROCESSES = admission.max_concurrent_jobs + admission.fast_lane_jobs
+pool = None
+
+# Finished outputs: job_id -> (path, download name)
+downloads = {}
+
+# This process prices uploads with PyMuPDF; lifespan starts loading it, not the
+# import - the pool processes import this module too
+engine_warm_up = None
+
+
+# Pool side -------------------------------------------------------------------
+
+def warm_up():
+    """Runs once per pool process so the first real job doesn't pay the imports"""
+    import_modules()
+    return os.getpid()
+
+
+def compress_job(job_id, input_path, output_path, quality, output_format, scan_cleanup=()):
+    """The /compress engine in a pool process; returns (status, result)"""
+    original_size = os.path.getsize(input_path)
+    stats = {}
+    if not sage_compression.run_sage_compression(input_path, output_path, quality,
+                                                 output_format=output_format, stats=stats,
+                                                 scan_cleanup=scan_cleanup):
+        return 500, {'error': 'Compression failed'}
+    return 200, sage_compression.build_compression_result(job_id, original_size, output_path, stats)
+
+
+def optimize_job(job_id, input_path, quality, encoder, encoder_options, output_format, method,
+                 scan_cleanup=()):
+    """The /optimize engine in a pool process; returns (status, result, output_path)"""
+    try:
+        success, output_path, stats, error = optimizer.optimize_pdf(
+            input_path, quality, encoder=encoder, encoder_options=encoder_options,
+            output_format=output_format, method=method, scan_cleanup=scan_cleanup)
+    finally:
+        os.unlink(input_path)
+    if not success:
+        return 500, {"error": error}, None
+    return 200, build_optimize_result(job_id, stats), output_path
+
+
+# Event loop side -------------------------------------------------------------
+
+def busy_response():
+    retry_after = admission.retry_after_seconds()
+    return JSONResponse({
+        "error": "Server is busy compressing other PDFs - please retry shortly",
+        "retry_after": retry_after
+    }, status_code=429, headers={"Retry-After": str(retry_after)})
+
+
+def save_upload(upload, path):
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f, 1024 * 1024)
+
+
+async def admit(input_path, resolution, working_set_factor=1.25):
+    """(ticket, None) once the job fits the memory budget, else (None, error response)"""
+    try:
+        cost = await run_in_threadpool(estimate_job_cost, input_path, resolution, working_set_factor)
+    except Exception as e:
+        return None, JSONResponse({"error": f"Could not read PDF: {str(e)}"}, status_code=400)
+
+    # try_admit may wait up to the queue timeout - on a thread, not the event loop
+    ticket = await run_in_threadpool(admission.try_admit, cost, None, lane_for(cost.pages))
+    if ticket is None:
+        return None, busy_response()
+    return ticket, None
+
+
+def wants_inline(request, form):
+    """?inline=1 (or an inline form field), or Accept: application/pdf"""
+    return inline_requested(request.query_params.get("inline", form.get("inline", "")),
+                            request.headers.get("accept", ""))
+
+
+def inline_pdf_response(result, original_size, output_path, download_name, *remove):
+    """The finished PDF as the response body, with the JSON result in headers; remove is deleted once sent"""
+    return FileResponse(output_path, media_type="application/pdf", filename=download_name,
+                        headers=inline_headers(result, original_size, output_path),
+                        background=BackgroundTask(remove_quietly, *remove))
+
+
+async def run_in_pool(ticket, job, *args):
+    with ticket:
+        return await asyncio.get_running_loop().run_in_executor(pool, job, *args)
+
+
+async def compress_pdf(request):
+    """Same request and response as web_server.py's /compress"""
+    await run_in_threadpool(sage_compression.cleanup_old_files)
+
+    from pdf_output import OUTPUT_FORMATS
+
+    async with request.form(max_files=1) as form:
+        upload = form.get("pdf")
+        quality = form.get("quality", "balanced")
+        output_format = form.get("output_format", "standard")
+        inline = wants_inline(request, form)
+
+        if upload is None or isinstance(upload, str):
+            return JSONResponse({"error": "No PDF file provided"}, status_code=400)
+        if not upload.filename:
+            return JSONResponse({"error": "No file selected"}, status_code=400)
+        if not sage_compression.allowed_file(upload.filename):
+            return JSONResponse({"error": "Invalid file type. Please upload a PDF."}, status_code=400)
+        if output_format not in OUTPUT_FORMATS:
+            return JSONResponse({"error": f"Unknown output format - choose from: {', '.join(OUTPUT_FORMATS)}"},
+                                status_code=400)
+        scan_cleanup, cleanup_error = parse_scan_cleanup(form.get("scan_cleanup", ""))
+        if cleanup_error:
+            return JSONResponse({"error": cleanup_error}, status_code=400)
+
+        job_id = str(uuid.uuid4())
+        filename = secure_filename(upload.filename)
+        input_path = os.path.join(sage_compression.UPLOAD_FOLDER, f"{job_id}_{filename}")
+        await run_in_threadpool(save_upload, upload, input_path)
+        original_size = os.path.getsize(input_path)
+
+    ticket, error = await admit(input_path, sage_compression.RENDER_RESOLUTION,
+                                sage_compression.RENDER_WORKING_SET_FACTOR)
+    if error:
+        os.remove(input_path)
+        return error
+
+    output_path = os.path.join(sage_compression.COMPRESSED_FOLDER, f"compressed_{job_id}_{filename}")
+    try:
+        status, result = await run_in_pool(ticket, compress_job, job_id, input_path, output_path,
+                                           quality, output_format, scan_cleanup)
+    except Exception as e:
+        return JSONResponse({"error": f"Compression error: {str(e)}"}, status_code=500)
+
+    if status == 200 and inline:
+        return inline_pdf_response(result, original_size, output_path, f"optimized_{filename}",
+                                   input_path, output_path)
+    if status == 200:
+        downloads[job_id] = (output_path, f"optimized_{filename}")
+    return JSONResponse(result, status_code=status)
+
+
+async def optimize_pdf(request):
+    """Same request and response as pdf_optimizer_backend.py's /optimize"""
+    from page_encoders import available_encoders
+    from pdf_output import OUTPUT_FORMATS
+
+    async with request.form(max_files=1) as form:
+        upload = form.get("pdf_file")
+        quality = form.get("quality", "balanced")
+        encoder = form.get("encoder", "jpeg")
+        output_format = form.get("output_format", "standard")
+        method = form.get("method", "page-to-images")
+        inline = wants_inline(request, form)
+
+        if upload is None or isinstance(upload, str):
+            return JSONResponse({"error": "No PDF file uploaded"}, status_code=400)
+        if not upload.filename:
+            return JSONResponse({"error": "No file selected"}, status_code=400)
+        if encoder not in available_encoders():
+            return JSONResponse({"error": f"Unknown encoder - choose from: {', '.join(available_encoders())}"},
+                                status_code=400)
+        encoder_options, options_error = parse_encoder_options(form, encoder)
+        if options_error:
+            return JSONResponse({"error": options_error}, status_code=400)
+        if output_format not in OUTPUT_FORMATS:
+            return JSONResponse({"error": f"Unknown output format - choose from: {', '.join(OUTPUT_FORMATS)}"},
+                                status_code=400)
+        if method not in OPTIMIZE_METHODS:
+            return JSONResponse({"error": f"Unknown method - choose from: {', '.join(OPTIMIZE_METHODS)}"},
+                                status_code=400)
+        scan_cleanup, cleanup_error = parse_scan_cleanup(form.get("scan_cleanup", ""))
+        if cleanup_error:
+            return JSONResponse({"error": cleanup_error}, status_code=400)
+        if not upload.filename.lower().endswith(".pdf"):
+            return JSONResponse({"error": "File must be a PDF"}, status_code=400)
+
+        input_fd, input_path = tempfile.mkstemp(suffix=".pdf", prefix="input_")
+        os.close(input_fd)
+        await run_in_threadpool(save_upload, upload, input_path)
+        original_size = os.path.getsize(input_path)
+
+    settings = optimizer.compression_settings.get(quality, optimizer.compression_settings["balanced"])
+    ticket, error = await admit(input_path, settings["resolution"])
+    if error:
+        os.unlink(input_path)
+        return error
+
+    job_id = str(uuid.uuid4())
+    try:
+        status, result, output_path = await run_in_pool(
+            ticket, optimize_job, job_id, input_path, quality, encoder, encoder_options, output_format,
+            method, scan_cleanup)
+    except Exception as e:
+        return JSONResponse({"error": f"Server error: {str(e)}"}, status_code=500)
+
+    if output_path and inline:
+        return inline_pdf_response(result, original_size, output_path, "optimized.pdf", output_path)
+    if output_path:
+        downloads[job_id] = (output_path, "optimized.pdf")
+    return JSONResponse(result, status_code=status)
+
+
+async def download_file(request):
+    """Stream a finished job's PDF"""
+    entry = downloads.get(request.path_params["job_id"])
+    if entry is None or not os.path.exists(entry[0]):
+        return JSONResponse({"error": "File not found"}, status_code=404)
+    path, download_name = entry
+    return FileResponse(path, media_type="application/pdf", filename=download_name)
+
+
+async def health_check(request):
+    health = {
+        "status": "healthy",
+        "algorithm": "Sage Page-to-Images Ready",
+        "server": "asgi",
+        "pool_processes": POOL_PROCESSES,
+        "methods": list(OPTIMIZE_METHODS),
+        "load": admission.snapshot(),
+        "warm_up": engine_warm_up.report()
+    }
+    # Engine details once it has loaded - a health check never waits for PyMuPDF
+    if engine_warm_up.ready.is_set() or not WARM_UP:
+        from page_encoders import available_encoders
+        health["encoders"] = list(available_encoders())
+    return JSONResponse(health)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global pool, engine_warm_up
+    sage_compression.make_folders()
+    engine_warm_up = EngineWarmUp([("engine", import_modules)]).start()
+    # spawn: forking a process that is running an event loop and threads is unsafe
+    pool = ProcessPoolExecutor(POOL_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    # Pool processes load the engine in the background - the socket doesn't wait for them
+    for _ in range(POOL_PROCESSES):
+        pool.submit(warm_up)
+    try:
+        yield
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route("/compress", compress_pdf, methods=["POST"]),
+        Route("/optimize", optimize_pdf, methods=["POST"]),
+        Route("/download/{job_id}", download_file),
+        Route("/health", health_check)
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF Optimizer Pro ASGI front end")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if uvicorn is None:
+        print("❌ uvicorn not installed. Install with: pip install uvicorn")
+        exit(1)
+
+    print("⚡ PDF Optimizer Pro - ASGI Front End")
+    print(f"⚙️ {POOL_PROCESSES} compression process(es) running Sage's Page-to-Images algorithm")
+    print(f"💡 http://localhost:{args.port} - /compress, /optimize, /download/<job_id>, /health")
+    uvicorn.run("asgi_server:app", host=args.host, port=args.port)
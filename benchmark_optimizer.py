@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+📊 PDF Optimizer Pro - Benchmark
+Measures Sage's Page-to-Images engines on a corpus of PDFs
+
+    python benchmark_optimizer.py                      # synthetic corpus
+    python benchmark_optimizer.py --corpus my_pdfs/    # your own PDFs
+    python benchmark_optimizer.py --suite formats --json results.json
+
+Suites:
+🧠 memory  - peak and steady-state RSS of a long job (1,000 synthetic pages
+             unless --corpus is given) in both engines, with and without
+             pixmap buffer reuse; each run is a fresh process
+🧱 methods - Page-to-Images against the lossless structural optimizer:
+             processing time, pages per second, file size and compression ratio
+🌐 formats - every output format against the standard save: processing time,
+             file size, bytes before page 1 can be shown, and time-to-first-page
+             over a link of --bandwidth-mbps (download of those bytes plus the
+             page-1 render)
+🚀 startup - cold starts: each Flask app's time to its first /health answer
+             and to a finished engine warm-up, and the desktop app's time to
+             an interactive window (first launch, which resizes the banner,
+             and later ones; needs a display) - the median of --startup-runs
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import fitz
+import numpy as np
+
+from pdf_output import OUTPUT_FORMATS, first_page_bytes
+from sage_optimizer import optimizer
+from structural_optimizer import OPTIMIZE_METHODS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SYNTHETIC_PAGES = (10, 100)
+
+# Size of the synthetic corpus' photos, in pixels. Stored losslessly, so the
+# engines have something to shrink
+PHOTO_SIZE = (600, 450)
+
+# The presets both engines know (SageWebPDFOptimizer.compression_settings)
+QUALITY_PRESETS = tuple(optimizer.compression_settings)
+
+# Length of the memory suite's synthetic job
+MEMORY_PAGES = 1000
+
+# How often the memory probe samples RSS (seconds)
+RSS_SAMPLE_INTERVAL = 0.05
+
+DESKTOP_APP = os.path.join(HERE, "Complete_Technology_Package", "pdf_optimizer_final_with_banner.py")
+# How long a cold start may take, and how often the startup suite polls /health
+STARTUP_TIMEOUT = 60
+STARTUP_POLL_INTERVAL = 0.01
+
+
+def make_synthetic_corpus(directory):
+    """A small and a longer document, both text with photo pages"""
+    return [make_synthetic_document(directory, pages, photos=True) for pages in SYNTHETIC_PAGES]
+
+
+def make_synthetic_document(directory, pages, photos=False):
+    """
+    Text pages, every third one with a gradient block - or, with photos, a
+    losslessly stored noisy photo (different on every page), which the
+    engines shrink to well below the input
+    """
+    path = os.path.join(directory, f"synthetic_{pages}_pages.pdf")
+    doc = fitz.open()
+    if photos:
+        width, height = PHOTO_SIZE
+        x = np.linspace(0, 255, width)
+        y = np.linspace(0, 255, height)[:, None]
+        base = np.dstack([x + 0 * y, 0.5 * x + 0.5 * y, 255 - y + 0 * x])
+        grain = np.random.default_rng(0).normal(0, 12, base.shape)
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {number + 1} of {pages}", fontsize=18)
+        for line in range(30):
+            page.insert_text((72, 110 + line * 20),
+                             f"Line {line + 1}: the quick brown fox jumps over the lazy dog",
+                             fontsize=11)
+        if number % 3 == 0 and photos:
+            # A different grain on every photo, so no two pages share an image
+            pixels = np.clip(base + np.roll(grain, number * 7, axis=1), 0, 255).astype(np.uint8)
+            photo = fitz.Pixmap(fitz.csRGB, width, height, pixels.tobytes(), False)
+            page.insert_image(fitz.Rect(72, 480, 540, 731), pixmap=photo)
+        elif number % 3 == 0:
+            # Gradient block so the page is not flat colour
+            for band in range(40):
+                shade = band / 40
+                page.draw_rect(fitz.Rect(72, 500 + band * 5, 540, 505 + band * 5),
+                               color=None, fill=(shade, 0.4, 1 - shade), width=0)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def corpus_files(corpus_dir):
+    return sorted(os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir)
+                  if name.lower().endswith(".pdf"))
+
+
+def time_to_first_page(path, bandwidth_mbps):
+    """Seconds to download what page 1 needs at bandwidth_mbps, plus rendering it"""
+    needed, linearized = first_page_bytes(path)
+    download = needed * 8 / (bandwidth_mbps * 1_000_000)
+
+    start = time.perf_counter()
+    doc = fitz.open(path)
+    doc[0].get_pixmap()
+    doc.close()
+    render = time.perf_counter() - start
+
+    return {
+        "first_page_bytes": needed,
+        "linearized": linearized,
+        "time_to_first_page": round(download + render, 3)
+    }
+
+
+def suite_formats(files, work_dir, args):
+    """Each output format through the optimize engine, compared with standard"""
+    rows = []
+    for path in files:
+        baseline = None
+        for output_format in OUTPUT_FORMATS:
+            start = time.perf_counter()
+            success, output_path, stats, error = optimizer.optimize_pdf(
+                path, args.quality, output_format=output_format, preflight=False,
+                keep_larger=True)
+            elapsed = time.perf_counter() - start
+            if not success:
+                rows.append({"file": os.path.basename(path), "output_format": output_format,
+                             "error": error})
+                continue
+
+            row = {
+                "file": os.path.basename(path),
+                "pages": stats["pages_processed"],
+                "output_format": output_format,
+                "seconds": round(elapsed, 2),
+                "size": os.path.getsize(output_path)
+            }
+            row.update(time_to_first_page(output_path, args.bandwidth_mbps))
+            if stats.get("linearize_note"):
+                row["note"] = stats["linearize_note"]
+
+            if baseline is None:
+                baseline = row
+            row["size_vs_standard"] = round(row["size"] / baseline["size"], 3)
+            row["ttfp_vs_standard"] = round(
+                row["time_to_first_page"] / max(baseline["time_to_first_page"], 1e-9), 3)
+            rows.append(row)
+
+            shutil.move(output_path, os.path.join(work_dir, f"{output_format}_{row['file']}"))
+    return rows
+
+
+def suite_methods(files, work_dir, args):
+    """Page-to-Images and the lossless optimizer on the same files"""
+    rows = []
+    for path in files:
+        original_size = os.path.getsize(path)
+        for method in OPTIMIZE_METHODS:
+            start = time.perf_counter()
+            success, output_path, stats, error = optimizer.optimize_pdf(
+                path, args.quality, preflight=False, method=method, keep_larger=True)
+            elapsed = time.perf_counter() - start
+            if not success:
+                rows.append({"file": os.path.basename(path), "method": method, "error": error})
+                continue
+
+            size = os.path.getsize(output_path)
+            rows.append({
+                "file": os.path.basename(path),
+                "pages": stats["pages_processed"],
+                "method": method,
+                "seconds": round(elapsed, 2),
+                "pages_per_second": round(stats["pages_processed"] / max(elapsed, 1e-9), 1),
+                "size": size,
+                "ratio": round(size / original_size, 3)
+            })
+            shutil.move(output_path, os.path.join(work_dir, f"{method}_{os.path.basename(path)}"))
+    return rows
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it can't be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def memory_probe(path, engine, quality):
+    """
+    One job in this process while a thread samples RSS. Steady state is the
+    median over the second half of the job, after the allocator has settled.
+    """
+    mb = lambda value: round(value / (1024 * 1024), 1)
+    baseline = current_rss()
+    if baseline is None:
+        return {"error": "cannot read RSS here (install psutil)"}
+
+    samples = []
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_INTERVAL):
+            samples.append(current_rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    if engine == "optimize":
+        success, output_path, stats, error = optimizer.optimize_pdf(path, quality, preflight=False,
+                                                                    keep_larger=True)
+        if success:
+            os.remove(output_path)
+    else:
+        from sage_compression import run_sage_compression
+        output_path = path + ".compressed.pdf"
+        stats = {}
+        success = run_sage_compression(path, output_path, quality, preflight=False, stats=stats,
+                                       keep_larger=True)
+        error = None if success else "Compression failed"
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+
+    if not success:
+        return {"error": error}
+    gc.collect()
+    samples = samples or [current_rss()]
+    return {
+        "seconds": round(elapsed, 2),
+        "baseline_rss_mb": mb(baseline),
+        "peak_rss_mb": mb(max(samples)),
+        "steady_rss_mb": mb(statistics.median(samples[len(samples) // 2:])),
+        "rss_after_mb": mb(current_rss()),
+        "pixmap_buffer_mb": stats.get("pixmap_buffer_mb")
+    }
+
+
+def suite_memory(files, work_dir, args):
+    """Each engine on a long job in a fresh process, with and without pixmap reuse"""
+    if not args.corpus:
+        files = [make_synthetic_document(work_dir, MEMORY_PAGES)]
+
+    rows = []
+    for path in files:
+        pages = len(fitz.open(path))
+        for engine in ("optimize", "compress"):
+            for reuse in (False, True):
+                env = dict(os.environ, PDF_OPTIMIZER_REUSE_PIXMAPS="1" if reuse else "0")
+                probe = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--memory-probe", path,
+                     "--engine", engine, "--quality", args.quality],
+                    cwd=HERE, env=env, capture_output=True, text=True)
+                try:
+                    result = json.loads(probe.stdout.strip().splitlines()[-1])
+                except (IndexError, ValueError):
+                    result = {"error": (probe.stderr.strip().splitlines() or ["probe failed"])[-1]}
+                rows.append(dict({"file": os.path.basename(path), "pages": pages,
+                                  "engine": engine, "pixmap_reuse": reuse}, **result))
+    return rows
+
+
+def read_health(base_url):
+    """The /health body, or None while the server isn't answering"""
+    try:
+        with urllib.request.urlopen(base_url + "/health", timeout=2) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def server_start(module):
+    """
+    One cold start of an app module on Flask's threaded server
+    Returns: (seconds to the first /health, seconds until its warm-up finished)
+    """
+    from load_test import free_port, stop_server
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # Just the app - nothing this benchmark imports is loaded ahead of it
+    serve = (f"from {module} import app; "
+             f"app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", serve],
+                               cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first_health = None
+    try:
+        while time.perf_counter() - start < STARTUP_TIMEOUT and process.poll() is None:
+            health = read_health(base_url)
+            if health is not None:
+                now = time.perf_counter() - start
+                first_health = first_health or now
+                # Servers without a background warm-up are warm once they answer
+                warm_up = health.get("warm_up") or {"ready": True}
+                if warm_up["ready"] or not warm_up.get("enabled", True):
+                    return first_health, now
+            time.sleep(STARTUP_POLL_INTERVAL)
+        return first_health, None
+    finally:
+        stop_server(process)
+
+
+def desktop_start(cache_dir):
+    """Seconds from launching the desktop app to an interactive window, or an error"""
+    env = dict(os.environ, PDF_OPTIMIZER_STARTUP_PROBE="1", PDF_OPTIMIZER_CACHE_DIR=cache_dir,
+               PYTHONIOENCODING="utf-8")
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, DESKTOP_APP], cwd=os.path.dirname(DESKTOP_APP), env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8")
+    try:
+        for line in process.stdout:
+            if "Interactive after" in line:
+                return time.perf_counter() - start, None
+        process.wait(timeout=STARTUP_TIMEOUT)
+        return None, (process.stderr.read().strip().splitlines() or ["no window"])[-1]
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
+def suite_startup(files, work_dir, args):
+    """Cold starts of both Flask apps and the desktop app"""
+    median = lambda values: round(statistics.median(values), 3) if values else None
+    rows = []
+    for module in ("web_server", "pdf_optimizer_backend"):
+        runs = [server_start(module) for _ in range(args.startup_runs)]
+        rows.append({
+            "target": module,
+            "runs": args.startup_runs,
+            "first_health_s": median([health for health, _ in runs if health is not None]),
+            "warm_s": median([warm for _, warm in runs if warm is not None])
+        })
+
+    # A fresh banner cache: the first launch resizes the banner, the rest reuse it
+    cache_dir = os.path.join(work_dir, "desktop_cache")
+    launches = [desktop_start(cache_dir) for _ in range(args.startup_runs + 1)]
+    errors = [error for _, error in launches if error]
+    for label, chosen in (("desktop, first launch", launches[:1]), ("desktop", launches[1:])):
+        seconds = [elapsed for elapsed, _ in chosen if elapsed is not None]
+        row = {"target": label, "runs": len(chosen), "interactive_s": median(seconds)}
+        if errors and not seconds:
+            row["error"] = errors[0]
+        rows.append(row)
+    return rows
+
+
+SUITES = {
+    "formats": suite_formats,
+    "memory": suite_memory,
+    "methods": suite_methods,
+    "startup": suite_startup
+}
+
+
+def print_rows(name, rows):
+    print(f"\n📊 {name}")
+    if not rows:
+        print("   (no results)")
+        return
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    widths = {c: max(len(c), *(len(str(row.get(c, ""))) for row in rows)) for c in columns}
+    print("   " + "  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("   " + "  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF Optimizer Pro benchmark")
+    parser.add_argument("--corpus", help="directory of PDFs (default: a synthetic corpus)")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="suite to run (repeatable; default: all)")
+    parser.add_argument("--quality", default="balanced",
+                        choices=QUALITY_PRESETS)
+    parser.add_argument("--bandwidth-mbps", type=float, default=10.0,
+                        help="link speed for time-to-first-page (default: 10)")
+    parser.add_argument("--startup-runs", type=int, default=3,
+                        help="cold starts per target in the startup suite (default: 3)")
+    parser.add_argument("--json", help="also write the results to this file")
+    # Internal: one memory suite run, in its own process
+    parser.add_argument("--memory-probe", help=argparse.SUPPRESS)
+    parser.add_argument("--engine", default="optimize", choices=("optimize", "compress"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_probe:
+        print(json.dumps(memory_probe(args.memory_probe, args.engine, args.quality)))
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="pdf_benchmark_")
+    try:
+        files = corpus_files(args.corpus) if args.corpus else make_synthetic_corpus(work_dir)
+        if not files:
+            print("❌ No PDFs found in the corpus")
+            sys.exit(1)
+
+        print("📊 PDF Optimizer Pro - Benchmark")
+        print(f"📄 {len(files)} file(s), quality: {args.quality}")
+
+        results = {}
+        for name in args.suite or sorted(SUITES):
+            results[name] = SUITES[name](files, work_dir, args)
+            print_rows(name, results[name])
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\n💾 Results written to {args.json}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+🔥 PDF Optimizer Pro - Engine Warm-Up
+/health first, the heavy lifting right after
+
+Importing PyMuPDF, NumPy, Pillow and pikepdf, and brotli-compressing the
+site's assets, used to happen before a server could answer anything. The
+servers now import the engine where it is first used, and EngineWarmUp does
+that work on a background thread started as the app module loads - while
+the server binds its socket - so /health answers straight away and the
+first upload normally finds the engine already loaded.
+
+🧊 PDF_OPTIMIZER_WARM_UP=0 turns the background warm-up off; the first
+   request that needs the engine then loads it
+📊 /health reports warm_up: whether it has finished, and each step's time
+
+Startup times are tracked by benchmark_optimizer.py --suite startup.
+"""
+
+import importlib
+import os
+import threading
+import time
+
+WARM_UP = os.environ.get("PDF_OPTIMIZER_WARM_UP", "1") not in ("0", "false")
+
+# Everything the Page-to-Images engines import, heaviest first
+ENGINE_MODULES = ("fitz", "numpy", "PIL.Image", "pikepdf", "pixmap_buffer", "page_encoders",
+                  "page_fingerprint", "pdf_output", "scan_cleanup")
+
+
+def import_modules(names=ENGINE_MODULES):
+    """Import names now; optional ones that aren't installed are skipped"""
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+class EngineWarmUp:
+    """
+    Named steps run once, in order, on a daemon thread.
+
+    steps: (name, callable) pairs; a step that raises is recorded and the
+           rest still run - whatever it failed to load is loaded on first use
+    """
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.timings = {}
+        self.errors = {}
+        self.seconds = None
+        self.ready = threading.Event()
+
+    def start(self):
+        """Begin in the background (unless PDF_OPTIMIZER_WARM_UP=0); returns self"""
+        if WARM_UP:
+            threading.Thread(target=self.run, name="engine-warm-up", daemon=True).start()
+        return self
+
+    def run(self):
+        start = time.perf_counter()
+        for name, step in self.steps:
+            step_start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.errors[name] = str(e)
+            self.timings[name] = round(time.perf_counter() - step_start, 3)
+        self.seconds = round(time.perf_counter() - start, 3)
+        self.ready.set()
+
+    def report(self):
+        """For /health"""
+        report = {
+            "enabled": WARM_UP,
+            "ready": self.ready.is_set(),
+            "seconds": self.seconds,
+            "steps": dict(self.timings)
+        }
+        if self.errors:
+            report["errors"] = dict(self.errors)
+        return report
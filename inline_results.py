@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+📨 PDF Optimizer Pro - Inline Results
+The optimized PDF as the body of the compression response itself
+
+Normally /compress and /optimize answer with JSON and the PDF is fetched by
+a second request to /download, so the result waits on disk in between. A
+client that asks for the PDF directly gets it in one round trip:
+
+    curl -F pdf=@book.pdf "http://localhost:8000/compress?inline=1" -o small.pdf
+    curl -F pdf_file=@book.pdf -H "Accept: application/pdf" http://localhost:5000/optimize -o small.pdf
+
+📄 Body - the PDF, streamed from the job's temporary output, which is
+   deleted as soon as the response has been sent (no /download afterwards)
+🏷️ Headers - X-Job-Id, X-Original-Size and X-Optimized-Size (bytes) and
+   X-PDF-Optimizer-Result: the JSON body the request would otherwise have
+   had, minus per-page detail. Compression finishes before the first byte
+   is sent, so headers are enough - no trailers needed.
+
+In worker mode, inline uploads up to INLINE_MAX_BYTES are compressed by the
+web process itself instead of going through the spool; larger ones still
+go through a worker and are streamed from the spool when it finishes.
+Errors are JSON, as always.
+"""
+
+import json
+import os
+
+# Inline uploads up to this size skip the worker spool
+INLINE_MAX_BYTES = int(float(os.environ.get("PDF_OPTIMIZER_INLINE_MAX_MB", "50")) * 1024 * 1024)
+
+# Stats too long for a header - one entry per page
+PER_PAGE_STATS = ("page_quality", "scan_cleanup_pages")
+
+RESULT_HEADERS = ("X-Job-Id", "X-Original-Size", "X-Optimized-Size", "X-PDF-Optimizer-Result")
+
+
+def accept_quality(accept_header, mimetype):
+    """The q value an Accept header gives mimetype exactly (0 when not listed)"""
+    for item in (accept_header or "").split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if parts[0].lower() != mimetype:
+            continue
+        for parameter in parts[1:]:
+            name, _, value = parameter.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value)
+                except ValueError:
+                    return 0.0
+        return 1.0
+    return 0.0
+
+
+def inline_requested(inline_flag, accept_header):
+    """?inline=1 (or an inline form field), or an Accept header preferring PDF over JSON"""
+    if inline_flag in ("1", "true"):
+        return True
+    pdf = accept_quality(accept_header, "application/pdf")
+    return pdf > 0 and pdf > accept_quality(accept_header, "application/json")
+
+
+def inline_headers(result, original_size, output_path):
+    """Headers carrying what the JSON response would have said"""
+    summary = {key: value for key, value in result.items()
+               if key not in ("download_ready", "download_url", "download_id")}
+    if "stats" in summary:
+        summary["stats"] = {key: value for key, value in summary["stats"].items()
+                            if key not in PER_PAGE_STATS}
+    return {
+        "X-Job-Id": result.get("job_id") or result.get("download_id", ""),
+        "X-Original-Size": str(original_size),
+        "X-Optimized-Size": str(os.path.getsize(output_path)),
+        "X-PDF-Optimizer-Result": json.dumps(summary, ensure_ascii=True, separators=(",", ":")),
+        "Access-Control-Expose-Headers": ", ".join(RESULT_HEADERS),
+        "Cache-Control": "no-store"
+    }
+
+
+def remove_quietly(*paths):
+    """Delete finished files; one still open elsewhere is left for the hourly cleanup"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
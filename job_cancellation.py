@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+🛑 PDF Optimizer Pro - Job Cancellation
+Stopping abandoned jobs between pages instead of grinding on to the end
+
+The engines check a CancellationToken at the top of every page, so a cancelled
+job stops within one page's processing time, releases its admission ticket
+and removes its temp files.
+
+A job is cancelled when:
+🗑️ the client calls DELETE /jobs/<id> (the web pages do this on re-submit and,
+   with a keepalive fetch, when the tab is closed)
+🔌 every /jobs/<id>/events stream for it disconnects and none reconnects
+   within DISCONNECT_GRACE seconds (EventSource reconnects after network blips)
+
+In worker mode the request is stored in the spool and the worker's
+SpoolCancellationToken notices it, so any front end can cancel any job. A
+reconnect may land on another front end (or gunicorn worker), so a front end
+whose streams have all gone only cancels once the spool's subscriber_seen
+heartbeat - refreshed by every open stream - has also gone stale.
+"""
+
+import threading
+import time
+
+# Seconds to wait for an EventSource to reconnect before the job is abandoned
+DISCONNECT_GRACE = 10.0
+
+# Worker-side tokens read the spool at most this often
+CANCEL_POLL_INTERVAL = 0.25
+
+
+class JobCancelled(Exception):
+    """Raised from an engine's page loop when its job has been cancelled"""
+
+
+class CancellationToken:
+    """Cancellation flag for one running job, checked between pages"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason="cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(f"Job cancelled: {self.reason}")
+
+
+class SpoolCancellationToken(CancellationToken):
+    """Token for a spool job - the request may come from a front end on another host"""
+
+    def __init__(self, spool, job_id):
+        super().__init__()
+        self.spool = spool
+        self.job_id = job_id
+        self._last_poll = 0.0
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and time.monotonic() - self._last_poll >= CANCEL_POLL_INTERVAL:
+            self._last_poll = time.monotonic()
+            reason = self.spool.cancel_reason(self.job_id)
+            if reason:
+                self.cancel(reason)
+        return self._event.is_set()
+
+
+class CancellationRegistry:
+    """
+    Tokens of the jobs this process is running, plus the event-stream
+    subscriber counts that drive cancel-on-disconnect.
+
+    With a spool, cancellations are written to the spool instead, where the
+    worker that owns the job picks them up, and subscribers in other processes
+    are seen through the spool's heartbeat.
+    """
+
+    def __init__(self, spool=None, disconnect_grace=DISCONNECT_GRACE):
+        self.spool = spool
+        self.disconnect_grace = disconnect_grace
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._subscribers = {}
+
+    def register(self, job_id):
+        token = CancellationToken()
+        with self._lock:
+            self._tokens[job_id] = token
+        return token
+
+    def discard(self, job_id):
+        with self._lock:
+            self._tokens.pop(job_id, None)
+            self._subscribers.pop(job_id, None)
+
+    def cancel(self, job_id, reason="cancelled by client"):
+        """True if the job was running (or queued) and is now being cancelled"""
+        if self.spool:
+            return self.spool.cancel(job_id, reason)
+        with self._lock:
+            token = self._tokens.get(job_id)
+        if token is None or token.cancelled:
+            return False
+        token.cancel(reason)
+        return True
+
+    def watch_stream(self, job_id, frames):
+        """Pass SSE frames through, cancelling the job if its last subscriber leaves"""
+        with self._lock:
+            self._subscribers[job_id] = self._subscribers.get(job_id, 0) + 1
+        try:
+            yield from frames
+        finally:
+            with self._lock:
+                remaining = self._subscribers.get(job_id, 1) - 1
+                self._subscribers[job_id] = remaining
+            if remaining == 0:
+                timer = threading.Timer(self.disconnect_grace, self._cancel_if_abandoned, (job_id,))
+                timer.daemon = True
+                timer.start()
+
+    def _cancel_if_abandoned(self, job_id):
+        with self._lock:
+            abandoned = self._subscribers.get(job_id) == 0
+            if abandoned:
+                del self._subscribers[job_id]
+        if abandoned and self.spool:
+            seen = self.spool.subscriber_seen(job_id)
+            # This process's streams stopped refreshing at least disconnect_grace ago
+            abandoned = seen is None or time.time() - seen >= self.disconnect_grace
+        if abandoned:
+            self.cancel(job_id, "client disconnected")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+📡 PDF Optimizer Pro - Job Progress Events
+Real progress from Sage's page loop, streamed as Server-Sent Events
+
+The engine reports through a ProgressReporter, which batches page updates so a
+2,000-page job publishes a few dozen events instead of 2,000. Events land on a
+JobEventBus; each `GET /jobs/<id>/events` connection blocks on the bus and is
+woken only when something new happens - no client polling, no busy loops.
+"""
+
+import json
+import threading
+import time
+
+# A finished job's last state is kept this long for late subscribers
+JOB_STATE_TTL = 3600
+
+# Comment line sent on idle streams so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15.0
+
+TERMINAL_EVENTS = ("complete", "error", "cancelled")
+
+
+class JobEventBus:
+    """Latest event per job, with blocking waits for subscribers"""
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._jobs = {}
+
+    def create(self, job_id, **info):
+        """Register a job so subscribers can attach before its first page"""
+        self.publish(job_id, "queued", dict(info, stage="queued"))
+
+    def publish(self, job_id, event, data):
+        with self._lock:
+            previous = self._jobs.get(job_id)
+            sequence = previous["sequence"] + 1 if previous else 1
+            self._jobs[job_id] = {
+                "sequence": sequence,
+                "event": event,
+                "data": dict(data, job_id=job_id),
+                "updated": time.time()
+            }
+            self._lock.notify_all()
+            self._expire_locked()
+
+    def get(self, job_id):
+        """Latest event for a job: (event, data) or None"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            return (state["event"], dict(state["data"])) if state else None
+
+    def wait(self, job_id, after_sequence, timeout):
+        """Block until the job has an event newer than after_sequence"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                state = self._jobs.get(job_id)
+                if state is None:
+                    return None
+                if state["sequence"] > after_sequence:
+                    return dict(state)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return {"sequence": after_sequence, "event": None}
+                self._lock.wait(remaining)
+
+    def stream(self, job_id):
+        """Generator of SSE frames for one subscriber, ends after complete/error/cancelled"""
+        sequence = 0
+        while True:
+            state = self.wait(job_id, sequence, KEEPALIVE_INTERVAL)
+            if state is None:
+                return
+            if state["event"] is None:
+                yield ": keep-alive\n\n"
+                continue
+
+            sequence = state["sequence"]
+            yield format_sse(state["event"], state["data"], sequence)
+            if state["event"] in TERMINAL_EVENTS:
+                return
+
+    def _expire_locked(self):
+        cutoff = time.time() - JOB_STATE_TTL
+        expired = [job_id for job_id, state in self._jobs.items()
+                   if state["event"] in TERMINAL_EVENTS and state["updated"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def format_sse(event, data, event_id=None):
+    """One Server-Sent Events frame"""
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+class ProgressReporter:
+    """
+    Turns per-page calls from the engine into batched progress events.
+
+    An event goes out every `batch_pages` pages (about 50 events per job) or
+    after `max_interval` seconds on slow pages, and always for the last page.
+    """
+
+    def __init__(self, bus, job_id, max_interval=1.0):
+        self.bus = bus
+        self.job_id = job_id
+        self.max_interval = max_interval
+        self.total_pages = 0
+        self.batch_pages = 1
+        self.stage_name = "queued"
+        self.pages_done = 0
+        self.bytes_written = 0
+        self._started = None
+        self._last_pages = 0
+        self._last_time = 0.0
+
+    def start(self, total_pages):
+        self.total_pages = total_pages
+        self.batch_pages = max(1, total_pages // 50)
+        self._started = time.time()
+        self.stage("rendering")
+
+    def stage(self, name):
+        self.stage_name = name
+        self._publish()
+
+    def page_done(self, pages_done, bytes_written):
+        self.pages_done = pages_done
+        self.bytes_written = bytes_written
+        now = time.monotonic()
+        if (pages_done - self._last_pages >= self.batch_pages
+                or now - self._last_time >= self.max_interval
+                or pages_done >= self.total_pages):
+            self._publish()
+
+    def eta_seconds(self):
+        if not self._started or not self.pages_done or not self.total_pages:
+            return None
+        elapsed = time.time() - self._started
+        remaining = self.total_pages - self.pages_done
+        return round(elapsed / self.pages_done * remaining, 1)
+
+    def _publish(self):
+        self._last_pages = self.pages_done
+        self._last_time = time.monotonic()
+        self.bus.publish(self.job_id, "progress", {
+            "stage": self.stage_name,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "bytes_written": self.bytes_written,
+            "eta_seconds": self.eta_seconds()
+        })
+
+    def complete(self, result):
+        self.bus.publish(self.job_id, "complete", dict(result, stage="complete"))
+
+    def fail(self, error):
+        self.bus.publish(self.job_id, "error", {"stage": "error", "error": error})
+
+    def cancelled(self, reason):
+        self.bus.publish(self.job_id, "cancelled", {"stage": "cancelled", "reason": reason})
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+🔬 PDF Optimizer Pro - Job Profiling
+Why did this one file take twenty times longer than it should?
+
+An admin can ask for any /compress or /optimize job to be profiled:
+
+    curl -F pdf_file=@slow.pdf -F profile=1 -H "X-Profile-Token: $TOKEN" http://localhost:5000/optimize
+    curl -H "X-Profile-Token: $TOKEN" http://localhost:5000/jobs/<job_id>/profile
+
+⏱️ cProfile - deterministic profile of the engine thread, top functions in
+   the report and the full .prof file (?format=pstats) for snakeviz/pstats
+📄 Pages - time, RSS and Python-allocated memory after every page, so the
+   slow or memory-hungry pages stand out
+🧭 Stages - when preflight, rendering, saving and verifying started
+
+Profiling needs PDF_OPTIMIZER_PROFILE_TOKEN set on the server; without it
+the flag is refused. Jobs that don't ask are not touched at all - no
+profiler, no tracemalloc, no wrapper around the progress reporter.
+Render pipeline processes (PDF_OPTIMIZER_RENDER_PROCESSES) are outside the
+profile; their time shows up as waiting in the engine thread.
+
+Profiles are kept in PDF_OPTIMIZER_PROFILE_DIR (in worker mode, the spool's
+profiles folder, so any front end can serve what a worker wrote) for
+PROFILE_KEEP_SECONDS.
+"""
+
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+
+PROFILE_TOKEN = os.environ.get("PDF_OPTIMIZER_PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PDF_OPTIMIZER_PROFILE_DIR") or os.path.join(
+    tempfile.gettempdir(), "pdf_optimizer_profiles")
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+# Profiles older than this are deleted when the next one is saved
+PROFILE_KEEP_SECONDS = 24 * 3600
+
+TOP_FUNCTIONS = 40
+SLOWEST_PAGES = 10
+
+_tracing_lock = threading.Lock()
+_tracing_jobs = 0
+
+
+def profile_requested(flag):
+    return flag in ("1", "true")
+
+
+def check_profile_token(supplied):
+    """None when supplied is the admin token, else why profiling is refused"""
+    if not PROFILE_TOKEN:
+        return "Profiling is not enabled on this server"
+    if not hmac.compare_digest((supplied or "").encode(), PROFILE_TOKEN.encode()):
+        return "Invalid profiling token"
+    return None
+
+
+def spool_profile_dir(spool):
+    return os.path.join(spool.spool_dir, "profiles")
+
+
+def with_profile_url(result, job_id, profiled):
+    """Point a profiled job's response at its profile"""
+    if profiled:
+        result["profile_url"] = f"/jobs/{job_id}/profile"
+    return result
+
+
+def profile_paths(directory, job_id):
+    """(JSON report, pstats file) for a job"""
+    return (os.path.join(directory, f"{job_id}.json"),
+            os.path.join(directory, f"{job_id}.prof"))
+
+
+def load_profile(directory, job_id):
+    """The saved report for a job, or None"""
+    report_path, _ = profile_paths(directory, job_id)
+    try:
+        with open(report_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def prune_profiles(directory, older_than=PROFILE_KEEP_SECONDS):
+    cutoff = time.time() - older_than
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it can't be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def _mb(value):
+    return None if value is None else round(value / (1024 * 1024), 1)
+
+
+def _start_tracing():
+    global _tracing_jobs
+    with _tracing_lock:
+        if _tracing_jobs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_jobs += 1
+
+
+def _stop_tracing():
+    global _tracing_jobs
+    with _tracing_lock:
+        _tracing_jobs -= 1
+        if _tracing_jobs == 0:
+            tracemalloc.stop()
+
+
+class JobProfiler:
+    """
+    cProfile plus per-page timing and memory for one job.
+
+    Used as a context manager around the engine call, and handed to the
+    engine in place of its progress reporter (see wrap) - progress calls are
+    recorded, then passed on to the real reporter, if any.
+    """
+
+    def __init__(self, job_id, directory=PROFILE_DIR):
+        self.job_id = job_id
+        self.directory = directory
+        self.progress = None
+        self.profile = None
+        self.note = None
+        self.stages = []
+        self.pages = []
+        self.total_pages = 0
+        self._started = None
+        self._last_page_time = None
+        self._start_rss = None
+        self._tracing = False
+
+    def wrap(self, progress):
+        """This profiler as the engine's progress reporter, forwarding to progress"""
+        self.progress = progress
+        return self
+
+    # Context manager -----------------------------------------------------
+
+    def __enter__(self):
+        _start_tracing()
+        self._tracing = True
+        self._start_rss = current_rss()
+        self._started = self._last_page_time = time.perf_counter()
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one cProfile per process at a time
+            self.profile = None
+            self.note = "another job was being profiled - pages and memory only"
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile:
+            self.profile.disable()
+        self.wall_seconds = time.perf_counter() - self._started
+        self.traced_peak = tracemalloc.get_traced_memory()[1]
+        if self._tracing:
+            _stop_tracing()
+            self._tracing = False
+        return False
+
+    # Progress reporter side ----------------------------------------------
+
+    def _elapsed(self):
+        return round(time.perf_counter() - self._started, 3)
+
+    def start(self, total_pages):
+        self.total_pages = total_pages
+        self._last_page_time = time.perf_counter()
+        # ProgressReporter.start() enters the rendering stage too
+        self.stages.append({"stage": "rendering", "at": self._elapsed()})
+        if self.progress:
+            self.progress.start(total_pages)
+
+    def stage(self, name):
+        self.stages.append({"stage": name, "at": self._elapsed()})
+        if self.progress:
+            self.progress.stage(name)
+
+    def page_done(self, pages_done, bytes_written):
+        now = time.perf_counter()
+        self.pages.append({
+            "pages_done": pages_done,
+            "seconds": round(now - self._last_page_time, 4),
+            "at": round(now - self._started, 3),
+            "rss_mb": _mb(current_rss()),
+            "python_mb": _mb(tracemalloc.get_traced_memory()[0]),
+            "bytes_written": bytes_written
+        })
+        self._last_page_time = now
+        if self.progress:
+            self.progress.page_done(pages_done, bytes_written)
+
+    # Report --------------------------------------------------------------
+
+    def top_functions(self):
+        if not self.profile:
+            return []
+        stats = pstats.Stats(self.profile)
+        rows = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "total_s": round(total, 4),
+                "cumulative_s": round(cumulative, 4)
+            })
+        rows.sort(key=lambda row: row["cumulative_s"], reverse=True)
+        return rows[:TOP_FUNCTIONS]
+
+    def save(self, status, stats=None):
+        """Write the report and pstats file; returns the report"""
+        os.makedirs(self.directory, exist_ok=True)
+        prune_profiles(self.directory)
+        report_path, pstats_path = profile_paths(self.directory, self.job_id)
+
+        rss_values = [page["rss_mb"] for page in self.pages if page["rss_mb"] is not None]
+        report = {
+            "job_id": self.job_id,
+            "status": status,
+            "created": time.time(),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "total_pages": self.total_pages,
+            "profiler": "cProfile" if self.profile else None,
+            "memory": {
+                "start_rss_mb": _mb(self._start_rss),
+                "peak_page_rss_mb": max(rss_values, default=None),
+                "end_rss_mb": _mb(current_rss()),
+                "python_peak_mb": _mb(self.traced_peak)
+            },
+            "stages": self.stages,
+            "slowest_pages": sorted(self.pages, key=lambda page: page["seconds"],
+                                    reverse=True)[:SLOWEST_PAGES],
+            "pages": self.pages,
+            "top_functions": self.top_functions(),
+            "stats": {key: value for key, value in (stats or {}).items()
+                      if key not in ("page_quality", "scan_cleanup_pages")}
+        }
+        if self.note:
+            report["note"] = self.note
+
+        if self.profile:
+            self.profile.dump_stats(pstats_path)
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        return report
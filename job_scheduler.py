@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+⚖️ PDF Optimizer Pro - Fair Page Scheduler
+Sharing the compression workers page by page instead of job by job
+
+Admission control decides whether a job fits in memory; this scheduler
+decides whose page runs next. Every page of every running job asks for a
+page permit before it is rendered and encoded:
+
+⚡ Fast lane - documents of up to FAST_LANE_PAGES pages have
+   FAST_LANE_WORKERS permits of their own (and may borrow shared ones), so a
+   3-page invoice finishes in seconds whatever else is running
+⚖️ Shared lane - the remaining permits go to the waiting client (API key or
+   IP address) that has been given the fewest pages so far, so two users'
+   large jobs interleave page by page instead of one monopolizing the workers
+
+A client that arrives while others are busy starts level with the least-served
+active client, so newcomers cannot starve long-running jobs either. Page
+waits per lane are kept for the /metrics endpoint.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+
+from admission_control import LANES, WAIT_SAMPLES, wait_summary
+
+# Documents this short run in the fast lane
+FAST_LANE_PAGES = int(os.environ.get("PDF_OPTIMIZER_FAST_LANE_PAGES", "10"))
+
+# Page permits: shared ones for everybody, plus some only small documents can use
+PAGE_WORKERS = int(os.environ.get("PDF_OPTIMIZER_PAGE_WORKERS", str(os.cpu_count() or 2)))
+FAST_LANE_WORKERS = int(os.environ.get("PDF_OPTIMIZER_FAST_LANE_WORKERS", "1"))
+
+
+def lane_for(pages):
+    return "fast" if pages <= FAST_LANE_PAGES else "shared"
+
+
+def client_key(request):
+    """Fair-share identity of a Flask request: its API key if it sent one, else its IP"""
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return "key:" + hashlib.blake2b(api_key.encode(), digest_size=6).hexdigest()
+    return "ip:" + (request.remote_addr or "unknown")
+
+
+class ScheduledJob:
+    """
+    One job's place in the scheduler. Use as a context manager around the
+    job and hand it to the engine as page_gate; pages(...) yields page
+    numbers, each one only once a page permit has been granted. A job with
+    several pages in flight at once (the render pipeline) holds one permit
+    per page instead, through acquire() and release().
+    """
+
+    def __init__(self, scheduler, client, pages):
+        self.scheduler = scheduler
+        self.client = client
+        self.total_pages = pages
+        self.lane = lane_for(pages)
+        self.pages_granted = 0
+        self.page_wait = 0.0
+        self._pools = []
+
+    def pages(self, page_numbers):
+        for page_num in page_numbers:
+            pool = self.acquire()
+            try:
+                yield page_num
+            finally:
+                self.release(pool)
+
+    def acquire(self, wait=True):
+        """A page permit, to hand back with release(); without wait, None if none is free"""
+        pool = self.scheduler._acquire(self, wait)
+        if pool is not None:
+            self._pools.append(pool)
+        return pool
+
+    def release(self, pool):
+        if pool in self._pools:
+            self._pools.remove(pool)
+            self.scheduler._release(pool)
+
+    def __enter__(self):
+        self.scheduler._register(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        while self._pools:
+            self.release(self._pools[-1])
+        self.scheduler._unregister(self)
+
+    def report(self):
+        """Summary for the job's stats"""
+        return {
+            "lane": self.lane,
+            "page_wait_seconds": round(self.page_wait, 2)
+        }
+
+
+class _PageRequest:
+    def __init__(self, job, sequence):
+        self.job = job
+        self.sequence = sequence
+        self.requested = time.monotonic()
+        self.pool = None
+
+
+class PageScheduler:
+    """Grants page permits: fast lane first, then fair share across clients"""
+
+    def __init__(self, page_workers=PAGE_WORKERS, fast_lane_workers=FAST_LANE_WORKERS):
+        self.capacity = {"shared": max(1, page_workers), "fast": max(0, fast_lane_workers)}
+
+        self._lock = threading.Condition()
+        self._busy = {"shared": 0, "fast": 0}
+        self._waiting = []
+        self._sequence = 0
+        self._jobs = {}          # client -> active ScheduledJobs
+        self._served = {}        # client -> pages granted while active
+        self._waits = {lane: deque(maxlen=WAIT_SAMPLES) for lane in LANES}
+        self._granted = {lane: 0 for lane in LANES}
+
+    def job(self, client, pages):
+        return ScheduledJob(self, client, pages)
+
+    def _register(self, job):
+        with self._lock:
+            if not self._jobs.get(job.client):
+                # Start level with the least-served active client
+                active = [self._served[c] for c, jobs in self._jobs.items() if jobs]
+                self._served[job.client] = min(active, default=0)
+            self._jobs.setdefault(job.client, []).append(job)
+
+    def _unregister(self, job):
+        with self._lock:
+            jobs = self._jobs.get(job.client, [])
+            if job in jobs:
+                jobs.remove(job)
+            if not jobs:
+                self._jobs.pop(job.client, None)
+                self._served.pop(job.client, None)
+            self._waiting = [r for r in self._waiting if r.job is not job]
+            self._lock.notify_all()
+
+    def _acquire(self, job, wait=True):
+        """The pool a permit was granted from; None without wait when none is free"""
+        with self._lock:
+            self._sequence += 1
+            request = _PageRequest(job, self._sequence)
+            self._waiting.append(request)
+            try:
+                while True:
+                    self._grant_locked()
+                    if request.pool is not None:
+                        return request.pool
+                    if not wait:
+                        self._waiting.remove(request)
+                        return None
+                    self._lock.wait()
+            except BaseException:
+                if request in self._waiting:
+                    self._waiting.remove(request)
+                elif request.pool is not None:
+                    self._busy[request.pool] -= 1
+                    self._grant_locked()
+                raise
+
+    def _release(self, pool):
+        with self._lock:
+            self._busy[pool] -= 1
+            self._grant_locked()
+
+    def _grant_locked(self):
+        granted = False
+        while True:
+            request, pool = self._next_locked()
+            if request is None:
+                break
+            self._waiting.remove(request)
+            self._busy[pool] += 1
+
+            job = request.job
+            wait = time.monotonic() - request.requested
+            request.pool = pool
+            job.pages_granted += 1
+            job.page_wait += wait
+            self._served[job.client] = self._served.get(job.client, 0) + 1
+            self._waits[job.lane].append(wait)
+            self._granted[job.lane] += 1
+            granted = True
+        if granted:
+            self._lock.notify_all()
+
+    def _next_locked(self):
+        """(request, pool) to grant next, or (None, None)"""
+        fast_free = self._busy["fast"] < self.capacity["fast"]
+        shared_free = self._busy["shared"] < self.capacity["shared"]
+
+        fast = [r for r in self._waiting if r.job.lane == "fast"]
+        if fast and (fast_free or shared_free):
+            request = min(fast, key=lambda r: r.sequence)
+            return request, "fast" if fast_free else "shared"
+
+        if shared_free and self._waiting:
+            request = min(self._waiting,
+                          key=lambda r: (self._served.get(r.job.client, 0), r.sequence))
+            return request, "shared"
+        return None, None
+
+    def snapshot(self):
+        """Lanes, permits and page waits, for /metrics"""
+        with self._lock:
+            lanes = {}
+            for lane in LANES:
+                jobs = [j for client_jobs in self._jobs.values() for j in client_jobs if j.lane == lane]
+                lanes[lane] = dict(
+                    wait_summary(self._waits[lane]),
+                    active_jobs=len(jobs),
+                    waiting_pages=sum(1 for r in self._waiting if r.job.lane == lane),
+                    pages_granted=self._granted[lane])
+            return {
+                "fast_lane_pages": FAST_LANE_PAGES,
+                "page_workers": dict(self.capacity),
+                "busy_workers": dict(self._busy),
+                "active_clients": len(self._jobs),
+                "lanes": lanes
+            }
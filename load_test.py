@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+🏋️ PDF Optimizer Pro - Load Test
+Drives /compress and /optimize with concurrent uploads and measures the serving path
+
+    python load_test.py                                    # synthetic corpus, 4 clients, 60 s
+    python load_test.py --corpus my_pdfs/ --concurrency 16 --duration 300
+    python load_test.py --server production --workers 2 --json load.json --csv load.csv
+    python load_test.py --url http://localhost:8000 --endpoint compress --server-pid 1234
+
+The apps are started locally - web_server.py for /compress, pdf_optimizer_backend.py
+for /optimize - either as a threaded Flask server (--server flask, the default:
+compression runs in the request thread behind admission control) or through
+serve.py (--server production: gunicorn or waitress, the spool and local
+pdf_worker.py processes). --url points the clients at a server that is
+already running instead.
+
+👥 --concurrency client threads each upload one PDF at a time, cycling
+   through every corpus file x --preset quality x --endpoint combination,
+   for --duration seconds or --requests uploads
+⏱️ Latency p50/p95/p99 of successful requests, throughput, error rate and
+   429 (load shed) rate - per endpoint and overall
+🧠 Server RSS over time - every process of each server (HTTP workers and
+   compression processes) summed, sampled every --rss-interval seconds
+
+--json writes the whole report; --csv writes one row per request, plus the
+RSS samples next to it (name_rss.csv). Compare reports from two commits to
+spot regressions in the serving path.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from benchmark_optimizer import QUALITY_PRESETS, make_synthetic_corpus, corpus_files, print_rows
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# --endpoint name -> (app, path, upload field)
+ENDPOINTS = {
+    "compress": ("web", "/compress", "pdf"),
+    "optimize": ("backend", "/optimize", "pdf_file")
+}
+
+# How long a freshly started server gets to answer /health
+STARTUP_TIMEOUT = 60
+
+PERCENTILES = (50, 95, 99)
+
+
+# Server side -----------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_app(app_name, port):
+    """Internal: one app on Flask's threaded server, in this process"""
+    if app_name == "web":
+        from web_server import app
+    else:
+        from pdf_optimizer_backend import app
+    app.run(host="127.0.0.1", port=port, threaded=True, debug=False, use_reloader=False)
+
+
+def start_server(app_name, args, work_dir):
+    """(process, base_url, log_path) for a local server running app_name"""
+    port = free_port()
+    log_path = os.path.join(work_dir, f"{app_name}_server.log")
+    if args.server == "production":
+        command = [sys.executable, os.path.join(HERE, "serve.py"), "--app", app_name,
+                   "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers),
+                   "--threads", str(args.threads),
+                   "--spool", os.path.join(work_dir, f"spool_{app_name}")]
+        if args.compress_processes is not None:
+            command += ["--compress-processes", str(args.compress_processes)]
+    else:
+        command = [sys.executable, os.path.abspath(__file__), "--serve-app", app_name,
+                   "--port", str(port)]
+
+    # From the project folder, as start_web_server.bat runs it - web_server.py finds
+    # Sage's script and its temp_uploads / temp_compressed folders relative to it
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(command, cwd=HERE, stdout=log, stderr=subprocess.STDOUT)
+    return process, f"http://127.0.0.1:{port}", log_path
+
+
+def wait_until_healthy(base_url, process=None, timeout=STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(base_url + "/health", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def stop_server(process):
+    if process is None or process.poll() is not None:
+        return
+    # serve.py stops its compression processes on Ctrl+C
+    if os.name == "nt":
+        process.terminate()
+    else:
+        process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def process_tree(pid):
+    """pid and all of its descendants (Linux /proc, else psutil, else just pid)"""
+    try:
+        import psutil
+        parent = psutil.Process(pid)
+        return [pid] + [child.pid for child in parent.children(recursive=True)]
+    except ImportError:
+        pass
+    except Exception:
+        return []
+
+    children = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The command name is in parentheses and may contain spaces
+                    fields = f.read().rsplit(")", 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        return [pid]
+
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_rss(pid):
+    """Resident set size of one process in bytes, or None"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def tree_rss(pid):
+    """(summed RSS of pid and its descendants in bytes, process count); RSS None when unreadable"""
+    sizes = [process_rss(member) for member in process_tree(pid)]
+    sizes = [size for size in sizes if size is not None]
+    return (sum(sizes) if sizes else None), len(sizes)
+
+
+class RssSampler:
+    """Samples each server's process tree RSS on a thread until stopped"""
+
+    def __init__(self, servers, interval):
+        self.servers = servers  # name -> pid
+        self.interval = interval
+        self.samples = []       # (seconds, server, rss_mb, processes)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self, started):
+        self.started = started
+        self._thread.start()
+
+    def _sample(self):
+        elapsed = round(time.perf_counter() - self.started, 2)
+        for name, pid in self.servers.items():
+            rss, processes = tree_rss(pid)
+            if rss is not None:
+                self.samples.append((elapsed, name, round(rss / (1024 * 1024), 1), processes))
+
+    def _run(self):
+        self._sample()
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def summary(self):
+        rows = []
+        for name in self.servers:
+            values = [rss for _, server, rss, _ in self.samples if server == name]
+            if not values:
+                rows.append({"server": name, "error": "cannot read RSS here (install psutil)"})
+                continue
+            rows.append({
+                "server": name,
+                "samples": len(values),
+                "start_rss_mb": values[0],
+                "peak_rss_mb": max(values),
+                "end_rss_mb": values[-1]
+            })
+        return rows
+
+
+# Client side -----------------------------------------------------------------
+
+def multipart_body(field, filename, data, form):
+    """(body, content type) for one file upload plus plain form fields"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in form.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                     f'{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+                 f'filename="{filename}"\r\nContent-Type: application/pdf\r\n\r\n'.encode())
+    parts.append(data)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def upload(url, field, filename, data, form, timeout):
+    """POST one PDF; returns (status, bytes received, error). Status 0 = no HTTP answer."""
+    body, content_type = multipart_body(field, filename, data, form)
+    request = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, len(response.read()), None
+    except urllib.error.HTTPError as e:
+        detail = e.read()
+        try:
+            message = json.loads(detail).get("error")
+        except (ValueError, AttributeError):
+            message = None
+        return e.code, len(detail), message or e.reason
+    except (urllib.error.URLError, OSError) as e:
+        return 0, 0, str(getattr(e, "reason", e))
+
+
+def run_clients(plan, base_urls, args, started):
+    """--concurrency threads working through plan; returns one record per request"""
+    records = []
+    lock = threading.Lock()
+    counter = itertools.count()
+    deadline = started + args.duration if args.duration else None
+
+    def next_job():
+        index = next(counter)
+        if args.requests and index >= args.requests:
+            return None
+        if deadline and time.perf_counter() >= deadline:
+            return None
+        return plan[index % len(plan)]
+
+    def client():
+        while True:
+            with lock:
+                job = next_job()
+            if job is None:
+                return
+            endpoint, path, data, quality = job
+            app_name, route, field = ENDPOINTS[endpoint]
+            url = base_urls[app_name] + route + ("?inline=1" if args.inline else "")
+            form = {"quality": quality}
+            if endpoint == "optimize":
+                form["encoder"] = args.encoder
+
+            sent_at = time.perf_counter()
+            status, received, error = upload(url, field, os.path.basename(path), data, form,
+                                             args.timeout)
+            latency = time.perf_counter() - sent_at
+            record = {
+                "started": round(sent_at - started, 3),
+                "endpoint": endpoint,
+                "file": os.path.basename(path),
+                "quality": quality,
+                "status": status,
+                "latency": round(latency, 3),
+                "bytes_sent": len(data),
+                "bytes_received": received,
+                "error": error or ""
+            }
+            with lock:
+                records.append(record)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+# Report ----------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(name, records, wall_seconds):
+    ok = sorted(r["latency"] for r in records if 200 <= r["status"] < 300)
+    shed = sum(1 for r in records if r["status"] == 429)
+    errors = len(records) - len(ok) - shed
+    row = {
+        "endpoint": name,
+        "requests": len(records),
+        "ok": len(ok),
+        "rejected_429": shed,
+        "errors": errors,
+        "error_rate": round(errors / len(records), 3) if records else 0.0,
+        "rate_429": round(shed / len(records), 3) if records else 0.0,
+        "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+        "mb_per_s": round(sum(r["bytes_sent"] for r in records if 200 <= r["status"] < 300)
+                          / (1024 * 1024) / wall_seconds, 2) if wall_seconds else 0.0
+    }
+    for pct in PERCENTILES:
+        row[f"p{pct}_s"] = percentile(ok, pct)
+    row["max_s"] = ok[-1] if ok else None
+    return row
+
+
+def write_csv(path, rows, columns):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF Optimizer Pro load test")
+    parser.add_argument("--corpus", help="directory of PDFs (default: a synthetic corpus)")
+    parser.add_argument("--endpoint", action="append", choices=sorted(ENDPOINTS),
+                        help="endpoint to load (repeatable; default: both)")
+    parser.add_argument("--preset", action="append", choices=QUALITY_PRESETS,
+                        help="quality preset in the mix (repeatable; default: balanced)")
+    parser.add_argument("--encoder", default="jpeg", help="/optimize page encoder (default: jpeg)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="simultaneous clients (default: 4)")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="seconds to keep sending (default: 60; 0: until --requests)")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="stop after this many uploads (default: no limit)")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="seconds one request may take (default: 600)")
+    parser.add_argument("--inline", action="store_true",
+                        help="ask for the PDF in the response itself (?inline=1)")
+    parser.add_argument("--server", choices=("flask", "production"), default="flask",
+                        help="how the apps are started (default: flask)")
+    parser.add_argument("--workers", type=int, default=2, help="production: HTTP worker processes")
+    parser.add_argument("--threads", type=int, default=16, help="production: threads per worker")
+    parser.add_argument("--compress-processes", type=int,
+                        help="production: local compression processes (default: serve.py's)")
+    parser.add_argument("--url", help="load an already running server at this base URL instead")
+    parser.add_argument("--server-pid", type=int, help="with --url: sample this process tree's RSS")
+    parser.add_argument("--rss-interval", type=float, default=0.5,
+                        help="seconds between RSS samples (default: 0.5)")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--csv", help="write one row per request to this file (RSS to name_rss.csv)")
+    # Internal: one app on Flask's threaded server, started by this script
+    parser.add_argument("--serve-app", choices=("web", "backend"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_app:
+        serve_app(args.serve_app, args.port)
+        return
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if not args.duration and not args.requests:
+        parser.error("give --duration or --requests, or the test never ends")
+    endpoints = args.endpoint or sorted(ENDPOINTS)
+    presets = args.preset or ["balanced"]
+    apps = sorted({ENDPOINTS[endpoint][0] for endpoint in endpoints})
+    if args.url and len(apps) > 1:
+        parser.error("--url serves one app - pick its --endpoint (compress or optimize)")
+
+    work_dir = tempfile.mkdtemp(prefix="pdf_load_test_")
+    servers = {}
+    try:
+        files = corpus_files(args.corpus) if args.corpus else make_synthetic_corpus(work_dir)
+        if not files:
+            print("❌ No PDFs found in the corpus")
+            sys.exit(1)
+        payloads = {}
+        for path in files:
+            with open(path, "rb") as f:
+                payloads[path] = f.read()
+        plan = [(endpoint, path, payloads[path], quality)
+                for path in files for quality in presets for endpoint in endpoints]
+
+        print("🏋️ PDF Optimizer Pro - Load Test")
+        print(f"📄 {len(files)} file(s) x {len(presets)} preset(s) x {len(endpoints)} endpoint(s), "
+              f"{args.concurrency} client(s)")
+
+        base_urls = {}
+        rss_pids = {}
+        if args.url:
+            base_urls[apps[0]] = args.url.rstrip("/")
+            if args.server_pid:
+                rss_pids[apps[0]] = args.server_pid
+        else:
+            for app_name in apps:
+                process, base_url, log_path = start_server(app_name, args, work_dir)
+                servers[app_name] = (process, log_path)
+                base_urls[app_name] = base_url
+                rss_pids[app_name] = process.pid
+
+        for app_name, base_url in base_urls.items():
+            process = servers.get(app_name, (None, None))[0]
+            if not wait_until_healthy(base_url, process):
+                print(f"❌ {app_name} server at {base_url} did not come up")
+                if app_name in servers:
+                    with open(servers[app_name][1]) as log:
+                        print(log.read()[-2000:])
+                sys.exit(1)
+            print(f"🌐 {app_name}: {base_url} ({'external' if args.url else args.server})")
+
+        started = time.perf_counter()
+        sampler = RssSampler(rss_pids, args.rss_interval)
+        sampler.start(started)
+        try:
+            records = run_clients(plan, base_urls, args, started)
+        finally:
+            sampler.stop()
+        wall_seconds = time.perf_counter() - started
+
+        summary = [summarize(endpoint, [r for r in records if r["endpoint"] == endpoint], wall_seconds)
+                   for endpoint in endpoints]
+        if len(endpoints) > 1:
+            summary.append(summarize("all", records, wall_seconds))
+        memory = sampler.summary()
+
+        print_rows("requests", summary)
+        print_rows("server memory", memory)
+        failures = sorted({r["error"] for r in records if r["error"] and r["status"] != 429})
+        for message in failures[:5]:
+            print(f"⚠️ {message}")
+
+        report = {
+            "config": {
+                "server": "external" if args.url else args.server,
+                "endpoints": endpoints,
+                "presets": presets,
+                "encoder": args.encoder,
+                "files": [os.path.basename(path) for path in files],
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "requests": args.requests,
+                "inline": args.inline,
+                "workers": args.workers if args.server == "production" else None,
+                "threads": args.threads if args.server == "production" else None
+            },
+            "wall_seconds": round(wall_seconds, 2),
+            "summary": summary,
+            "memory": memory,
+            "rss_samples": [{"seconds": t, "server": name, "rss_mb": rss, "processes": count}
+                            for t, name, rss, count in sampler.samples],
+            "requests": records
+        }
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\n💾 Report written to {args.json}")
+        if args.csv:
+            write_csv(args.csv, records, list(records[0]) if records else ["started"])
+            rss_path = os.path.splitext(args.csv)[0] + "_rss.csv"
+            write_csv(rss_path, report["rss_samples"], ["seconds", "server", "rss_mb", "processes"])
+            print(f"💾 Requests written to {args.csv}, RSS samples to {rss_path}")
+    finally:
+        for process, _ in servers.values():
+            stop_server(process)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
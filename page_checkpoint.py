@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+💾 PDF Optimizer Pro - Page Checkpoints
+Resumable page loops for long jobs in the shared spool
+
+Every few pages the engine's finished pages - the encoded image bytes plus a
+small record of how each page was built - are written to the job's checkpoint
+directory together with manifest.json. If the worker dies at page 780 of 800,
+the next worker to claim the job rebuilds pages 1-775 from the checkpoint
+instead of rendering and encoding them again.
+
+Layout of a checkpoint directory:
+    manifest.json      - job settings plus one record per finished page
+    page_000012.bin    - encoded image bytes of page 13 (pages with images only)
+
+Blobs are written before the manifest that names them, and the manifest is
+replaced atomically, so a crash mid-checkpoint leaves the previous one intact.
+A manifest written for different settings (another quality, encoder, input)
+is thrown away rather than resumed.
+"""
+
+import json
+import os
+import shutil
+import time
+
+# Checkpoint after this many new pages, or this many seconds - whichever is first
+CHECKPOINT_PAGES = int(os.environ.get("PDF_OPTIMIZER_CHECKPOINT_PAGES", "25"))
+CHECKPOINT_SECONDS = float(os.environ.get("PDF_OPTIMIZER_CHECKPOINT_SECONDS", "30"))
+
+MANIFEST_NAME = "manifest.json"
+
+
+class PageCheckpoint:
+    """Finished pages of one job, saved so another attempt can pick up where this one stopped"""
+
+    def __init__(self, directory, previous_pages_done=0,
+                 every_pages=CHECKPOINT_PAGES, every_seconds=CHECKPOINT_SECONDS):
+        """
+        previous_pages_done: how far an earlier attempt got (from its last
+        progress event), so the report can say how much work is being redone
+        """
+        self.directory = directory
+        self.previous_pages_done = previous_pages_done
+        self.every_pages = every_pages
+        self.every_seconds = every_seconds
+
+        self.settings = None
+        self.records = []
+        self.pages_resumed = 0
+        self.checkpoints_written = 0
+        self._pending = {}
+        self._flushed_pages = 0
+        self._last_flush = time.monotonic()
+
+    def resume(self, settings):
+        """
+        Records of the pages already checkpointed for these settings, in page
+        order; an empty list when there is nothing (usable) to resume from
+        """
+        self.settings = settings
+        manifest = self._read_manifest()
+
+        if manifest is None or manifest.get("settings") != settings:
+            self.discard()
+            self.records = []
+        else:
+            self.records = manifest["pages"]
+
+        self.pages_resumed = self._flushed_pages = len(self.records)
+        self._last_flush = time.monotonic()
+        return list(self.records)
+
+    def add(self, record, blob=None):
+        """Record the next page; blob is its encoded image bytes, if it has any"""
+        page_num = len(self.records)
+        if blob is not None:
+            record = dict(record, blob=f"page_{page_num:06d}.bin")
+            self._pending[record["blob"]] = blob
+        self.records.append(record)
+
+        due_pages = len(self.records) - self._flushed_pages >= self.every_pages
+        due_time = time.monotonic() - self._last_flush >= self.every_seconds
+        if due_pages or due_time:
+            self.flush()
+
+    def blob(self, record):
+        """Encoded image bytes of a checkpointed page"""
+        with open(os.path.join(self.directory, record["blob"]), "rb") as f:
+            return f.read()
+
+    def flush(self):
+        """Write pending blobs, then the manifest that names them"""
+        if len(self.records) == self._flushed_pages:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        for name, blob in self._pending.items():
+            with open(os.path.join(self.directory, name), "wb") as f:
+                f.write(blob)
+        self._pending = {}
+
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump({"settings": self.settings, "pages": self.records,
+                       "updated": time.time()}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        self._flushed_pages = len(self.records)
+        self._last_flush = time.monotonic()
+        self.checkpoints_written += 1
+
+    def discard(self):
+        """Remove the checkpoint once it can no longer be resumed"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._pending = {}
+
+    def report(self):
+        """Summary for the job's stats"""
+        return {
+            "pages_resumed": self.pages_resumed,
+            "pages_redone": max(0, self.previous_pages_done - self.pages_resumed),
+            "checkpoints_written": self.checkpoints_written
+        }
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
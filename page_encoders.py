@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+🧩 PDF Optimizer Pro - Page Encoders
+Pluggable image encoders for Sage's Page-to-Images pages
+
+🖼️ jpeg      - Pillow JPEG with tunable chroma subsampling, progressive scans
+               and optimized Huffman tables; with a quality target (min SSIM
+               and/or PSNR, see page_quality.py) each page gets the lowest
+               JPEG quality that still meets it
+🌊 jpeg2000  - Pillow JPEG 2000 at a PSNR target matched to the preset quality
+🎨 flate     - lossless Flate with PNG predictors, written as an indexed
+               (palette) image when the page has 256 colours or fewer - the
+               flat-colour pages: diagrams, forms, nearly blank pages
+🏆 best      - encodes each page with several candidates and keeps the
+               smallest; every candidate is at (or above) the preset's quality,
+               so the choice never drops below the quality budget. With a
+               quality target, every candidate is scored against it and
+               those that miss it are passed over
+
+Each encoder returns an EncodedImage holding the exact bytes that go into the
+PDF, and EncodedImage.insert() writes the image XObject itself. (Handing a PNG
+to insert_image(stream=...) would let PyMuPDF expand it to raw RGB, so sizes
+compared in best-of mode would not be the sizes that end up in the file.)
+
+Each encoder saves into its own OutputBuffer (pixmap_buffer.py), so the
+output buffer is allocated once per job rather than once per page.
+
+Pillow is optional: without it the JPEG encoder falls back to PyMuPDF's own
+pix.tobytes("jpeg") and the other encoders are unavailable. NumPy is optional
+too: without it Flate pages are stored as RGB instead of indexed colour.
+"""
+
+import struct
+import time
+
+from page_quality import QualityTarget, QUALITY_MIN, QUALITY_MAX, metric_image, targets_available
+from pixmap_buffer import OutputBuffer
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Chroma subsampling as Pillow numbers it
+SUBSAMPLING = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+
+# Pages with at most this many colours are stored as indexed Flate images
+FLAT_COLOUR_LIMIT = 256
+
+COLORSPACES = {"L": "/DeviceGray", "RGB": "/DeviceRGB"}
+
+
+def pixmap_to_image(pix):
+    """Wrap a fitz.Pixmap's samples as a Pillow image without copying"""
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[pix.n]
+    image = Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv,
+                             "raw", mode, pix.stride, 1)
+    return image.convert("RGB") if mode == "RGBA" else image
+
+
+class EncodedImage:
+    """Encoded page image: the exact stream bytes plus its PDF image dictionary"""
+
+    def __init__(self, data, encoder, width, height, filter_name,
+                 colorspace="/DeviceRGB", bits=8, decode_parms=None, quality=None, scores=None):
+        self.data = data
+        self.encoder = encoder
+        self.width = width
+        self.height = height
+        self.filter_name = filter_name
+        self.colorspace = colorspace
+        self.bits = bits
+        self.decode_parms = decode_parms
+        # Set when a quality target chose the JPEG quality
+        self.quality = quality
+        self.scores = scores
+
+    def __len__(self):
+        # An indexed colorspace carries its palette inline, so it counts too
+        return len(self.data) + len(self.colorspace)
+
+    def describe(self):
+        """Image dictionary fields as a plain dict (for page checkpoints)"""
+        return {
+            "encoder": self.encoder,
+            "width": self.width,
+            "height": self.height,
+            "filter_name": self.filter_name,
+            "colorspace": self.colorspace,
+            "bits": self.bits,
+            "decode_parms": self.decode_parms,
+            "quality": self.quality,
+            "scores": self.scores
+        }
+
+    @classmethod
+    def from_description(cls, description, data):
+        return cls(data, **description)
+
+    def insert(self, doc, page, rect):
+        """Write the image XObject into doc, show it on page; returns its xref"""
+        xref = doc.get_new_xref()
+        doc.update_object(xref, (
+            f"<</Type/XObject/Subtype/Image/Width {self.width}/Height {self.height}"
+            f"/BitsPerComponent {self.bits}/ColorSpace {self.colorspace}>>"))
+        doc.update_stream(xref, self.data, new=True, compress=False)
+        # update_stream resets the filter keys, so they go in afterwards
+        doc.xref_set_key(xref, "Filter", self.filter_name)
+        if self.decode_parms:
+            doc.xref_set_key(xref, "DecodeParms", self.decode_parms)
+        page.insert_image(rect, xref=xref)
+        return xref
+
+
+class PageEncoder:
+    """Base class: encode a rendered page, keeping count of pages and time"""
+
+    name = "base"
+    # Lossless encoders decode to exactly the rendered page
+    lossless = False
+
+    def __init__(self):
+        self.pages = 0
+        self.seconds = 0.0
+        self.output = OutputBuffer()
+
+    def encode(self, pix):
+        """Returns an EncodedImage"""
+        start = time.perf_counter()
+        encoded = self._encode(pix)
+        self.seconds += time.perf_counter() - start
+        self.pages += 1
+        return encoded
+
+    def _encode(self, pix):
+        return self.encode_image(pixmap_to_image(pix))
+
+    def encode_image(self, image):
+        raise NotImplementedError
+
+    def applicable(self, image):
+        return True
+
+    def report(self):
+        """Summary for the job's stats"""
+        return {
+            "encoder": self.name,
+            "encode_seconds": round(self.seconds, 2)
+        }
+
+
+class JpegEncoder(PageEncoder):
+    name = "jpeg"
+
+    def __init__(self, quality, subsampling="4:2:0", progressive=False, optimize=True):
+        super().__init__()
+        self.quality = quality
+        self.subsampling = subsampling
+        self.progressive = progressive
+        self.optimize = optimize
+
+    def _encode(self, pix):
+        if Image is None:
+            data = pix.tobytes("jpeg", jpg_quality=self.quality)
+            colorspace = "/DeviceGray" if pix.n == 1 else "/DeviceRGB"
+            return EncodedImage(data, self.name, pix.width, pix.height, "/DCTDecode", colorspace)
+        return super()._encode(pix)
+
+    def encode_image(self, image):
+        image.save(self.output.start(), format="JPEG", quality=self.quality,
+                   subsampling=SUBSAMPLING[self.subsampling],
+                   progressive=self.progressive, optimize=self.optimize)
+        return EncodedImage(self.output.take(), self.name, image.width, image.height,
+                            "/DCTDecode", COLORSPACES[image.mode])
+
+
+class TargetJpegEncoder(JpegEncoder):
+    """JPEG at the lowest quality whose decoded page still meets a QualityTarget"""
+
+    def __init__(self, target, subsampling="4:2:0", progressive=False, optimize=True):
+        super().__init__(QUALITY_MAX, subsampling, progressive, optimize)
+        self.target = target
+        self.probes = 0
+        self.qualities = []
+        self.pages_below_target = 0
+
+    def encode_image(self, image):
+        reference = metric_image(image)
+        best = None
+        low, high = QUALITY_MIN, QUALITY_MAX
+        while low <= high:
+            self.quality = (low + high) // 2
+            encoded = super().encode_image(image)
+            scores = self.target.score(reference, encoded.data)
+            self.probes += 1
+            if self.target.met(scores):
+                best = encoded
+                best.quality, best.scores = self.quality, scores
+                high = self.quality - 1
+            else:
+                low = self.quality + 1
+
+        if best is None:
+            # Not even QUALITY_MAX gets there - keep the closest we can do
+            self.quality = QUALITY_MAX
+            best = super().encode_image(image)
+            best.quality, best.scores = QUALITY_MAX, self.target.score(reference, best.data)
+            self.probes += 1
+            self.pages_below_target += 1
+
+        self.qualities.append(best.quality)
+        return best
+
+    def report(self):
+        report = super().report()
+        report["quality_target"] = self.target.describe()
+        report["quality_probes"] = self.probes
+        report["pages_below_target"] = self.pages_below_target
+        if self.qualities:
+            report["jpeg_quality_range"] = [min(self.qualities), max(self.qualities)]
+            report["mean_jpeg_quality"] = round(sum(self.qualities) / len(self.qualities), 1)
+        return report
+
+
+class Jpeg2000Encoder(PageEncoder):
+    name = "jpeg2000"
+
+    def __init__(self, quality):
+        super().__init__()
+        # JPEG quality 75-90 lands around 39-43 dB PSNR on rendered pages
+        self.psnr_db = 20 + quality * 0.25
+
+    def encode_image(self, image):
+        image.save(self.output.start(), format="JPEG2000", quality_mode="dB",
+                   quality_layers=[self.psnr_db])
+        return EncodedImage(self.output.take(), self.name, image.width, image.height,
+                            "/JPXDecode", COLORSPACES[image.mode])
+
+
+class FlateEncoder(PageEncoder):
+    name = "flate"
+    lossless = True
+
+    def applicable(self, image):
+        return image.getcolors(FLAT_COLOUR_LIMIT) is not None
+
+    def encode_image(self, image):
+        colorspace = COLORSPACES[image.mode]
+        colors = 1 if image.mode == "L" else 3
+        indexed = to_indexed(image) if image.mode == "RGB" else None
+
+        buffer = self.output.start()
+        if indexed is not None:
+            image, palette = indexed
+            colors = 1
+            count = len(palette) // 3
+            bits = 1 if count <= 2 else 2 if count <= 4 else 4 if count <= 16 else 8
+            image.save(buffer, format="PNG", optimize=True, bits=bits)
+            colorspace = f"[/Indexed/DeviceRGB {count - 1}<{palette.hex()}>]"
+        else:
+            image.save(buffer, format="PNG", optimize=True)
+
+        # The IDAT chunks are a zlib stream with PNG row filters - exactly what
+        # /FlateDecode with /Predictor 15 expects, so they go in untouched
+        width, height, bits, idat = read_png(self.output.take())
+        decode_parms = f"<</Predictor 15/Colors {colors}/BitsPerComponent {bits}/Columns {width}>>"
+        return EncodedImage(idat, self.name, width, height, "/FlateDecode",
+                            colorspace, bits, decode_parms)
+
+
+def to_indexed(image):
+    """
+    Exact palette conversion for images with few colours.
+    Returns (P-mode image, RGB palette bytes) or None.
+    """
+    if np is None or image.getcolors(FLAT_COLOUR_LIMIT) is None:
+        return None
+    rgb = np.asarray(image, dtype=np.uint32)
+    keys = (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+    colours, indices = np.unique(keys, return_inverse=True)
+    palette = np.stack([(colours >> 16) & 255, (colours >> 8) & 255, colours & 255], axis=1)
+    palette_bytes = palette.astype(np.uint8).tobytes()
+
+    indexed = Image.fromarray(indices.reshape(keys.shape).astype(np.uint8), mode="L")
+    indexed = indexed.convert("P")
+    indexed.putpalette(palette_bytes)
+    return indexed, palette_bytes
+
+
+def read_png(data):
+    """(width, height, bit_depth, concatenated IDAT data) from a PNG file"""
+    pos = 8
+    idat = []
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if chunk_type == b"IHDR":
+            width, height, bits = struct.unpack(">IIB", body[:9])
+        elif chunk_type == b"IDAT":
+            idat.append(body)
+        pos += length + 12
+    return width, height, bits, b"".join(idat)
+
+
+class BestOfEncoder(PageEncoder):
+    """
+    Encodes with every applicable candidate and keeps the smallest stream.
+    With a QualityTarget, the smallest stream that meets it; the first
+    candidate (the target JPEG encoder) is kept when none does.
+    """
+
+    def __init__(self, candidates, target=None):
+        super().__init__()
+        self.candidates = candidates
+        self.target = target
+        self.name = "best(" + ",".join(c.name for c in candidates) + ")"
+        self.wins = {c.name: 0 for c in candidates}
+        self.pages_below_target = 0
+
+    def _encode(self, pix):
+        image = pixmap_to_image(pix)
+        reference = None
+        best = fallback = None
+        for candidate in self.candidates:
+            if not candidate.applicable(image):
+                continue
+            start = time.perf_counter()
+            encoded = candidate.encode_image(image)
+            if self.target and encoded.scores is None:
+                if candidate.lossless:
+                    encoded.scores = self.target.lossless_scores()
+                else:
+                    if reference is None:
+                        reference = metric_image(image)
+                    encoded.scores = self.target.score(reference, encoded.data)
+            candidate.seconds += time.perf_counter() - start
+            candidate.pages += 1
+            fallback = fallback or encoded
+            if self.target and not self.target.met(encoded.scores):
+                continue
+            if best is None or len(encoded) < len(best):
+                best = encoded
+
+        if best is None:
+            best = fallback
+            self.pages_below_target += 1
+        self.wins[best.encoder] += 1
+        return best
+
+    def report(self):
+        report = super().report()
+        report["encoder_wins"] = dict(self.wins)
+        report["candidate_seconds"] = {c.name: round(c.seconds, 2) for c in self.candidates}
+        if self.target:
+            # The JPEG quality search, but only pages whose winner missed count as below target
+            for candidate in self.candidates:
+                if isinstance(candidate, TargetJpegEncoder):
+                    report.update((key, value) for key, value in candidate.report().items()
+                                  if key not in report)
+            report["pages_below_target"] = self.pages_below_target
+        return report
+
+
+ENCODER_NAMES = ("jpeg", "jpeg2000", "flate", "best")
+
+
+def available_encoders():
+    """Encoder names usable with the installed libraries"""
+    if Image is None:
+        return ("jpeg",)
+    if not features.check("jpg_2000"):
+        return ("jpeg", "flate", "best")
+    return ENCODER_NAMES
+
+
+QUALITY_TARGET_ENCODERS = ("jpeg", "best")
+
+
+def make_encoder(name, jpeg_quality, subsampling="4:2:0", progressive=False,
+                 min_ssim=None, min_psnr=None):
+    """
+    Build the encoder for one job; raises ValueError for unknown/unavailable names.
+    min_ssim / min_psnr replace the preset's JPEG quality with a per-page search.
+    """
+    if name not in available_encoders():
+        raise ValueError(f"Encoder '{name}' is not available (choose from: {', '.join(available_encoders())})")
+
+    target = QualityTarget(min_ssim, min_psnr)
+    if target and name not in QUALITY_TARGET_ENCODERS:
+        raise ValueError(f"Quality targets need the {' or '.join(QUALITY_TARGET_ENCODERS)} encoder")
+    if target and not targets_available():
+        raise ValueError("Quality targets need NumPy and Pillow (pip install numpy pillow)")
+
+    if target:
+        jpeg = TargetJpegEncoder(target, subsampling, progressive)
+    else:
+        jpeg = JpegEncoder(jpeg_quality, subsampling, progressive)
+
+    if name == "jpeg":
+        return jpeg
+    if name == "jpeg2000":
+        return Jpeg2000Encoder(jpeg_quality)
+    if name == "flate":
+        return FlateEncoder()
+
+    candidates = [jpeg, FlateEncoder()]
+    if features.check("jpg_2000"):
+        candidates.insert(1, Jpeg2000Encoder(jpeg_quality))
+    return BestOfEncoder(candidates, target if target else None)
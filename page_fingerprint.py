@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+🔍 PDF Optimizer Pro - Page Fingerprints
+Spotting blank and repeated pages before they are encoded
+
+📄 Blank pages - a vectorized NumPy check finds renders that are one colour
+   apart from a few specks of scanner dust; they become an empty page (or a
+   filled rectangle for tinted paper) with no image at all
+🔁 Repeated pages - an exact hash of the rendered samples finds identical
+   pages (letterheads, separator sheets), which then reuse the first page's
+   image xref instead of embedding the same stream again
+
+NumPy is optional: without it only exact duplicates are detected.
+"""
+
+import hashlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A channel may stray this far from the page's median colour and still count as paper
+BLANK_TOLERANCE = 24
+
+# ...and this fraction of pixels may stray further (dust, punch holes, scan noise)
+BLANK_MAX_INK_FRACTION = 0.001
+
+# Paper at least this light is left white rather than filled
+WHITE_LEVEL = 250
+
+
+def fingerprint(pix):
+    """Exact hash of a rendered page: dimensions plus every sample byte"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{pix.width}x{pix.height}x{pix.n}".encode())
+    digest.update(pix.samples_mv)
+    return digest.digest()
+
+
+def blank_colour(pix):
+    """
+    Paper colour (r, g, b) if the page is near-uniform, else None.
+
+    A sparse grid of pixels is checked first, so pages with content are
+    rejected after touching a small fraction of the samples.
+    """
+    if np is None:
+        return None
+
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    pixels = samples[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)[..., :3]
+
+    sparse = pixels[::8, ::8]
+    paper = np.median(sparse.reshape(-1, sparse.shape[-1]), axis=0)
+    if _ink_fraction(sparse, paper) > BLANK_MAX_INK_FRACTION * 10:
+        return None
+    if _ink_fraction(pixels, paper) > BLANK_MAX_INK_FRACTION:
+        return None
+
+    colour = tuple(int(round(c)) for c in paper)
+    return colour * 3 if len(colour) == 1 else colour
+
+
+def _ink_fraction(pixels, paper):
+    distance = np.abs(pixels.astype(np.int16) - paper.astype(np.int16)).max(axis=-1)
+    return np.count_nonzero(distance > BLANK_TOLERANCE) / distance.size
+
+
+class PageDeduplicator:
+    """Remembers rendered pages seen so far in one job"""
+
+    def __init__(self):
+        self._seen = {}
+        self.blank_pages = 0
+        self.duplicate_pages = 0
+
+    def classify(self, pix):
+        """
+        Returns (kind, value, key):
+            ("duplicate", xref, key)  - identical to an earlier page
+            ("blank", colour, key)    - near-uniform page of that colour
+            ("image", None, key)      - needs encoding; call remember() after
+        """
+        key = fingerprint(pix)
+        return self.classify_fingerprint(key, None if key in self._seen else blank_colour(pix))
+
+    def classify_fingerprint(self, key, colour):
+        """classify() for a page fingerprinted elsewhere (render_pipeline); colour is its blank_colour()"""
+        seen = self._seen.get(key)
+        if seen is not None:
+            kind, value = seen
+            if kind == "blank":
+                self.blank_pages += 1
+            else:
+                self.duplicate_pages += 1
+            return kind if kind == "blank" else "duplicate", value, key
+
+        if colour is not None:
+            self._seen[key] = ("blank", colour)
+            self.blank_pages += 1
+            return "blank", colour, key
+
+        return "image", None, key
+
+    def remember(self, key, xref):
+        self._seen[key] = ("image", xref)
+
+    def restore(self, key, kind, value):
+        """Replay a page classified by an earlier attempt (see page_checkpoint)"""
+        if kind == "image":
+            self._seen.setdefault(key, ("image", value))
+        elif kind == "blank":
+            self._seen.setdefault(key, ("blank", value))
+            self.blank_pages += 1
+        else:
+            self.duplicate_pages += 1
+
+    def report(self):
+        return {
+            "blank_pages": self.blank_pages,
+            "duplicate_pages": self.duplicate_pages,
+            "unique_images": sum(1 for kind, _ in self._seen.values() if kind == "image")
+        }
+
+
+def draw_blank(page, colour):
+    """An image-free stand-in for a blank page: nothing for white paper, one fill otherwise"""
+    if min(colour) < WHITE_LEVEL:
+        page.draw_rect(page.rect, color=None, fill=tuple(c / 255 for c in colour), width=0)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+📏 PDF Optimizer Pro - Perceptual Quality Targets
+Choosing each page's JPEG quality from how the result looks, not from a preset
+
+A quality target is a minimum SSIM and/or PSNR. For every page the lowest
+JPEG quality whose decoded image still meets the target is found by bisection
+between QUALITY_MIN and QUALITY_MAX - about seven encodes per page, so a text
+page can drop to quality 40 while a photo keeps 90.
+
+Both metrics compare grayscale copies of the render and of the decoded JPEG,
+box-downscaled so the shorter side is about METRIC_SIDE pixels: roughly how
+a page is seen on screen, and small enough that the NumPy maths (SSIM over
+7x7 windows from integral images) costs less than the encode it judges.
+
+NumPy is required for quality targets; without it they are unavailable.
+"""
+
+import io
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+QUALITY_MIN = 20
+QUALITY_MAX = 95
+
+# Metric images are downscaled until their shorter side is about this long
+METRIC_SIDE = 512
+
+# Form field -> (exclusive minimum, maximum) of a sensible target
+QUALITY_TARGET_LIMITS = {
+    "min_ssim": (0.0, 1.0),
+    "min_psnr": (0.0, 100.0)
+}
+
+SSIM_WINDOW = 7
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+PSNR_IDENTICAL = 100.0  # Reported for a pixel-perfect match instead of infinity
+
+
+def targets_available():
+    return np is not None and Image is not None
+
+
+def metric_image(image):
+    """Downscaled grayscale float array of a Pillow image"""
+    gray = image.convert("L")
+    factor = max(1, min(gray.size) // METRIC_SIDE)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    return np.asarray(gray, dtype=np.float64)
+
+
+def box_mean(values, size=SSIM_WINDOW):
+    """Mean over every size x size window (valid positions only), via an integral image"""
+    integral = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    sums = (integral[size:, size:] - integral[:-size, size:]
+            - integral[size:, :-size] + integral[:-size, :-size])
+    return sums / (size * size)
+
+
+def ssim(reference, candidate):
+    """Mean structural similarity of two equal-sized grayscale arrays"""
+    mu_x = box_mean(reference)
+    mu_y = box_mean(candidate)
+    var_x = box_mean(reference * reference) - mu_x * mu_x
+    var_y = box_mean(candidate * candidate) - mu_y * mu_y
+    covariance = box_mean(reference * candidate) - mu_x * mu_y
+
+    ssim_map = (((2 * mu_x * mu_y + SSIM_C1) * (2 * covariance + SSIM_C2))
+                / ((mu_x * mu_x + mu_y * mu_y + SSIM_C1) * (var_x + var_y + SSIM_C2)))
+    return float(ssim_map.mean())
+
+
+def psnr(reference, candidate):
+    """Peak signal-to-noise ratio in dB"""
+    mse = float(np.mean((reference - candidate) ** 2))
+    if mse == 0:
+        return PSNR_IDENTICAL
+    return min(PSNR_IDENTICAL, 10 * math.log10(255 * 255 / mse))
+
+
+class QualityTarget:
+    """Minimum SSIM and/or PSNR a page must keep"""
+
+    def __init__(self, min_ssim=None, min_psnr=None):
+        self.min_ssim = min_ssim
+        self.min_psnr = min_psnr
+
+    def __bool__(self):
+        return self.min_ssim is not None or self.min_psnr is not None
+
+    def score(self, reference, encoded_data):
+        """Scores of an encoded JPEG (or JPEG 2000) against the page's metric image"""
+        candidate = metric_image(Image.open(io.BytesIO(encoded_data)))
+        scores = {}
+        if self.min_ssim is not None:
+            scores["ssim"] = round(ssim(reference, candidate), 4)
+        if self.min_psnr is not None:
+            scores["psnr"] = round(psnr(reference, candidate), 2)
+        return scores
+
+    def lossless_scores(self):
+        """Scores of a stream that decodes to exactly the page"""
+        scores = {}
+        if self.min_ssim is not None:
+            scores["ssim"] = 1.0
+        if self.min_psnr is not None:
+            scores["psnr"] = PSNR_IDENTICAL
+        return scores
+
+    def met(self, scores):
+        return ((self.min_ssim is None or scores["ssim"] >= self.min_ssim)
+                and (self.min_psnr is None or scores["psnr"] >= self.min_psnr))
+
+    def describe(self):
+        return {key: value for key, value in
+                (("min_ssim", self.min_ssim), ("min_psnr", self.min_psnr)) if value is not None}
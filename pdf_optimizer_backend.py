@@ -12,131 +12,182 @@ Built by Nexus, using Sage's breakthrough algorithms
 "Where Sage's desktop mastery meets web accessibility" - Nexus
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response
 from flask_cors import CORS
-import fitz  # PyMuPDF - Sage's choice for PDF manipulation
 import os
-import time
 import tempfile
 import io
+import contextlib
+import importlib.util
+import threading
+import uuid
 from werkzeug.utils import secure_filename
+from admission_control import AdmissionController, estimate_job_cost
+from job_scheduler import PageScheduler, client_key, lane_for
+from job_events import JobEventBus, ProgressReporter
+from job_cancellation import CancellationRegistry
+from spool_queue import SpoolQueue, MAX_BACKLOG, SPOOL_RETRY_AFTER
+from structural_optimizer import OPTIMIZE_METHODS
+from engine_warmup import EngineWarmUp, WARM_UP, import_modules
+from inline_results import INLINE_MAX_BYTES, inline_requested, inline_headers, remove_quietly
+from job_profiler import (JobProfiler, PROFILE_DIR, PROFILE_TOKEN_HEADER, profile_requested,
+                          check_profile_token, spool_profile_dir, profile_paths, load_profile,
+                          with_profile_url)
+from sage_optimizer import optimizer, build_optimize_result, parse_encoder_options
 
 app = Flask(__name__)
 CORS(app)  # Enable cross-origin requests from our web interface
 
-class SageWebPDFOptimizer:
-    """
-    Sage's Page-to-Images algorithm adapted for web use
-    Maintaining the exact compression methodology that achieves 70% reduction
-    """
-    
-    def __init__(self):
-        # Sage's proven compression settings
-        self.compression_settings = {
-            "maximum": {
-                "jpeg_quality": 90,
-                "resolution": 2.0,
-                "description": "Professional standard (50% reduction)"
-            },
-            "balanced": {
-                "jpeg_quality": 85, 
-                "resolution": 2.0,
-                "description": "Sage's breakthrough formula (70% reduction)"
-            },
-            "aggressive": {
-                "jpeg_quality": 75,
-                "resolution": 1.8, 
-                "description": "Maximum compression (85% reduction)"
-            }
-        }
-    
-    def optimize_pdf(self, input_file_path, quality_level="balanced"):
-        """
-        Sage's Page-to-Images compression algorithm
-        Returns: (success, output_path, stats, error_message)
-        """
-        try:
-            start_time = time.time()
-            
-            # Open PDF using Sage's method
-            doc = fitz.open(input_file_path)
-            total_pages = len(doc)
-            
-            if total_pages == 0:
-                return False, None, None, "PDF contains no pages"
-            
-            # Create new PDF document - Sage's approach
-            new_doc = fitz.open()
-            
-            # Get compression settings
-            settings = self.compression_settings.get(quality_level, self.compression_settings["balanced"])
-            jpeg_quality = settings["jpeg_quality"]
-            resolution = settings["resolution"]
-            
-            # Process each page using Sage's Page-to-Images method
-            for page_num in range(total_pages):
-                page = doc[page_num]
-                
-                # Convert page to optimized image - Sage's technique
-                mat = fitz.Matrix(resolution, resolution)
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.tobytes("jpeg", jpg_quality=jpeg_quality)
-                
-                # Insert optimized image into new PDF - maintaining structure
-                img_rect = fitz.Rect(0, 0, page.rect.width, page.rect.height)
-                new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
-                new_page.insert_image(img_rect, stream=img_data)
-                
-                # Clean up memory
-                pix = None
-            
-            # Create temporary output file
-            output_fd, output_path = tempfile.mkstemp(suffix='.pdf', prefix='optimized_')
-            os.close(output_fd)
-            
-            # Save optimized PDF with Sage's settings
-            new_doc.save(output_path, deflate=True)
-            
-            # Calculate compression statistics
-            original_size = os.path.getsize(input_file_path)
-            optimized_size = os.path.getsize(output_path)
-            reduction_percentage = ((original_size - optimized_size) / original_size) * 100
-            processing_time = time.time() - start_time
-            
-            # Verify PDF integrity - Sage's quality assurance
-            try:
-                test_doc = fitz.open(output_path)
-                test_doc.close()
-                verification_status = "✅ VERIFIED READABLE"
-            except Exception as e:
-                verification_status = f"❌ VERIFICATION FAILED: {str(e)}"
-                doc.close()
-                new_doc.close()
-                return False, None, None, f"Output PDF verification failed: {str(e)}"
-            
-            # Cleanup
-            doc.close()
-            new_doc.close()
-            
-            # Prepare statistics
-            stats = {
-                "original_size_mb": round(original_size / (1024 * 1024), 2),
-                "optimized_size_mb": round(optimized_size / (1024 * 1024), 2),
-                "reduction_percentage": round(reduction_percentage, 1),
-                "processing_time": round(processing_time, 2),
-                "pages_processed": total_pages,
-                "quality_level": quality_level,
-                "verification_status": verification_status,
-                "compression_method": "Page-to-Images (Sage's Algorithm)"
-            }
-            
-            return True, output_path, stats, None
-            
-        except Exception as e:
-            return False, None, None, f"Compression failed: {str(e)}"
+# Memory-aware admission control - overload becomes latency, not a crash
+admission = AdmissionController.from_environment()
+
+# Fair page-by-page sharing of the workers, with a fast lane for small documents
+page_scheduler = PageScheduler()
+
+def server_busy_response(retry_after):
+    """429 with a Retry-After hint when the admission queue is full"""
+    response = jsonify({
+        "error": "Server is busy compressing other PDFs - please retry shortly",
+        "retry_after": retry_after
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+# Worker mode: with PDF_OPTIMIZER_SPOOL_DIR set, jobs go into the shared spool
+# queue and pdf_worker.py processes (on any host) compress them
+SPOOL_DIR = os.environ.get('PDF_OPTIMIZER_SPOOL_DIR')
+SPOOL_RESULT_TIMEOUT = 600
+spool = SpoolQueue(SPOOL_DIR) if SPOOL_DIR else None
+
+# Live job progress for GET /jobs/<id>/events, and finished outputs by job id
+job_events = spool if spool else JobEventBus()
+job_outputs = {}
+
+# DELETE /jobs/<id> and abandoned event streams stop jobs between pages
+job_cancellations = CancellationRegistry(spool)
+
+# PyMuPDF and friends load in the background while the socket comes up
+warm_up = EngineWarmUp([("engine", import_modules)]).start()
+
+def run_optimization_job(job_id, input_path, quality, ticket, progress=None,
+                         encoder="jpeg", encoder_options=None, output_format="standard",
+                         cancel_token=None, page_gate=None, method="page-to-images",
+                         profiler=None, scan_cleanup=()):
+    """
+    Run one admitted job and clean up its upload
+    Returns: (http_status, response_data)
+    """
+    # A profiled job's engine reports progress through the profiler
+    engine_progress = profiler.wrap(progress) if profiler else progress
+    try:
+        with ticket, (page_gate or contextlib.nullcontext()), (profiler or contextlib.nullcontext()):
+            success, output_path, stats, error = optimizer.optimize_pdf(
+                input_path, quality, progress=engine_progress,
+                encoder=encoder, encoder_options=encoder_options, output_format=output_format,
+                cancel_token=cancel_token, page_gate=page_gate, method=method,
+                scan_cleanup=scan_cleanup)
+    finally:
+        os.unlink(input_path)
+        job_cancellations.discard(job_id)
+    
+    cancelled = not success and cancel_token and cancel_token.cancelled
+    if profiler:
+        profiler.save("complete" if success else "cancelled" if cancelled else "failed", stats)
+    
+    if cancelled:
+        if progress:
+            progress.cancelled(cancel_token.reason)
+        return 409, with_profile_url({"error": error, "cancelled": True}, job_id, profiler)
+    
+    if not success:
+        if progress:
+            progress.fail(error)
+        return 500, with_profile_url({"error": error}, job_id, profiler)
+    
+    # Store output path for download (in production, use better session management)
+    job_outputs[job_id] = output_path
+    app.config['LAST_OUTPUT_PATH'] = output_path
+    
+    response_data = with_profile_url(build_optimize_result(job_id, stats), job_id, profiler)
+    if progress:
+        progress.complete(response_data)
+    return 200, response_data
+
+def wants_profile():
+    """Admins ask for a profiled job with ?profile=1 (and the X-Profile-Token header)"""
+    return profile_requested(request.args.get('profile', request.form.get('profile', '')))
+
+def wants_async():
+    """Clients opt into 202 + progress events with ?async=1"""
+    return request.args.get('async', request.form.get('async', '')) in ('1', 'true')
+
+def wants_inline():
+    """Clients get the PDF itself as the response with ?inline=1 or Accept: application/pdf"""
+    return inline_requested(request.args.get('inline', request.form.get('inline', '')),
+                            request.headers.get('Accept', ''))
+
+def inline_pdf_response(response_data, original_size, output_path, remove=False):
+    """The finished PDF as the response body, with the JSON result in headers"""
+    response = send_file(output_path, as_attachment=True, download_name="optimized.pdf",
+                         mimetype='application/pdf')
+    response.headers.update(inline_headers(response_data, original_size, output_path))
+    if remove:
+        # Sent once and gone - nothing waits on disk for a /download. Close callbacks
+        # only run when Werkzeug iterates the body itself, not on direct passthrough
+        response.direct_passthrough = False
+        response.call_on_close(lambda: remove_quietly(output_path))
+    return response
 
-# Initialize Sage's optimizer
-optimizer = SageWebPDFOptimizer()
+def enqueue_spool_job(file, quality, encoder, encoder_options, output_format, method, inline=False,
+                      profile=False, scan_cleanup=()):
+    """
+    Worker mode: write the upload into the spool and queue it for pdf_worker.py
+    """
+    if spool.backlog() >= MAX_BACKLOG:
+        return server_busy_response(SPOOL_RETRY_AFTER)
+    
+    job_id = str(uuid.uuid4())
+    input_path = spool.input_path(job_id)
+    file.save(input_path)
+    original_size = os.path.getsize(input_path)
+    
+    settings = optimizer.compression_settings.get(quality, optimizer.compression_settings["balanced"])
+    try:
+        cost = estimate_job_cost(input_path, settings["resolution"])
+    except Exception as e:
+        os.unlink(input_path)
+        return jsonify({"error": f"Could not read PDF: {str(e)}"}), 400
+    
+    spool.enqueue(job_id, "optimize", quality, secure_filename(file.filename),
+                  options={"encoder": encoder, "encoder_options": encoder_options,
+                           "output_format": output_format, "method": method, "profile": profile,
+                           "scan_cleanup": list(scan_cleanup)},
+                  client=client_key(request), total_pages=cost.pages)
+    app.config['LAST_JOB_ID'] = job_id
+    
+    accepted = jsonify({
+        "success": True,
+        "job_id": job_id,
+        "events_url": f"/jobs/{job_id}/events",
+        "status_url": f"/jobs/{job_id}"
+    }), 202
+    if wants_async() and not inline:
+        return accepted
+    
+    # Synchronous clients wait for a worker to finish, as they always have
+    state = spool.wait_for_result(job_id, SPOOL_RESULT_TIMEOUT)
+    if state is None:
+        return accepted
+    event, data = state
+    if event == "error":
+        return jsonify({"error": data["error"]}), 500
+    if event == "cancelled":
+        return jsonify({"error": f"Job cancelled: {data['reason']}", "cancelled": True}), 409
+    if inline:
+        # The spool keeps its copy until expiry, as for any finished job
+        return inline_pdf_response(data, original_size, spool.output_path(job_id))
+    return jsonify(data)
 
 @app.route('/optimize', methods=['POST'])
 def optimize_pdf():
@@ -150,51 +201,186 @@ def optimize_pdf():
         
         file = request.files['pdf_file']
         quality = request.form.get('quality', 'balanced')
+        encoder = request.form.get('encoder', 'jpeg')
+        output_format = request.form.get('output_format', 'standard')
+        method = request.form.get('method', 'page-to-images')
+        
+        # Engine modules load on first use (or in the background warm-up)
+        from page_encoders import available_encoders
+        from pdf_output import OUTPUT_FORMATS
+        from scan_cleanup import parse_scan_cleanup
         
         if file.filename == '':
             return jsonify({"error": "No file selected"}), 400
         
+        if encoder not in available_encoders():
+            return jsonify({"error": f"Unknown encoder - choose from: {', '.join(available_encoders())}"}), 400
+        
+        encoder_options, options_error = parse_encoder_options(request.form, encoder)
+        if options_error:
+            return jsonify({"error": options_error}), 400
+        
+        if output_format not in OUTPUT_FORMATS:
+            return jsonify({"error": f"Unknown output format - choose from: {', '.join(OUTPUT_FORMATS)}"}), 400
+        
+        if method not in OPTIMIZE_METHODS:
+            return jsonify({"error": f"Unknown method - choose from: {', '.join(OPTIMIZE_METHODS)}"}), 400
+        
+        scan_cleanup, cleanup_error = parse_scan_cleanup(request.form.get('scan_cleanup', ''))
+        if cleanup_error:
+            return jsonify({"error": cleanup_error}), 400
+        
         # Validate file type
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({"error": "File must be a PDF"}), 400
         
+        profile = wants_profile()
+        if profile:
+            # Profiling is for admins only
+            profile_error = check_profile_token(request.headers.get(PROFILE_TOKEN_HEADER))
+            if profile_error:
+                return jsonify({"error": profile_error}), 403
+        
+        inline = wants_inline()
+        
+        # Small inline jobs are optimized right here - no spool write, no second hop
+        if spool and not (inline and (request.content_length or 0) <= INLINE_MAX_BYTES):
+            return enqueue_spool_job(file, quality, encoder, encoder_options, output_format, method, inline,
+                                     profile, scan_cleanup)
+        
         # Save uploaded file temporarily
         input_fd, input_path = tempfile.mkstemp(suffix='.pdf', prefix='input_')
         os.close(input_fd)
         file.save(input_path)
+        original_size = os.path.getsize(input_path)
         
-        # Apply Sage's compression algorithm
-        success, output_path, stats, error = optimizer.optimize_pdf(input_path, quality)
-        
-        # Cleanup input file
-        os.unlink(input_path)
+        # Price the job and wait for room in the memory budget
+        settings = optimizer.compression_settings.get(quality, optimizer.compression_settings["balanced"])
+        try:
+            cost = estimate_job_cost(input_path, settings["resolution"])
+        except Exception as e:
+            os.unlink(input_path)
+            return jsonify({"error": f"Could not read PDF: {str(e)}"}), 400
         
-        if not success:
-            return jsonify({"error": error}), 500
+        ticket = admission.try_admit(cost, lane=lane_for(cost.pages))
+        if ticket is None:
+            os.unlink(input_path)
+            return server_busy_response(admission.retry_after_seconds())
         
-        # Return statistics and download info
-        response_data = {
-            "success": True,
-            "message": "PDF optimized successfully using Sage's Page-to-Images algorithm!",
-            "stats": stats,
-            "download_ready": True
-        }
+        job_id = str(uuid.uuid4())
+        page_gate = page_scheduler.job(client_key(request), cost.pages)
+        profiler = JobProfiler(job_id) if profile else None
         
-        # Store output path for download (in production, use better session management)
-        app.config['LAST_OUTPUT_PATH'] = output_path
+        if wants_async() and not inline:
+            # Answer now; progress and the result arrive on /jobs/<id>/events
+            job_events.create(job_id, total_pages=cost.pages)
+            progress = ProgressReporter(job_events, job_id)
+            cancel_token = job_cancellations.register(job_id)
+            worker = threading.Thread(target=run_optimization_job,
+                                      args=(job_id, input_path, quality, ticket, progress,
+                                            encoder, encoder_options, output_format, cancel_token,
+                                            page_gate, method, profiler, scan_cleanup),
+                                      daemon=True)
+            worker.start()
+            return jsonify({
+                "success": True,
+                "job_id": job_id,
+                "events_url": f"/jobs/{job_id}/events",
+                "status_url": f"/jobs/{job_id}"
+            }), 202
         
-        return jsonify(response_data)
+        # Apply Sage's compression algorithm
+        status, response_data = run_optimization_job(job_id, input_path, quality, ticket,
+                                                     encoder=encoder, encoder_options=encoder_options,
+                                                     output_format=output_format, page_gate=page_gate,
+                                                     method=method, profiler=profiler,
+                                                     scan_cleanup=scan_cleanup)
+        if inline and status == 200:
+            # Streamed here instead of waiting for /download
+            output_path = job_outputs.pop(job_id)
+            if app.config.get('LAST_OUTPUT_PATH') == output_path:
+                app.config.pop('LAST_OUTPUT_PATH')
+            return inline_pdf_response(response_data, original_size, output_path, remove=True)
+        return jsonify(response_data), status
         
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_progress_events(job_id):
+    """
+    Server-Sent Events stream of real progress for an async job
+    """
+    if job_events.get(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    
+    # When the last subscriber goes away for good, nobody wants the result
+    frames = job_cancellations.watch_stream(job_id, job_events.stream(job_id))
+    return Response(frames, mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Latest progress or result for a job
+    """
+    state = job_events.get(job_id)
+    if state is None:
+        return jsonify({"error": "Unknown job"}), 404
+    
+    event, data = state
+    return jsonify(dict(data, event=event))
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job - it stops before its next page
+    """
+    if job_cancellations.cancel(job_id, "cancelled by client"):
+        return jsonify({"success": True, "job_id": job_id, "cancelling": True}), 202
+    
+    state = job_events.get(job_id)
+    if state is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({"error": "Job has already finished", "event": state[0]}), 409
+
+@app.route('/jobs/<job_id>/profile', methods=['GET'])
+def job_profile(job_id):
+    """
+    A profiled job's report, or its cProfile data with ?format=pstats (admin token required)
+    """
+    error = check_profile_token(request.headers.get(PROFILE_TOKEN_HEADER))
+    if error:
+        return jsonify({"error": error}), 403
+    
+    directory = spool_profile_dir(spool) if spool else PROFILE_DIR
+    report = load_profile(directory, job_id)
+    if report is None:
+        return jsonify({"error": "No profile for this job"}), 404
+    if request.args.get('format') == 'pstats':
+        pstats_path = profile_paths(directory, job_id)[1]
+        if not os.path.exists(pstats_path):
+            return jsonify({"error": "This job's profile has no cProfile data", "note": report.get("note")}), 404
+        return send_file(pstats_path, as_attachment=True, download_name=f"profile_{job_id}.prof",
+                         mimetype='application/octet-stream')
+    return jsonify(report)
+
 @app.route('/download', methods=['GET'])
-def download_optimized_pdf():
+@app.route('/download/<job_id>', methods=['GET'])
+def download_optimized_pdf(job_id=None):
     """
     Download the optimized PDF file
     """
     try:
-        output_path = app.config.get('LAST_OUTPUT_PATH')
+        if spool:
+            job = spool.job(job_id or app.config.get('LAST_JOB_ID', ''))
+            output_path = spool.output_path(job["job_id"]) if job and job["status"] == "done" else None
+        elif job_id:
+            output_path = job_outputs.get(job_id)
+        else:
+            output_path = app.config.get('LAST_OUTPUT_PATH')
         if not output_path or not os.path.exists(output_path):
             return jsonify({"error": "No optimized file available"}), 404
         
@@ -212,11 +398,32 @@ def health_check():
     """
     Health check endpoint
     """
-    return jsonify({
+    health = {
         "status": "healthy",
         "message": "Sage's PDF Optimizer Backend Ready!",
         "compression_method": "Page-to-Images Algorithm",
-        "created_by": "Nexus, using Sage's proven technology"
+        "created_by": "Nexus, using Sage's proven technology",
+        "methods": list(OPTIMIZE_METHODS),
+        "load": admission.snapshot(),
+        "warm_up": warm_up.report()
+    }
+    # Engine details once it has loaded - a health check never waits for PyMuPDF
+    if warm_up.ready.is_set() or not WARM_UP:
+        from page_encoders import available_encoders
+        from page_quality import QUALITY_TARGET_LIMITS, targets_available
+        health["encoders"] = list(available_encoders())
+        health["quality_targets"] = list(QUALITY_TARGET_LIMITS) if targets_available() else []
+    return jsonify(health)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Scheduler metrics: per-lane queue waits for admission and page permits
+    """
+    return jsonify({
+        "admission": admission.snapshot(),
+        "scheduler": page_scheduler.snapshot(),
+        "spool": spool.lane_snapshot() if spool else None
     })
 
 if __name__ == '__main__':
@@ -225,11 +432,10 @@ if __name__ == '__main__':
     print("🌐 Created by Nexus for cross-platform access")
     print("✨ AI Dream Team Collaboration in Action!")
     
-    # Check if PyMuPDF is available
-    try:
-        import fitz
+    # Check if PyMuPDF is available - without paying for the import up front
+    if importlib.util.find_spec("fitz") is not None:
         print("✅ PyMuPDF (fitz) available - Sage's compression ready!")
-    except ImportError:
+    else:
         print("❌ PyMuPDF not installed. Install with: pip install PyMuPDF")
         exit(1)
     
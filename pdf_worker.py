@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+⚙️ PDF Optimizer Pro - Spool Worker
+Runs Sage's Page-to-Images compression for jobs queued in a shared spool
+
+Start the front ends with PDF_OPTIMIZER_SPOOL_DIR pointing at shared storage,
+then run any number of workers on any host that mounts the same directory:
+
+    python pdf_worker.py --spool /mnt/pdf-spool --processes 4 --fast-lane 1
+
+Each worker process claims one job at a time under a lease, renews the lease
+from a heartbeat thread while the page loop runs, and writes the optimized PDF
+and result back into the spool. If a worker dies its lease expires and the job
+is requeued for someone else, who resumes after the pages the first worker
+checkpointed instead of starting again at page 1. A worker that only stalled
+writes to its own file in outputs/ and cannot overwrite the new owner's.
+"""
+
+import argparse
+import contextlib
+import multiprocessing
+import os
+import shutil
+import sys
+import threading
+import time
+
+from job_cancellation import SpoolCancellationToken
+from job_events import ProgressReporter
+from job_profiler import JobProfiler, spool_profile_dir, with_profile_url
+from page_checkpoint import PageCheckpoint
+from spool_queue import SpoolQueue, DEFAULT_LEASE_SECONDS, make_worker_id
+
+IDLE_POLL_INTERVAL = 1.0
+PURGE_AFTER = 3600  # Finished jobs and their files are kept for an hour
+
+
+class LeaseHeartbeat:
+    """
+    Renews a job lease in the background until stopped. When the lease is
+    lost, cancel_token is tripped so the page loop stops within one page
+    instead of rendering on into the checkpoint the new owner resumes from.
+    """
+
+    def __init__(self, spool, job_id, worker_id, lease_seconds, cancel_token=None):
+        self.spool = spool
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.cancel_token = cancel_token
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            if not self.spool.heartbeat(self.job_id, self.worker_id, self.lease_seconds):
+                self.lost = True
+                if self.cancel_token:
+                    self.cancel_token.cancel("lease lost to another worker")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_spool_job(spool, job, cancel_token=None):
+    """
+    Compress one claimed job with the engine its front end asked for
+    Returns: (success, result_or_error)
+    """
+    job_id = job["job_id"]
+    input_path = spool.input_path(job_id)
+    # Moved to spool.output_path() by spool.complete(), if the job is still ours
+    output_path = spool.work_path(job_id, job["worker_id"])
+    progress = ProgressReporter(spool.worker_events(job["worker_id"]), job_id)
+    # Admin-requested profiling; the front ends serve it from the spool's profiles folder
+    profiler = JobProfiler(job_id, spool_profile_dir(spool)) if job["options"].get("profile") else None
+    engine_progress = profiler.wrap(progress) if profiler else progress
+    # A requeued job's last progress event says how far the previous attempt got
+    checkpoint = PageCheckpoint(spool.checkpoint_dir(job_id),
+                                previous_pages_done=job["data"].get("pages_done", 0))
+
+    if job["engine"] == "optimize":
+        from sage_optimizer import optimizer, build_optimize_result
+
+        with profiler or contextlib.nullcontext():
+            success, temp_output, stats, error = optimizer.optimize_pdf(
+                input_path, job["quality"], progress=engine_progress,
+                encoder=job["options"].get("encoder", "jpeg"),
+                encoder_options=job["options"].get("encoder_options"),
+                output_format=job["options"].get("output_format", "standard"),
+                checkpoint=checkpoint, cancel_token=cancel_token,
+                method=job["options"].get("method", "page-to-images"),
+                scan_cleanup=tuple(job["options"].get("scan_cleanup", ())))
+        save_profile(profiler, success, cancel_token, stats)
+        if not success:
+            return False, error
+        shutil.move(temp_output, output_path)
+        return True, with_profile_url(build_optimize_result(job_id, stats), job_id, profiler)
+
+    if job["engine"] == "compress":
+        from sage_compression import run_sage_compression, build_compression_result
+
+        original_size = os.path.getsize(input_path)
+        stats = {}
+        with profiler or contextlib.nullcontext():
+            success = run_sage_compression(input_path, output_path, job["quality"],
+                                           progress=engine_progress,
+                                           output_format=job["options"].get("output_format", "standard"),
+                                           checkpoint=checkpoint, cancel_token=cancel_token, stats=stats,
+                                           scan_cleanup=tuple(job["options"].get("scan_cleanup", ())))
+        save_profile(profiler, success, cancel_token, stats)
+        if not success:
+            return False, "Compression failed"
+        stats.update(checkpoint.report())
+        return True, with_profile_url(build_compression_result(job_id, original_size, output_path, stats),
+                                      job_id, profiler)
+
+    return False, f"Unknown engine: {job['engine']}"
+
+
+def save_profile(profiler, success, cancel_token, stats):
+    if profiler:
+        cancelled = not success and cancel_token is not None and cancel_token.cancelled
+        profiler.save("complete" if success else "cancelled" if cancelled else "failed", stats)
+
+
+def worker_loop(spool_dir, lease_seconds, max_jobs=None, fast_lane_only=False):
+    """
+    Claim and process jobs until interrupted (or max_jobs are done)
+    fast_lane_only: only take small documents, keeping this process free for them
+    """
+    spool = SpoolQueue(spool_dir)
+    worker_id = make_worker_id()
+    processed = 0
+    lane = " (fast lane)" if fast_lane_only else ""
+    print(f"⚙️ Worker {worker_id}{lane} watching {spool.spool_dir}")
+
+    while max_jobs is None or processed < max_jobs:
+        job = spool.claim(worker_id, lease_seconds, fast_lane_only)
+        if job is None:
+            time.sleep(IDLE_POLL_INTERVAL)
+            continue
+
+        print(f"🎨 {worker_id} compressing {job['filename']} ({job['job_id']}, attempt {job['attempts']})")
+        cancel_token = SpoolCancellationToken(spool, job["job_id"])
+        with LeaseHeartbeat(spool, job["job_id"], worker_id, lease_seconds, cancel_token) as heartbeat:
+            try:
+                success, outcome = run_spool_job(spool, job, cancel_token)
+            except Exception as e:
+                success, outcome = False, f"Worker error: {str(e)}"
+
+        # Each finish only takes effect while the job is still ours
+        work_path = spool.work_path(job["job_id"], worker_id)
+        if heartbeat.lost:
+            owned = False
+        elif not success and cancel_token.cancelled:
+            owned = spool.finish_cancelled(job["job_id"], worker_id, cancel_token.reason)
+            if owned:
+                if os.path.exists(spool.input_path(job["job_id"])):
+                    os.remove(spool.input_path(job["job_id"]))
+                print(f"🛑 {job['job_id']} cancelled: {cancel_token.reason}")
+        elif success:
+            owned = spool.complete(job["job_id"], worker_id, outcome, work_path)
+            if owned:
+                os.remove(spool.input_path(job["job_id"]))
+                print(f"✅ {job['job_id']} done")
+        else:
+            owned = spool.fail(job["job_id"], worker_id, outcome)
+            if owned:
+                print(f"❌ {job['job_id']} failed: {outcome}")
+
+        if owned:
+            PageCheckpoint(spool.checkpoint_dir(job["job_id"])).discard()
+        else:
+            # Another worker owns the job now - its result wins
+            print(f"⚠️ {worker_id} lost the lease on {job['job_id']}, discarding result")
+        if os.path.exists(work_path):
+            os.remove(work_path)
+
+        processed += 1
+        spool.purge(PURGE_AFTER)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF Optimizer Pro spool worker")
+    parser.add_argument("--spool", default=os.environ.get("PDF_OPTIMIZER_SPOOL_DIR"),
+                        help="shared spool directory (default: $PDF_OPTIMIZER_SPOOL_DIR)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="worker processes on this host (default: CPU count)")
+    parser.add_argument("--lease", type=float, default=DEFAULT_LEASE_SECONDS,
+                        help="job lease in seconds, renewed every lease/3")
+    parser.add_argument("--fast-lane", type=int, default=0,
+                        help="processes (of --processes) reserved for small documents")
+    args = parser.parse_args()
+
+    if not args.spool:
+        parser.error("--spool or PDF_OPTIMIZER_SPOOL_DIR is required")
+    if not 0 <= args.fast_lane < args.processes:
+        parser.error("--fast-lane must leave at least one process for other jobs")
+
+    print("⚙️ PDF Optimizer Pro - Spool Worker")
+    print(f"🔧 {args.processes} process(es) running Sage's Page-to-Images algorithm")
+
+    if args.processes == 1:
+        worker_loop(args.spool, args.lease)
+        return
+
+    workers = [multiprocessing.Process(target=worker_loop,
+                                       args=(args.spool, args.lease, None, n < args.fast_lane))
+               for n in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
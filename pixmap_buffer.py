@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+♻️ PDF Optimizer Pro - Reusable Pixmap Buffers
+Rendering every page of a job into the same block of memory
+
+page.get_pixmap() allocates a fresh multi-megabyte sample buffer for every
+page and frees it when the pixmap is dropped. Over a 1,000-page job that is
+a thousand large allocations of slightly different sizes: the allocator
+fragments and the process keeps its high-water RSS long after the job.
+
+A PixmapBuffer is allocated once per job (or wraps a render_pipeline ring
+slot), sized to the job's largest page at its matrix - RGB, no alpha - and
+each page is drawn into it with MuPDF's draw device, exactly as get_pixmap()
+would draw it. Only the pixmap header is new per page. A pixmap from
+render() is valid until the next render() call.
+
+OutputBuffer does the same for the encoders' output: one BytesIO that keeps
+its allocation from page to page.
+
+Rendering into a buffer needs PyMuPDF's rebased bindings (pymupdf.mupdf,
+PyMuPDF 1.24 and later); older builds fall back to get_pixmap().
+PDF_OPTIMIZER_REUSE_PIXMAPS=0 switches reuse off, e.g. to compare memory use
+with benchmark_optimizer.py --suite memory.
+"""
+
+import io
+import os
+
+import fitz
+
+try:
+    from pymupdf import mupdf
+except ImportError:
+    mupdf = None
+
+REUSE_PIXMAPS = os.environ.get("PDF_OPTIMIZER_REUSE_PIXMAPS", "1") not in ("0", "false")
+
+
+def reuse_available():
+    return mupdf is not None and REUSE_PIXMAPS
+
+
+def largest_render_bytes(doc, matrix):
+    """Samples in the largest page's RGB render (with a pixel of rounding room each way)"""
+    largest = 0
+    for page in doc:
+        rect = (page.rect * matrix).irect
+        largest = max(largest, (rect.width + 1) * (rect.height + 1) * 3)
+    return largest
+
+
+class PixmapBuffer:
+    """One preallocated RGB sample buffer that pages are rendered into in turn"""
+
+    def __init__(self, doc, matrix, buffer=None, size=None):
+        self.matrix = matrix
+        self.size = size or largest_render_bytes(doc, matrix)
+        self.reusing = reuse_available()
+        self.buffer = None
+        self.fallback_pages = 0
+        if self.reusing:
+            self.buffer = buffer if buffer is not None else bytearray(self.size)
+            self._samples = mupdf.python_mutable_buffer_data(self.buffer)
+            self._ctm = mupdf.FzMatrix(*matrix)
+
+    def render(self, page):
+        """page rendered at the buffer's matrix, as a fitz.Pixmap over the shared samples"""
+        if not self.reusing:
+            return page.get_pixmap(matrix=self.matrix)
+
+        fz_page = page.this
+        bbox = mupdf.fz_round_rect(mupdf.fz_transform_rect(mupdf.fz_bound_page(fz_page), self._ctm))
+        width, height = bbox.x1 - bbox.x0, bbox.y1 - bbox.y0
+        if width * height * 3 > self.size:
+            self.fallback_pages += 1
+            return page.get_pixmap(matrix=self.matrix)
+
+        # Page space -> pixmap space, with the page's corner at the buffer's start
+        ctm = mupdf.fz_concat(self._ctm, mupdf.fz_translate(-bbox.x0, -bbox.y0))
+        pixmap = mupdf.fz_new_pixmap_with_data(mupdf.fz_device_rgb(), width, height,
+                                               mupdf.FzSeparations(), 0, width * 3, self._samples)
+        mupdf.fz_clear_pixmap_with_value(pixmap, 255)
+        device = mupdf.fz_new_draw_device(mupdf.FzMatrix(), pixmap)
+        try:
+            mupdf.fz_run_page(fz_page, device, ctm, mupdf.FzCookie())
+        finally:
+            mupdf.fz_close_device(device)
+        return fitz.Pixmap("raw", pixmap)
+
+    def report(self):
+        """Summary for the job's stats"""
+        report = {
+            "pixmap_reuse": self.reusing,
+            "pixmap_buffer_mb": round(self.size / (1024 * 1024), 1) if self.reusing else None
+        }
+        if self.fallback_pages:
+            report["pixmap_fallback_pages"] = self.fallback_pages
+        return report
+
+
+class OutputBuffer:
+    """A BytesIO that keeps its allocation between pages"""
+
+    def __init__(self):
+        self._io = io.BytesIO()
+
+    def start(self):
+        """The buffer, rewound, to save one image into"""
+        self._io.seek(0)
+        return self._io
+
+    def take(self):
+        """Bytes written since start()"""
+        with self._io.getbuffer() as view:
+            return bytes(view[:self._io.tell()])
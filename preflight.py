@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+🔎 PDF Optimizer Pro - Pre-flight Savings Check
+Predicting whether Page-to-Images will shrink a PDF before paying for it
+
+A few pages spread through the document are rendered and encoded exactly as
+the real job would. Each sampled page's share of the input is estimated from
+the bytes of the images it draws plus an even share of everything else (text,
+fonts, vector art) - so a file that is already mostly well-compressed images
+is judged by those images, not by its page count. When the predicted saving
+is below MIN_PREDICTED_SAVINGS the job is skipped and the original returned.
+
+Documents with no more pages than SAMPLE_PAGES are not sampled: encoding
+every page twice would cost more than it saves, and the never-larger check
+after saving catches them anyway.
+"""
+
+import os
+import shutil
+import time
+
+SAMPLE_PAGES = 5
+
+# Skip the job when sampling predicts a smaller saving than this (percent)
+MIN_PREDICTED_SAVINGS = float(os.environ.get("PDF_OPTIMIZER_MIN_PREDICTED_SAVINGS", "5"))
+
+
+def sample_page_numbers(total_pages, samples=SAMPLE_PAGES):
+    """Evenly spread page numbers, always including the first page"""
+    if total_pages <= samples:
+        return list(range(total_pages))
+    step = total_pages / samples
+    return sorted({int(i * step) for i in range(samples)})
+
+
+def image_bytes(doc):
+    """{xref: stored length} of every image XObject in the document"""
+    sizes = {}
+    for xref in range(1, doc.xref_length()):
+        if doc.xref_get_key(xref, "Subtype")[1] != "/Image":
+            continue
+        kind, length = doc.xref_get_key(xref, "Length")
+        if kind == "xref":
+            # /Length 12 0 R - the length lives in its own object
+            length = doc.xref_object(int(length.split()[0]))
+            kind = "int" if length.strip().isdigit() else kind
+        sizes[xref] = int(length) if kind == "int" else 0
+    return sizes
+
+
+def predict_savings(doc, input_size, encode_page):
+    """
+    encode_page(page) returns the bytes the job would write for that page.
+    Returns a report dict, or None when the document is too short to sample.
+    """
+    total_pages = len(doc)
+    if total_pages <= SAMPLE_PAGES:
+        return None
+
+    start = time.perf_counter()
+    images = image_bytes(doc)
+    image_total = sum(images.values())
+    other_per_page = max(input_size - image_total, 0) / total_pages
+
+    sampled_input = 0.0
+    sampled_output = 0
+    pages = sample_page_numbers(total_pages)
+    for page_num in pages:
+        page = doc[page_num]
+        page_images = {item[0] for item in page.get_images(full=True)}
+        sampled_input += other_per_page + sum(images.get(xref, 0) for xref in page_images)
+        sampled_output += encode_page(page)
+
+    predicted_size = int(sampled_output / max(sampled_input, 1) * input_size)
+    return {
+        "sampled_pages": len(pages),
+        "image_byte_share": round(image_total / max(input_size, 1), 3),
+        "predicted_size_mb": round(predicted_size / (1024 * 1024), 2),
+        "predicted_savings": round((1 - predicted_size / max(input_size, 1)) * 100, 1),
+        "preflight_seconds": round(time.perf_counter() - start, 2)
+    }
+
+
+def worth_optimizing(report, threshold=MIN_PREDICTED_SAVINGS):
+    """(True, None) to go ahead, or (False, reason) to return the original"""
+    if report is None or report["predicted_savings"] >= threshold:
+        return True, None
+    return False, (f"pre-flight predicted {report['predicted_savings']}% savings "
+                   f"(threshold {threshold}%) - returned the original file")
+
+
+def never_larger(input_path, output_path):
+    """
+    Replace output with a copy of the input unless it is smaller.
+    Returns None if the output was kept, else the reason it was replaced.
+    """
+    input_size = os.path.getsize(input_path)
+    output_size = os.path.getsize(output_path)
+    if output_size < input_size:
+        return None
+
+    shutil.copyfile(input_path, output_path)
+    return (f"optimized file ({output_size / (1024 * 1024):.2f} MB) was not smaller than "
+            f"the input ({input_size / (1024 * 1024):.2f} MB) - returned the original file")
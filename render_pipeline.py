@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+🏭 PDF Optimizer Pro - Render/Encode Pipeline
+Rendering and encoding one job's pages at the same time, in separate processes
+
+In the page loop get_pixmap() and the JPEG encode take turns on one core.
+With the pipeline switched on, a job runs as three stages instead:
+
+🖨️ Renderer processes open the PDF themselves, take a free slot of a ring
+   of multiprocessing.shared_memory blocks and render the page they are
+   handed straight into it (a pixmap_buffer.PixmapBuffer over the slot)
+🖼️ Encoder processes fingerprint, blank-check and encode straight out of the
+   slot - only (page, slot, width, height) crosses the process boundary,
+   never the pixels - then hand the slot back and send the encoded bytes on
+📚 The job's own process assembles the PDF in page order, as before
+
+The ring is the backpressure: when every slot holds a page waiting to be
+encoded, renderers wait for one to free up, so memory stays at slots x the
+largest page however far ahead rendering gets.
+
+    PDF_OPTIMIZER_RENDER_PROCESSES=2 PDF_OPTIMIZER_ENCODE_PROCESSES=2 python pdf_optimizer_backend.py
+
+Off by default (both 0): every job then gets its own processes, so it pays
+off when a server runs few large jobs at once, not many small ones.
+Documents shorter than MIN_PIPELINE_PAGES always use the plain page loop.
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+
+import fitz
+
+from page_encoders import make_encoder
+from page_fingerprint import fingerprint, blank_colour
+from pixmap_buffer import PixmapBuffer, largest_render_bytes, reuse_available
+
+RENDER_PROCESSES = int(os.environ.get("PDF_OPTIMIZER_RENDER_PROCESSES", "0"))
+ENCODE_PROCESSES = int(os.environ.get("PDF_OPTIMIZER_ENCODE_PROCESSES", "0"))
+
+# Ring slots; 0 means one per process plus one spare
+PIPELINE_SLOTS = int(os.environ.get("PDF_OPTIMIZER_PIPELINE_SLOTS", "0"))
+
+# Shorter documents don't repay starting the processes
+MIN_PIPELINE_PAGES = 8
+
+# How often the assembler checks that its processes are still alive
+LIVENESS_INTERVAL = 1.0
+
+
+def pipeline_configured():
+    return RENDER_PROCESSES > 0 and ENCODE_PROCESSES > 0
+
+
+def pipeline_usable(total_pages):
+    """(True, None) when a job of total_pages should use the pipeline, else (False, reason)"""
+    if not pipeline_configured():
+        return False, None
+    if total_pages < MIN_PIPELINE_PAGES:
+        return False, f"fewer than {MIN_PIPELINE_PAGES} pages"
+    if multiprocessing.current_process().daemon:
+        return False, "daemon processes cannot start the pipeline's processes"
+    return True, None
+
+
+class SharedPixmap:
+    """Just enough of fitz.Pixmap for page_encoders and page_fingerprint, over a ring slot"""
+
+    def __init__(self, buffer, width, height, n, stride):
+        self.width = width
+        self.height = height
+        self.n = n
+        self.stride = stride
+        self.samples_mv = buffer[:height * stride]
+
+    def tobytes(self, output, jpg_quality=95):
+        # JPEG fallback when Pillow is missing: PyMuPDF needs a real pixmap
+        colorspace = fitz.csGRAY if self.n == 1 else fitz.csRGB
+        pix = fitz.Pixmap(colorspace, self.width, self.height, bytes(self.samples_mv), False)
+        return pix.tobytes(output, jpg_quality=jpg_quality)
+
+    def release(self):
+        self.samples_mv.release()
+
+
+def attach(names):
+    """Open the ring's shared memory blocks in a pipeline process"""
+    return [shared_memory.SharedMemory(name=name) for name in names]
+
+
+def detach(blocks):
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass  # A view is still alive; the OS reclaims it at exit
+
+
+def render_worker(input_path, resolution, slot_names, slot_size, tasks, free_slots, ready, results):
+    """Render each page number from tasks into a free slot, until None"""
+    blocks = attach(slot_names)
+    doc = fitz.open(input_path)
+    matrix = fitz.Matrix(resolution, resolution)
+    slots = [PixmapBuffer(doc, matrix, block.buf, slot_size) for block in blocks]
+    render_seconds = 0.0
+    slot_wait = 0.0
+    try:
+        while True:
+            page_num = tasks.get()
+            if page_num is None:
+                break
+
+            start = time.perf_counter()
+            slot = free_slots.get()
+            slot_wait += time.perf_counter() - start
+
+            start = time.perf_counter()
+            pix = slots[slot].render(doc[page_num])
+            if not slots[slot].reusing:
+                # Old PyMuPDF: render, then copy the samples into the slot
+                samples = pix.samples_mv
+                if len(samples) > slot_size:
+                    free_slots.put(slot)
+                    raise ValueError(f"page {page_num + 1} is larger than a pipeline slot")
+                blocks[slot].buf[:len(samples)] = samples
+            elif slots[slot].fallback_pages:
+                free_slots.put(slot)
+                raise ValueError(f"page {page_num + 1} is larger than a pipeline slot")
+            render_seconds += time.perf_counter() - start
+
+            ready.put((page_num, slot, pix.width, pix.height, pix.n, pix.stride))
+            pix = None
+    except Exception as e:
+        results.put(("error", None, f"render failed: {str(e)}"))
+    finally:
+        slots = None
+        doc.close()
+        detach(blocks)
+    results.put(("rendered", None, {"render_seconds": render_seconds, "slot_wait_seconds": slot_wait}))
+
+
+def encode_worker(encoder_name, jpeg_quality, encoder_options, slot_names, free_slots, ready, results):
+    """Encode each page waiting in the ring, until None"""
+    blocks = attach(slot_names)
+    page_encoder = make_encoder(encoder_name, jpeg_quality, **(encoder_options or {}))
+    # Fingerprint -> first page this process saw it on; later copies needn't be encoded
+    first_seen = {}
+    try:
+        while True:
+            item = ready.get()
+            if item is None:
+                break
+            page_num, slot, width, height, n, stride = item
+
+            pix = SharedPixmap(blocks[slot].buf, width, height, n, stride)
+            try:
+                key = fingerprint(pix)
+                colour = blank_colour(pix)
+                encoded = None
+                # A copy of an earlier page is assembled as a duplicate of it
+                if colour is None and first_seen.get(key, page_num) >= page_num:
+                    encoded = page_encoder.encode(pix)
+                first_seen[key] = min(first_seen.get(key, page_num), page_num)
+            finally:
+                pix.release()
+                free_slots.put(slot)
+            results.put(("page", page_num, (key, colour, encoded)))
+    except Exception as e:
+        results.put(("error", None, f"encode failed: {str(e)}"))
+    finally:
+        detach(blocks)
+    results.put(("encoded", None, (page_encoder.pages, page_encoder.report())))
+
+
+def merge_encoder_reports(reports):
+    """One encoder summary from each encoder process's (pages, report)"""
+    total_pages = sum(pages for pages, _ in reports)
+    merged = {}
+    for pages, report in reports:
+        for key, value in report.items():
+            if key == "mean_jpeg_quality":
+                merged[key] = merged.get(key, 0) + value * pages / max(total_pages, 1)
+            elif key == "jpeg_quality_range":
+                low, high = merged.get(key, value)
+                merged[key] = [min(low, value[0]), max(high, value[1])]
+            elif key == "quality_target":
+                # The same target in every process, not a count
+                merged.setdefault(key, value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+            elif isinstance(value, dict) and all(isinstance(v, (int, float)) for v in value.values()):
+                totals = merged.setdefault(key, {})
+                for name, number in value.items():
+                    totals[name] = totals.get(name, 0) + number
+            else:
+                merged.setdefault(key, value)
+
+    for key, value in merged.items():
+        if isinstance(value, float):
+            merged[key] = round(value, 1 if key == "mean_jpeg_quality" else 2)
+        elif isinstance(value, dict):
+            merged[key] = {name: round(v, 2) if isinstance(v, float) else v for name, v in value.items()}
+    return merged
+
+
+class RenderPipeline:
+    """
+    One job's renderer and encoder processes and their shared-memory ring.
+
+        with RenderPipeline(path, doc, resolution, "jpeg", 85, options) as pipeline:
+            for page_num, key, colour, encoded in pipeline.pages(page_numbers):
+                ...
+
+    encoded is None for blank pages and for repeats of an earlier page.
+    """
+
+    def __init__(self, input_path, doc, resolution, encoder_name, jpeg_quality, encoder_options,
+                 render_processes=None, encode_processes=None, slots=None):
+        self.input_path = input_path
+        self.resolution = resolution
+        self.encoder_name = encoder_name
+        self.jpeg_quality = jpeg_quality
+        self.encoder_options = encoder_options
+        self.render_processes = render_processes or RENDER_PROCESSES
+        self.encode_processes = encode_processes or ENCODE_PROCESSES
+        self.slots = slots or PIPELINE_SLOTS or self.render_processes + self.encode_processes + 1
+        self.slot_size = largest_render_bytes(doc, fitz.Matrix(resolution, resolution))
+        self.blocks = []
+        self.processes = []
+        self.finished = False
+        self.render_stats = []
+        self.encoder_reports = []
+
+    def __enter__(self):
+        # spawn: the job may be running on a thread of a threaded server
+        context = multiprocessing.get_context("spawn")
+        self.tasks = context.Queue()
+        self.free_slots = context.Queue()
+        self.ready = context.Queue()
+        self.results = context.Queue()
+
+        try:
+            for slot in range(self.slots):
+                self.blocks.append(shared_memory.SharedMemory(create=True, size=self.slot_size))
+                self.free_slots.put(slot)
+            names = [block.name for block in self.blocks]
+
+            for _ in range(self.render_processes):
+                self.processes.append(context.Process(
+                    target=render_worker, daemon=True,
+                    args=(self.input_path, self.resolution, names, self.slot_size,
+                          self.tasks, self.free_slots, self.ready, self.results)))
+            for _ in range(self.encode_processes):
+                self.processes.append(context.Process(
+                    target=encode_worker, daemon=True,
+                    args=(self.encoder_name, self.jpeg_quality, self.encoder_options, names,
+                          self.free_slots, self.ready, self.results)))
+            for process in self.processes:
+                process.start()
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def pages(self, page_numbers, page_gate=None):
+        """
+        Yield (page_num, fingerprint, blank colour, EncodedImage or None) in
+        page order. With a page_gate (job_scheduler.ScheduledJob), every page
+        handed to the processes holds a page permit until its result is back,
+        so the pipeline's processes are fair-scheduled like the page loop.
+        """
+        page_numbers = iter(page_numbers)
+        order = []
+        waiting = {}
+        permits = {}
+        in_flight = 0
+        exhausted = False
+        # Taken from page_numbers, still waiting for a permit
+        next_page = None
+
+        while True:
+            # Keep about a ring's worth of pages handed out
+            while not exhausted and in_flight < self.slots:
+                if next_page is None:
+                    next_page = next(page_numbers, None)
+                    if next_page is None:
+                        exhausted = True
+                        break
+                permit = None
+                if page_gate:
+                    # Only wait for a permit with nothing in flight - results must
+                    # keep coming back to return the permits this job holds
+                    permit = page_gate.acquire(wait=in_flight == 0)
+                    if permit is None:
+                        break
+                self.tasks.put(next_page)
+                order.append(next_page)
+                permits[next_page] = permit
+                in_flight += 1
+                next_page = None
+
+            while order and order[0] in waiting:
+                page_num = order.pop(0)
+                yield (page_num,) + waiting.pop(page_num)
+
+            if exhausted and not order:
+                return
+
+            page_num, payload = self._next_result()
+            waiting[page_num] = payload
+            in_flight -= 1
+            permit = permits.pop(page_num, None)
+            if permit is not None:
+                page_gate.release(permit)
+
+    def _next_result(self):
+        """(page_num, payload) of the next encoded page; raises if a process failed"""
+        while True:
+            try:
+                kind, page_num, payload = self.results.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                if any(not process.is_alive() for process in self.processes):
+                    raise RuntimeError("a render pipeline process exited unexpectedly")
+                continue
+            if kind == "error":
+                raise RuntimeError(payload)
+            if kind == "page":
+                return page_num, payload
+            self._record(kind, payload)
+
+    def _record(self, kind, payload):
+        if kind == "rendered":
+            self.render_stats.append(payload)
+        elif kind == "encoded":
+            self.encoder_reports.append(payload)
+
+    def _collect(self, count):
+        while count():
+            kind, _, payload = self.results.get(timeout=30)
+            if kind == "error":
+                raise RuntimeError(payload)
+            self._record(kind, payload)
+
+    def finish(self):
+        """Stop the processes after the last page and collect their stats"""
+        for _ in range(self.render_processes):
+            self.tasks.put(None)
+        self._collect(lambda: len(self.render_stats) < self.render_processes)
+        # Every page is rendered, so the encoders' sentinels queue up behind the last one
+        for _ in range(self.encode_processes):
+            self.ready.put(None)
+        self._collect(lambda: len(self.encoder_reports) < self.encode_processes)
+        self.finished = True
+
+    def close(self):
+        """Processes that finished exit by themselves; after an error or cancel they are stopped"""
+        for process in self.processes:
+            if self.finished:
+                process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def encoder_report(self):
+        return merge_encoder_reports(self.encoder_reports)
+
+    def report(self):
+        """Summary for the job's stats"""
+        return {
+            "pipeline": {
+                "render_processes": self.render_processes,
+                "encode_processes": self.encode_processes,
+                "slots": self.slots,
+                "slot_mb": round(self.slot_size / (1024 * 1024), 1),
+                "render_in_place": reuse_available(),
+                "render_seconds": round(sum(s["render_seconds"] for s in self.render_stats), 2),
+                "slot_wait_seconds": round(sum(s["slot_wait_seconds"] for s in self.render_stats), 2)
+            }
+        }
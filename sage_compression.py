@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+🖼️ PDF Optimizer Pro - Sage Compression Engine
+Sage's desktop Page-to-Images method, as web_server.py's /compress runs it
+
+Every page is rendered at 1.0x, saved as a Pillow JPEG and put back as the
+page's only content. The engine lives here rather than in web_server.py so
+that the spool workers and the ASGI front end's pool processes can run it
+without importing Flask - and without web_server.py's start-up work (asset
+cache, warm-up thread, admission controller).
+
+Uploads and results are kept in UPLOAD_FOLDER and COMPRESSED_FOLDER, which
+the front ends create with make_folders() and prune with cleanup_old_files().
+"""
+
+import os
+import shutil
+
+from job_cancellation import JobCancelled
+from preflight import predict_savings, worth_optimizing, never_larger
+
+UPLOAD_FOLDER = 'temp_uploads'
+COMPRESSED_FOLDER = 'temp_compressed'
+ALLOWED_EXTENSIONS = {'pdf'}
+
+# Sage's page-to-images renders at 1.0x and round-trips each page through
+# PNG + Pillow, so it holds roughly three pixmap-sized buffers per page
+RENDER_RESOLUTION = 1.0
+RENDER_WORKING_SET_FACTOR = 3.25
+
+def make_folders():
+    """Ensure temp directories exist"""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(COMPRESSED_FOLDER, exist_ok=True)
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def cleanup_old_files():
+    """Clean up files older than 1 hour"""
+    import time
+    current_time = time.time()
+    for folder in [UPLOAD_FOLDER, COMPRESSED_FOLDER]:
+        for filename in os.listdir(folder):
+            file_path = os.path.join(folder, filename)
+            if os.path.isfile(file_path):
+                if current_time - os.path.getctime(file_path) > 3600:  # 1 hour
+                    try:
+                        os.remove(file_path)
+                        print(f"Cleaned up old file: {filename}")
+                    except:
+                        pass
+
+def encode_sage_page(page, image_quality, pixmaps=None, output=None, cleaner=None, page_num=None):
+    """One page as Sage's JPEG: 1.0x render, RGB through Pillow
+    
+    pixmaps: optional PixmapBuffer to render into instead of a fresh pixmap
+    output: optional OutputBuffer to save the JPEG into
+    cleaner: optional ScanCleaner run on the render first (page_num names the page in its report)
+    """
+    import fitz  # PyMuPDF
+    
+    mat = fitz.Matrix(RENDER_RESOLUTION, RENDER_RESOLUTION)  # Standard resolution
+    pix = pixmaps.render(page) if pixmaps else page.get_pixmap(matrix=mat)
+    if cleaner:
+        cleaner.clean(pix, page_num)
+    return sage_jpeg(pix, image_quality, output)
+
+def sage_jpeg(pix, image_quality, output=None):
+    """A rendered page as Sage's JPEG"""
+    from page_encoders import pixmap_to_image
+    from pixmap_buffer import OutputBuffer
+    
+    # The same pixels the old PNG round trip decoded to, read in place
+    img = pixmap_to_image(pix)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    output = output or OutputBuffer()
+    img.save(output.start(), format='JPEG', quality=image_quality, optimize=True)
+    return output.take()
+
+def run_sage_compression(input_file, output_file, quality='balanced', progress=None,
+                         output_format='standard', checkpoint=None, cancel_token=None,
+                         page_gate=None, preflight=True, stats=None, scan_cleanup=(),
+                         keep_larger=False):
+    """Run Sage's compression algorithm via the Python script
+    
+    progress: optional ProgressReporter fed from the page loop
+    output_format: 'standard', 'compact' (object streams) or 'web' (linearized)
+    checkpoint: optional PageCheckpoint - finished pages are saved to it and
+                a later attempt resumes after the last checkpointed page
+    cancel_token: optional CancellationToken, checked before every page
+    page_gate: optional ScheduledJob - each page waits for a fair-share page permit
+    preflight: sample a few pages first and copy the original to output_file
+               when the predicted savings are too small to be worth the work
+    stats: optional dict, filled with the pre-flight report and fallback reason
+    scan_cleanup: scan_cleanup steps run on each render before it is encoded
+    keep_larger: keep the output even when it is not smaller than the input,
+                 instead of copying the original over it (for benchmarks)
+    """
+    stats = {} if stats is None else stats
+    
+    # Path to Sage's compression script
+    sage_script = os.path.join('Complete_Technology_Package', 'pdf_optimizer_final_with_banner.py')
+    
+    if not os.path.exists(sage_script):
+        raise Exception("Sage's compression script not found")
+    
+    # Quality mapping to Sage's settings
+    quality_args = {
+        'maximum': '--quality=90 --image-quality=85',
+        'balanced': '--quality=85 --image-quality=75', 
+        'aggressive': '--quality=75 --image-quality=65'
+    }
+    
+    try:
+        # Run Sage's script in headless mode (we'll need to modify it for CLI)
+        # For now, let's use a direct PyMuPDF approach based on Sage's algorithm
+        
+        import fitz  # PyMuPDF
+        
+        # Open the PDF
+        doc = fitz.open(input_file)
+        
+        # Apply Sage's page-to-images compression
+        quality_settings = {
+            'maximum': (90, 85),
+            'balanced': (85, 75),
+            'aggressive': (75, 65)
+        }
+        
+        pdf_quality, image_quality = quality_settings.get(quality, (85, 75))
+        
+        # One render buffer and one JPEG buffer for every page of the job
+        from pixmap_buffer import PixmapBuffer, OutputBuffer
+        from pdf_output import save_pdf
+        from scan_cleanup import ScanCleaner
+        pixmaps = PixmapBuffer(doc, fitz.Matrix(RENDER_RESOLUTION, RENDER_RESOLUTION))
+        output = OutputBuffer()
+        
+        # Scanned pages: clean each render, measuring savings against the uncleaned JPEG
+        cleaner = preview = None
+        if scan_cleanup:
+            measure_output = OutputBuffer()
+            cleaner = ScanCleaner(scan_cleanup,
+                                  measure=lambda pix: len(sage_jpeg(pix, image_quality, measure_output)),
+                                  resolution=RENDER_RESOLUTION)
+            preview = ScanCleaner(scan_cleanup, resolution=RENDER_RESOLUTION)
+        
+        # Pre-flight: don't spend a full render/encode on a PDF that won't shrink
+        if preflight:
+            if progress:
+                progress.stage("preflight")
+            report = predict_savings(doc, os.path.getsize(input_file),
+                                     lambda page: len(encode_sage_page(page, image_quality, pixmaps, output,
+                                                                       preview)))
+            go_ahead, reason = worth_optimizing(report)
+            if report:
+                stats['preflight'] = report
+            if not go_ahead:
+                doc.close()
+                shutil.copyfile(input_file, output_file)
+                stats.update(output_is_original=True, fallback_reason=reason)
+                return True
+        
+        if progress:
+            progress.start(len(doc))
+        bytes_written = 0
+        
+        resumed = []
+        if checkpoint:
+            resume_settings = {
+                'engine': 'compress',
+                'input_size': os.path.getsize(input_file),
+                'total_pages': len(doc),
+                'quality': quality
+            }
+            if scan_cleanup:
+                resume_settings['scan_cleanup'] = list(scan_cleanup)
+            resumed = checkpoint.resume(resume_settings)
+        
+        # Pages finished by an earlier attempt come straight from the checkpoint
+        for page_num, record in enumerate(resumed):
+            page = doc[page_num]
+            jpeg_data = checkpoint.blob(record)
+            page.clean_contents()
+            page.insert_image(page.rect, stream=jpeg_data)
+            bytes_written += len(jpeg_data)
+        
+        if progress and resumed:
+            progress.page_done(len(resumed), bytes_written)
+        
+        page_numbers = range(len(resumed), len(doc))
+        if page_gate:
+            page_numbers = page_gate.pages(page_numbers)
+        
+        # Process each page using Sage's exact method
+        for page_num in page_numbers:
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            page = doc[page_num]
+            
+            # Convert page to a compressed image (Sage's method)
+            jpeg_data = encode_sage_page(page, image_quality, pixmaps, output, cleaner, page_num)
+            if cleaner:
+                cleaner.encoded(page_num, len(jpeg_data))
+            
+            # Clear page and insert compressed image
+            page.clean_contents()
+            page.insert_image(page.rect, stream=jpeg_data)
+            
+            bytes_written += len(jpeg_data)
+            if checkpoint:
+                checkpoint.add({'kind': 'jpeg'}, jpeg_data)
+            if progress:
+                progress.page_done(page_num + 1, bytes_written)
+        
+        # Save the compressed PDF
+        if progress:
+            progress.stage("saving")
+        save_pdf(doc, output_file, output_format, garbage=4, deflate=True)
+        doc.close()
+        stats.update(pixmaps.report())
+        if cleaner:
+            stats.update(cleaner.report())
+        
+        # Never hand back a file bigger than the one we were given
+        reason = None if keep_larger else never_larger(input_file, output_file)
+        stats['output_is_original'] = reason is not None
+        if reason:
+            stats['fallback_reason'] = reason
+        
+        return True
+        
+    except JobCancelled as e:
+        print(str(e))
+        doc.close()
+        return False
+    except Exception as e:
+        print(f"Compression error: {str(e)}")
+        return False
+
+def build_compression_result(job_id, original_size, output_path, stats=None):
+    """Response body for a finished /compress job"""
+    compressed_size = os.path.getsize(output_path)
+    savings = round(((original_size - compressed_size) / original_size) * 100, 1)
+    
+    return {
+        'success': True,
+        'download_id': job_id,
+        'original_size': f"{original_size / 1024 / 1024:.2f} MB",
+        'compressed_size': f"{compressed_size / 1024 / 1024:.2f} MB", 
+        'savings': savings,
+        'algorithm': "Sage's Page-to-Images Algorithm",
+        'stats': stats or {}
+    }
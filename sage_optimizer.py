@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+🎨 PDF Optimizer Pro - Page-to-Images Optimizer Engine
+Sage's Page-to-Images algorithm as pdf_optimizer_backend.py's /optimize runs it
+
+SageWebPDFOptimizer renders each page at the preset's resolution, encodes it
+with the chosen page encoder and rebuilds the PDF from the images - or, with
+method="lossless", rewrites the document's structure without rendering.
+The engine lives here rather than in pdf_optimizer_backend.py so that the
+spool workers and the ASGI front end's pool processes can run it without
+importing Flask - and without the backend's start-up work (warm-up thread,
+admission controller, spool connection).
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+from job_cancellation import JobCancelled
+from preflight import predict_savings, worth_optimizing, never_larger
+from structural_optimizer import LOSSLESS_SAVE_OPTIONS, optimize_structure
+
+class SageWebPDFOptimizer:
+    """
+    Sage's Page-to-Images algorithm adapted for web use
+    Maintaining the exact compression methodology that achieves 70% reduction
+    """
+    
+    def __init__(self):
+        # Sage's proven compression settings
+        self.compression_settings = {
+            "maximum": {
+                "jpeg_quality": 90,
+                "resolution": 2.0,
+                "description": "Professional standard (50% reduction)"
+            },
+            "balanced": {
+                "jpeg_quality": 85, 
+                "resolution": 2.0,
+                "description": "Sage's breakthrough formula (70% reduction)"
+            },
+            "aggressive": {
+                "jpeg_quality": 75,
+                "resolution": 1.8, 
+                "description": "Maximum compression (85% reduction)"
+            }
+        }
+    
+    def optimize_pdf(self, input_file_path, quality_level="balanced", progress=None,
+                     encoder="jpeg", encoder_options=None, output_format="standard",
+                     checkpoint=None, cancel_token=None, page_gate=None, preflight=True,
+                     method="page-to-images", scan_cleanup=(), keep_larger=False):
+        """
+        Sage's Page-to-Images compression algorithm
+        progress: optional ProgressReporter fed from the page loop
+        encoder: page encoder name from page_encoders ("jpeg", "jpeg2000", "flate", "best")
+        encoder_options: JPEG tuning - {"subsampling": "4:2:0", "progressive": False}, plus
+                         an optional quality target ("min_ssim", "min_psnr") that picks
+                         each page's JPEG quality instead of the preset
+        output_format: "standard", "compact" (object streams) or "web" (linearized)
+        checkpoint: optional PageCheckpoint - finished pages are saved to it and
+                    a later attempt resumes after the last checkpointed page
+        cancel_token: optional CancellationToken, checked before every page
+        page_gate: optional ScheduledJob - each page waits for a fair-share page permit
+        preflight: sample a few pages first and return the original file when
+                   the predicted savings are too small to be worth the work
+        method: "page-to-images", or "lossless" for optimize_lossless() (which
+                ignores the encoder, checkpoint, page_gate and preflight)
+        scan_cleanup: scan_cleanup steps run on each render before it is
+                      classified and encoded ("whiten", "despeckle", "deskew")
+        keep_larger: keep the output even when it is not smaller than the input,
+                     instead of returning the original (for benchmarks)
+        Returns: (success, output_path, stats, error_message)
+        """
+        if method == "lossless":
+            return self.optimize_lossless(input_file_path, quality_level, progress=progress,
+                                          output_format=output_format, cancel_token=cancel_token,
+                                          keep_larger=keep_larger)
+        
+        # The engine loads on first use (or in the background warm-up), not with the server
+        import fitz  # PyMuPDF - Sage's choice for PDF manipulation
+        from page_encoders import make_encoder, EncodedImage
+        from page_fingerprint import PageDeduplicator, draw_blank
+        from pdf_output import save_pdf
+        from pixmap_buffer import PixmapBuffer
+        from scan_cleanup import ScanCleaner
+        
+        try:
+            start_time = time.time()
+            
+            # Open PDF using Sage's method
+            doc = fitz.open(input_file_path)
+            total_pages = len(doc)
+            
+            if total_pages == 0:
+                return False, None, None, "PDF contains no pages"
+            
+            # Create new PDF document - Sage's approach
+            new_doc = fitz.open()
+            
+            # Get compression settings
+            settings = self.compression_settings.get(quality_level, self.compression_settings["balanced"])
+            jpeg_quality = settings["jpeg_quality"]
+            resolution = settings["resolution"]
+            page_encoder = make_encoder(encoder, jpeg_quality, **(encoder_options or {}))
+            dedupe = PageDeduplicator()
+            mat = fitz.Matrix(resolution, resolution)
+            # Every page is rendered into this one buffer, sized to the largest page
+            pixmaps = PixmapBuffer(doc, mat)
+            original_size = os.path.getsize(input_file_path)
+            
+            # Scanned pages: clean each render, measuring savings with a second encoder
+            cleaner = None
+            render = pixmaps.render
+            if scan_cleanup:
+                measure_encoder = make_encoder(encoder, jpeg_quality, **(encoder_options or {}))
+                cleaner = ScanCleaner(scan_cleanup, measure=lambda pix: len(measure_encoder.encode(pix)),
+                                      resolution=resolution)
+                preview = ScanCleaner(scan_cleanup, resolution=resolution)
+                render = lambda page: preview.clean(pixmaps.render(page))
+            
+            # Pre-flight: don't spend a full render/encode on a PDF that won't shrink
+            preflight_report = None
+            if preflight:
+                if progress:
+                    progress.stage("preflight")
+                sample_encoder = make_encoder(encoder, jpeg_quality, **(encoder_options or {}))
+                preflight_report = predict_savings(
+                    doc, original_size, lambda page: len(sample_encoder.encode(render(page))))
+                go_ahead, reason = worth_optimizing(preflight_report)
+                if not go_ahead:
+                    doc.close()
+                    new_doc.close()
+                    return self.original_file_result(input_file_path, quality_level, start_time,
+                                                     reason, preflight_report)
+            
+            if progress:
+                progress.start(total_pages)
+            bytes_written = 0
+            
+            # Image xref -> first page showing it, so checkpoints can name duplicates
+            image_pages = {}
+            page_images = []
+            
+            # Quality-target mode: each encoded page's chosen JPEG quality and scores
+            page_quality = []
+            
+            resumed = []
+            if checkpoint:
+                resume_settings = {
+                    "engine": "optimize",
+                    "input_size": os.path.getsize(input_file_path),
+                    "total_pages": total_pages,
+                    "quality_level": quality_level,
+                    "encoder": encoder,
+                    "encoder_options": encoder_options or {}
+                }
+                if scan_cleanup:
+                    resume_settings["scan_cleanup"] = list(scan_cleanup)
+                resumed = checkpoint.resume(resume_settings)
+            
+            # Rebuild pages finished by an earlier attempt from the checkpoint
+            for page_num, record in enumerate(resumed):
+                page = doc[page_num]
+                img_rect = fitz.Rect(0, 0, page.rect.width, page.rect.height)
+                new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
+                key = bytes.fromhex(record["key"])
+                
+                if record["kind"] == "blank":
+                    draw_blank(new_page, record["colour"])
+                    dedupe.restore(key, "blank", record["colour"])
+                    page_images.append(None)
+                elif record["kind"] == "duplicate":
+                    xref = page_images[record["source"]]
+                    new_page.insert_image(img_rect, xref=xref)
+                    dedupe.restore(key, "duplicate", xref)
+                    page_images.append(xref)
+                else:
+                    blob = checkpoint.blob(record)
+                    encoded = EncodedImage.from_description(record["image"], blob)
+                    xref = encoded.insert(new_doc, new_page, img_rect)
+                    dedupe.restore(key, "image", xref)
+                    image_pages[xref] = page_num
+                    page_images.append(xref)
+                    bytes_written += len(encoded)
+                    if encoded.scores is not None:
+                        page_quality.append(dict(page=page_num + 1, quality=encoded.quality, **encoded.scores))
+            
+            if progress and resumed:
+                progress.page_done(len(resumed), bytes_written)
+            
+            page_numbers = range(len(resumed), total_pages)
+            
+            # Render and encode here, or in the render pipeline's processes
+            pipeline, pipeline_note = self.start_pipeline(input_file_path, doc, total_pages - len(resumed),
+                                                          resolution, encoder, jpeg_quality, encoder_options,
+                                                          scan_cleanup)
+            with pipeline or contextlib.nullcontext():
+                if pipeline:
+                    pages = self.pipeline_pages(pipeline, page_numbers, dedupe, cancel_token, page_gate)
+                else:
+                    if page_gate:
+                        page_numbers = page_gate.pages(page_numbers)
+                    pages = self.render_pages(doc, page_numbers, pixmaps, dedupe, page_encoder, cancel_token,
+                                              cleaner)
+                
+                # Process each page using Sage's Page-to-Images method
+                for page_num, kind, value, key, encoded in pages:
+                    page = doc[page_num]
+                    img_rect = fitz.Rect(0, 0, page.rect.width, page.rect.height)
+                    new_page = new_doc.new_page(width=page.rect.width, height=page.rect.height)
+                    
+                    # Blank and repeated pages need no new image stream
+                    record = {"kind": kind, "key": key.hex()}
+                    blob = None
+                    if kind == "blank":
+                        draw_blank(new_page, value)
+                        record["colour"] = list(value)
+                        page_images.append(None)
+                    elif kind == "duplicate":
+                        new_page.insert_image(img_rect, xref=value)
+                        record["source"] = image_pages[value]
+                        page_images.append(value)
+                    else:
+                        # Insert optimized image into new PDF - maintaining structure
+                        xref = encoded.insert(new_doc, new_page, img_rect)
+                        dedupe.remember(key, xref)
+                        image_pages[xref] = page_num
+                        page_images.append(xref)
+                        bytes_written += len(encoded)
+                        record["image"] = encoded.describe()
+                        if encoded.scores is not None:
+                            page_quality.append(dict(page=page_num + 1, quality=encoded.quality, **encoded.scores))
+                        blob = encoded.data
+                    
+                    if checkpoint:
+                        checkpoint.add(record, blob)
+                    
+                    if progress:
+                        progress.page_done(page_num + 1, bytes_written)
+            
+                if pipeline:
+                    pipeline.finish()
+            
+            # Create temporary output file
+            output_fd, output_path = tempfile.mkstemp(suffix='.pdf', prefix='optimized_')
+            os.close(output_fd)
+            
+            # Save optimized PDF with Sage's settings
+            if progress:
+                progress.stage("saving")
+            save_report = save_pdf(new_doc, output_path, output_format, deflate=True)
+            
+            # Verify PDF integrity - Sage's quality assurance
+            if progress:
+                progress.stage("verifying")
+            try:
+                test_doc = fitz.open(output_path)
+                test_doc.close()
+                verification_status = "✅ VERIFIED READABLE"
+            except Exception as e:
+                verification_status = f"❌ VERIFICATION FAILED: {str(e)}"
+                doc.close()
+                new_doc.close()
+                return False, None, None, f"Output PDF verification failed: {str(e)}"
+            
+            # Cleanup
+            doc.close()
+            new_doc.close()
+            
+            # Never hand back a file bigger than the one we were given
+            fallback_reason = None if keep_larger else never_larger(input_file_path, output_path)
+            
+            # Calculate compression statistics
+            optimized_size = os.path.getsize(output_path)
+            reduction_percentage = ((original_size - optimized_size) / original_size) * 100
+            processing_time = time.time() - start_time
+            
+            # Prepare statistics
+            stats = {
+                "original_size_mb": round(original_size / (1024 * 1024), 2),
+                "optimized_size_mb": round(optimized_size / (1024 * 1024), 2),
+                "reduction_percentage": round(reduction_percentage, 1),
+                "processing_time": round(processing_time, 2),
+                "pages_processed": total_pages,
+                "quality_level": quality_level,
+                "verification_status": verification_status,
+                "compression_method": "Page-to-Images (Sage's Algorithm)",
+                "output_is_original": fallback_reason is not None
+            }
+            if fallback_reason:
+                stats["fallback_reason"] = fallback_reason
+            if preflight_report:
+                stats["preflight"] = preflight_report
+            if pipeline:
+                stats.update(pipeline.encoder_report())
+                stats.update(pipeline.report())
+            else:
+                stats.update(page_encoder.report())
+                stats.update(pixmaps.report())
+            if pipeline_note:
+                stats["pipeline_note"] = pipeline_note
+            if cleaner:
+                stats.update(cleaner.report())
+            if page_quality:
+                stats["page_quality"] = page_quality
+            stats.update(dedupe.report())
+            stats.update(save_report)
+            if checkpoint:
+                stats.update(checkpoint.report())
+            if page_gate:
+                stats.update(page_gate.report())
+            
+            return True, output_path, stats, None
+            
+        except JobCancelled as e:
+            doc.close()
+            new_doc.close()
+            return False, None, None, str(e)
+        except Exception as e:
+            return False, None, None, f"Compression failed: {str(e)}"
+    
+    def render_pages(self, doc, page_numbers, pixmaps, dedupe, page_encoder, cancel_token,
+                     cleaner=None):
+        """
+        The page loop's work in this process: render, clean (when scan cleanup
+        is on), classify, encode
+        Yields: (page_num, kind, value, key, EncodedImage or None)
+        """
+        for page_num in page_numbers:
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            
+            # Convert page to optimized image - Sage's technique
+            pix = pixmaps.render(doc[page_num])
+            if cleaner:
+                cleaner.clean(pix, page_num)
+            kind, value, key = dedupe.classify(pix)
+            encoded = page_encoder.encode(pix) if kind == "image" else None
+            if cleaner and encoded:
+                cleaner.encoded(page_num, len(encoded))
+            yield page_num, kind, value, key, encoded
+    
+    def start_pipeline(self, input_file_path, doc, pages_left, resolution, encoder, jpeg_quality,
+                       encoder_options, scan_cleanup=()):
+        """
+        A RenderPipeline for this job when one is configured and worth it
+        Returns: (pipeline or None, note or None)
+        """
+        from render_pipeline import RenderPipeline, pipeline_usable
+        
+        usable, note = pipeline_usable(pages_left)
+        if not usable:
+            return None, note
+        if scan_cleanup:
+            return None, "scan cleanup runs in the job's own process - render pipeline not used"
+        return RenderPipeline(input_file_path, doc, resolution, encoder, jpeg_quality, encoder_options), None
+    
+    def pipeline_pages(self, pipeline, page_numbers, dedupe, cancel_token, page_gate=None):
+        """
+        render_pages() from the pipeline's processes, classified here in page order
+        page_gate: one page permit is held per page in the pipeline
+        Yields: (page_num, kind, value, key, EncodedImage or None)
+        """
+        for page_num, key, colour, encoded in pipeline.pages(page_numbers, page_gate):
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            kind, value, key = dedupe.classify_fingerprint(key, colour)
+            yield page_num, kind, value, key, encoded
+    
+    def optimize_lossless(self, input_file_path, quality_level="balanced", progress=None,
+                          output_format="standard", cancel_token=None, keep_larger=False):
+        """
+        Lossless structural optimization - no page is rendered
+        Subsets fonts, recompresses streams, merges duplicate objects and drops
+        unused ones, strips XMP and thumbnails and packs object streams (see
+        structural_optimizer). quality_level is only reported.
+        keep_larger: keep the output even when it is not smaller than the input
+        Returns: (success, output_path, stats, error_message)
+        """
+        import fitz  # PyMuPDF
+        from pdf_output import save_pdf
+        
+        doc = None
+        try:
+            start_time = time.time()
+            doc = fitz.open(input_file_path)
+            total_pages = len(doc)
+            if total_pages == 0:
+                doc.close()
+                return False, None, None, "PDF contains no pages"
+            original_size = os.path.getsize(input_file_path)
+            
+            structure_report = optimize_structure(doc, progress, cancel_token)
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            
+            output_fd, output_path = tempfile.mkstemp(suffix='.pdf', prefix='optimized_')
+            os.close(output_fd)
+            
+            if progress:
+                progress.stage("saving")
+            save_report = save_pdf(doc, output_path, output_format, **LOSSLESS_SAVE_OPTIONS)
+            doc.close()
+            
+            if progress:
+                progress.stage("verifying")
+            try:
+                test_doc = fitz.open(output_path)
+                pages_ok = len(test_doc) == total_pages
+                test_doc.close()
+            except Exception as e:
+                return False, None, None, f"Output PDF verification failed: {str(e)}"
+            if not pages_ok:
+                return False, None, None, "Output PDF verification failed: page count changed"
+            
+            # Never hand back a file bigger than the one we were given
+            fallback_reason = None if keep_larger else never_larger(input_file_path, output_path)
+            
+            optimized_size = os.path.getsize(output_path)
+            processing_time = time.time() - start_time
+            stats = {
+                "original_size_mb": round(original_size / (1024 * 1024), 2),
+                "optimized_size_mb": round(optimized_size / (1024 * 1024), 2),
+                "reduction_percentage": round((original_size - optimized_size) / original_size * 100, 1),
+                "processing_time": round(processing_time, 2),
+                "pages_processed": total_pages,
+                "quality_level": quality_level,
+                "verification_status": "✅ VERIFIED READABLE",
+                "compression_method": "Lossless structural",
+                "output_is_original": fallback_reason is not None
+            }
+            if fallback_reason:
+                stats["fallback_reason"] = fallback_reason
+            stats.update(structure_report)
+            stats.update(save_report)
+            return True, output_path, stats, None
+            
+        except JobCancelled as e:
+            doc.close()
+            return False, None, None, str(e)
+        except Exception as e:
+            if doc is not None and not doc.is_closed:
+                doc.close()
+            return False, None, None, f"Compression failed: {str(e)}"
+    
+    def original_file_result(self, input_file_path, quality_level, start_time, reason, preflight_report):
+        """
+        The original PDF as the job's output, for inputs pre-flight says won't shrink
+        Returns: (success, output_path, stats, error_message)
+        """
+        output_fd, output_path = tempfile.mkstemp(suffix='.pdf', prefix='optimized_')
+        os.close(output_fd)
+        shutil.copyfile(input_file_path, output_path)
+        
+        size_mb = round(os.path.getsize(input_file_path) / (1024 * 1024), 2)
+        stats = {
+            "original_size_mb": size_mb,
+            "optimized_size_mb": size_mb,
+            "reduction_percentage": 0.0,
+            "processing_time": round(time.time() - start_time, 2),
+            "pages_processed": 0,
+            "quality_level": quality_level,
+            "verification_status": "✅ ORIGINAL FILE",
+            "compression_method": "None (already optimized)",
+            "output_is_original": True,
+            "fallback_reason": reason,
+            "preflight": preflight_report
+        }
+        return True, output_path, stats, None
+
+# Initialize Sage's optimizer
+optimizer = SageWebPDFOptimizer()
+
+def build_optimize_result(job_id, stats):
+    """Response body for a finished /optimize job"""
+    if stats.get("compression_method") == "Lossless structural":
+        message = "PDF optimized losslessly - pages untouched, structure rewritten!"
+    else:
+        message = "PDF optimized successfully using Sage's Page-to-Images algorithm!"
+    return {
+        "success": True,
+        "message": message,
+        "job_id": job_id,
+        "stats": stats,
+        "download_ready": True,
+        "download_url": f"/download/{job_id}"
+    }
+
+def parse_encoder_options(form, encoder):
+    """
+    JPEG tuning and optional quality target from an /optimize form
+    Returns: (encoder_options, error_message)
+    """
+    from page_encoders import SUBSAMPLING, QUALITY_TARGET_ENCODERS
+    from page_quality import QUALITY_TARGET_LIMITS, targets_available
+    
+    encoder_options = {
+        "subsampling": form.get('subsampling', '4:2:0'),
+        "progressive": form.get('progressive', '') in ('1', 'true')
+    }
+    if encoder_options["subsampling"] not in SUBSAMPLING:
+        return None, f"Unknown subsampling - choose from: {', '.join(SUBSAMPLING)}"
+    
+    for field, (low, high) in QUALITY_TARGET_LIMITS.items():
+        value = form.get(field, '')
+        if value == '':
+            continue
+        try:
+            value = float(value)
+        except ValueError:
+            return None, f"{field} must be a number"
+        if not low < value <= high:
+            return None, f"{field} must be above {low:g} and at most {high:g}"
+        encoder_options[field] = value
+    
+    if any(field in encoder_options for field in QUALITY_TARGET_LIMITS):
+        if encoder not in QUALITY_TARGET_ENCODERS:
+            return None, f"min_ssim / min_psnr need the {' or '.join(QUALITY_TARGET_ENCODERS)} encoder"
+        if not targets_available():
+            return None, "Quality targets need NumPy on the server"
+    return encoder_options, None
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+🚀 PDF Optimizer Pro - Production Server
+Pre-forked HTTP workers in front of a shared job spool
+
+    python serve.py                                  # web_server.py on :8000
+    python serve.py --app backend                    # pdf_optimizer_backend.py on :5000
+    python serve.py --workers 4 --threads 16 --compress-processes 4
+
+app.run(debug=True) is a single process with the reloader and debugger -
+fine for development, not for the public site. This runs the same Flask apps
+under gunicorn (pip install gunicorn):
+
+👥 --workers pre-forked processes, each serving --threads requests at once
+   (an open /jobs/<id>/events stream holds one thread)
+♻️ Graceful restarts - kill -HUP <pid> starts fresh workers (with fresh code)
+   and retires the old ones once their in-flight requests finish; workers
+   are also recycled after about --max-requests requests each
+🗂️ Shared job store - the apps always run in worker mode here, so job state,
+   progress events, cancellations and results live in the spool (SQLite plus
+   files) and any worker can answer /jobs/<id> or /download/<id> for a job
+   another one accepted
+⚙️ Compression - --compress-processes local pdf_worker.py processes drain the
+   spool; use 0 when worker hosts elsewhere do it
+
+gunicorn does not run on Windows; there the app is served by waitress
+(pip install waitress) in one process with --threads threads.
+"""
+
+import argparse
+import importlib
+import os
+import signal
+import subprocess
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# --app name -> (module:attribute, default bind address)
+APPS = {
+    "web": ("web_server:app", "0.0.0.0:8000"),
+    "backend": ("pdf_optimizer_backend:app", "localhost:5000")
+}
+
+
+def load_app(target):
+    module_name, attribute = target.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def run_gunicorn(target, bind, args):
+    """Pre-forked gthread workers; blocks until the arbiter is stopped"""
+
+    class PDFOptimizerServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", [bind])
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("graceful_timeout", args.graceful_timeout)
+            self.cfg.set("max_requests", args.max_requests)
+            self.cfg.set("max_requests_jitter", args.max_requests // 10)
+            self.cfg.set("proc_name", f"pdf-optimizer-{args.app}")
+
+        def load(self):
+            # Imported in each worker after the fork, so a HUP picks up new code
+            return load_app(target)
+
+    PDFOptimizerServer().run()
+
+
+def run_waitress(target, bind, args):
+    """One process, --threads threads - for Windows, where gunicorn cannot fork"""
+    if args.workers > 1:
+        print(f"⚠️ waitress runs a single process - ignoring --workers {args.workers}")
+    waitress.serve(load_app(target), listen=bind, threads=args.threads)
+
+
+def start_compress_workers(spool_dir, args):
+    """pdf_worker.py for this host, or None with --compress-processes 0"""
+    if args.compress_processes == 0:
+        return None
+    return subprocess.Popen([sys.executable, os.path.join(HERE, "pdf_worker.py"),
+                             "--spool", spool_dir,
+                             "--processes", str(args.compress_processes),
+                             "--fast-lane", str(args.fast_lane)])
+
+
+def stop_compress_workers(process):
+    if process is None or process.poll() is not None:
+        return
+    # pdf_worker.py stops its own worker processes on Ctrl+C
+    if os.name == "nt":
+        process.terminate()
+    else:
+        process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF Optimizer Pro production server")
+    parser.add_argument("--app", choices=sorted(APPS), default="web",
+                        help="web (web_server.py) or backend (pdf_optimizer_backend.py)")
+    parser.add_argument("--bind", help="HOST:PORT (default: the app's usual address)")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="pre-forked HTTP worker processes (default: 2)")
+    parser.add_argument("--threads", type=int, default=16,
+                        help="requests each worker serves at once (default: 16)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds a retiring worker may finish its requests (default: 30)")
+    parser.add_argument("--max-requests", type=int, default=1000,
+                        help="recycle each worker after about this many requests (0: never)")
+    parser.add_argument("--spool", default=os.environ.get("PDF_OPTIMIZER_SPOOL_DIR"),
+                        help="shared job spool (default: $PDF_OPTIMIZER_SPOOL_DIR, else ./spool)")
+    parser.add_argument("--compress-processes", type=int, default=os.cpu_count() or 1,
+                        help="local compression processes (default: CPU count; 0: none)")
+    parser.add_argument("--fast-lane", type=int, default=0,
+                        help="compression processes reserved for small documents")
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    if args.compress_processes and not 0 <= args.fast_lane < args.compress_processes:
+        parser.error("--fast-lane must leave at least one compression process for other jobs")
+
+    if BaseApplication is not None:
+        serve = run_gunicorn
+    elif waitress is not None:
+        serve = run_waitress
+    else:
+        print("❌ No production server installed.")
+        print("   Install one with: pip install gunicorn   (Windows: pip install waitress)")
+        sys.exit(1)
+
+    # The apps read this when imported - every HTTP worker shares the spool
+    spool_dir = os.path.abspath(args.spool or os.path.join(HERE, "spool"))
+    os.environ["PDF_OPTIMIZER_SPOOL_DIR"] = spool_dir
+    sys.path.insert(0, HERE)
+
+    target, default_bind = APPS[args.app]
+    bind = args.bind or default_bind
+    server = "gunicorn" if serve is run_gunicorn else "waitress"
+
+    print("🚀 PDF Optimizer Pro - Production Server")
+    print(f"🌐 {target} on http://{bind} ({server}, {args.workers} worker(s) x {args.threads} threads)")
+    print(f"🗂️ Job spool: {spool_dir}")
+    print(f"⚙️ {args.compress_processes} local compression process(es)")
+
+    compress_workers = start_compress_workers(spool_dir, args)
+    try:
+        serve(target, bind, args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_compress_workers(compress_workers)
+
+
+if __name__ == "__main__":
+    main()
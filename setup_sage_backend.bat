@@ -28,6 +28,9 @@ pip install Flask
 echo 📦 Installing Flask-CORS (Cross-origin support)...
 pip install flask-cors
 
+echo 📦 Installing Pillow + NumPy (page encoders and page analysis)...
+pip install Pillow numpy
+
 echo.
 echo ✅ Installation complete!
 echo.
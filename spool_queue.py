@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+🗂️ PDF Optimizer Pro - Shared Spool Queue
+A SQLite job queue living in a spool directory that several hosts can mount
+
+Layout of the spool directory:
+    queue.sqlite3   - job table (status, lease, latest progress event, result)
+    inputs/         - uploaded PDFs, named <job_id>.pdf
+    outputs/        - optimized PDFs, named <job_id>.pdf; workers write to
+                      <job_id>.<worker>.part and rename it on completing
+    checkpoints/    - finished pages of running jobs, one folder per job id
+                      (see page_checkpoint.py)
+
+The HTTP front ends only write uploads into inputs/ and rows into the queue.
+Worker processes (pdf_worker.py) on any host claim jobs with a time-limited
+lease, heartbeat while they work and write results back. A lease that is not
+renewed expires and the job goes back to the queue for another worker. A
+worker that was too slow to renew (a zombie) may still be running: its
+progress events and its result are dropped once the job has a new owner,
+and its output only replaces outputs/<job_id>.pdf while it holds the job.
+
+Files are found from the job id alone, never from stored paths, so hosts may
+mount the spool at different locations. The database stays in rollback-journal mode because WAL
+needs shared memory, which network filesystems do not provide.
+
+Workers claim small documents first (the fast lane), then the job of the
+client with the fewest jobs running, then the oldest - so one user's pile of
+uploads cannot occupy every worker. Workers started with --fast-lane only
+take fast-lane jobs, reserving capacity for them.
+
+The queue also quacks like job_events.JobEventBus (publish/get/stream), so a
+ProgressReporter can write straight into it and the SSE endpoints can read
+from it on whichever host serves the request. While a stream is open it
+keeps the row's subscriber_seen fresh, so a front end whose own streams have
+disconnected can tell whether the client reconnected to another one.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import time
+import uuid
+
+from admission_control import LANES, wait_summary
+from job_events import KEEPALIVE_INTERVAL, TERMINAL_EVENTS, format_sse
+from job_scheduler import FAST_LANE_PAGES, lane_for
+
+DEFAULT_LEASE_SECONDS = 60
+MAX_ATTEMPTS = 3
+STREAM_POLL_INTERVAL = 0.5
+# Open streams refresh subscriber_seen this often - well inside DISCONNECT_GRACE
+SUBSCRIBER_HEARTBEAT_INTERVAL = 2.0
+
+# Front ends shed load with 429 once this many jobs wait for a worker
+MAX_BACKLOG = int(os.environ.get("PDF_OPTIMIZER_MAX_SPOOL_BACKLOG", "200"))
+SPOOL_RETRY_AFTER = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    engine        TEXT NOT NULL,
+    quality       TEXT NOT NULL,
+    filename      TEXT NOT NULL,
+    options       TEXT NOT NULL DEFAULT '{}',
+    status        TEXT NOT NULL DEFAULT 'queued',
+    worker_id     TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    sequence      INTEGER NOT NULL DEFAULT 0,
+    event         TEXT,
+    data          TEXT,
+    cancel_reason TEXT,
+    client        TEXT NOT NULL DEFAULT '',
+    pages         INTEGER NOT NULL DEFAULT 0,
+    claimed       REAL,
+    subscriber_seen REAL,
+    created       REAL NOT NULL,
+    updated       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+# Columns added after the first release, for spools created before them
+ADDED_COLUMNS = {
+    "cancel_reason": "TEXT",
+    "client": "TEXT NOT NULL DEFAULT ''",
+    "pages": "INTEGER NOT NULL DEFAULT 0",
+    "claimed": "REAL",
+    "subscriber_seen": "REAL"
+}
+
+# Recently claimed jobs used for the per-lane wait metrics
+WAIT_WINDOW = 200
+
+
+def make_worker_id():
+    """host:pid:random - unique across every machine sharing the spool"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class SpoolQueue:
+    """SQLite-backed job queue with leases, shared through a spool directory"""
+
+    def __init__(self, spool_dir):
+        self.spool_dir = os.path.abspath(spool_dir)
+        self.inputs_dir = os.path.join(self.spool_dir, "inputs")
+        self.outputs_dir = os.path.join(self.spool_dir, "outputs")
+        self.checkpoints_dir = os.path.join(self.spool_dir, "checkpoints")
+        self.db_path = os.path.join(self.spool_dir, "queue.sqlite3")
+
+        os.makedirs(self.inputs_dir, exist_ok=True)
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, definition in ADDED_COLUMNS.items():
+                if name not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return _Connection(db)
+
+    # File locations ------------------------------------------------------
+
+    def input_path(self, job_id):
+        return os.path.join(self.inputs_dir, f"{job_id}.pdf")
+
+    def output_path(self, job_id):
+        return os.path.join(self.outputs_dir, f"{job_id}.pdf")
+
+    def work_path(self, job_id, worker_id):
+        """Where worker_id writes the job's output, until complete() moves it to output_path"""
+        worker = hashlib.blake2b(worker_id.encode(), digest_size=6).hexdigest()
+        return os.path.join(self.outputs_dir, f"{job_id}.{worker}.part")
+
+    def checkpoint_dir(self, job_id):
+        return os.path.join(self.checkpoints_dir, job_id)
+
+    # Front end side --------------------------------------------------------
+
+    def enqueue(self, job_id, engine, quality, filename, options=None, client="", **info):
+        """
+        Queue a job whose upload is already at input_path(job_id)
+        client: fair-share identity (job_scheduler.client_key)
+        """
+        now = time.time()
+        data = json.dumps(dict(info, stage="queued", job_id=job_id))
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (job_id, engine, quality, filename, options, client, pages,"
+                " sequence, event, data, created, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 1, 'queued', ?, ?, ?)",
+                (job_id, engine, quality, filename, json.dumps(options or {}), client,
+                 info.get("total_pages", 0), data, now, now))
+
+    def cancel(self, job_id, reason):
+        """
+        Cancel a job from any front end. A queued job is cancelled at once; a
+        running one is flagged for its worker, which stops at the next page.
+        Returns False if the job is unknown or already finished.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] not in ("queued", "running"):
+                db.execute("COMMIT")
+                return False
+            if row["status"] == "queued":
+                data = json.dumps({"stage": "cancelled", "reason": reason, "job_id": job_id})
+                db.execute(
+                    "UPDATE jobs SET status = 'cancelled', cancel_reason = ?, sequence = sequence + 1,"
+                    " event = 'cancelled', data = ?, updated = ? WHERE job_id = ?",
+                    (reason, data, now, job_id))
+            else:
+                db.execute("UPDATE jobs SET cancel_reason = ? WHERE job_id = ?", (reason, job_id))
+            db.execute("COMMIT")
+
+        if row["status"] == "queued" and os.path.exists(self.input_path(job_id)):
+            os.remove(self.input_path(job_id))
+        return True
+
+    def backlog(self):
+        """Jobs waiting for a worker"""
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def job(self, job_id):
+        """Full job row as a dict, or None"""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        job["data"] = json.loads(job["data"]) if job["data"] else {}
+        return job
+
+    # JobEventBus interface -----------------------------------------------
+
+    def publish(self, job_id, event, data, worker_id=None):
+        """With worker_id, only while that worker still owns the running job"""
+        sql = "UPDATE jobs SET sequence = sequence + 1, event = ?, data = ?, updated = ? WHERE job_id = ?"
+        args = [event, json.dumps(dict(data, job_id=job_id)), time.time(), job_id]
+        if worker_id is not None:
+            sql += " AND worker_id = ? AND status = 'running'"
+            args.append(worker_id)
+        with self._connect() as db:
+            db.execute(sql, args)
+
+    def worker_events(self, worker_id):
+        """An event bus for ProgressReporter that publishes as worker_id"""
+        return _WorkerEvents(self, worker_id)
+
+    def get(self, job_id):
+        with self._connect() as db:
+            row = db.execute("SELECT event, data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return (row["event"], json.loads(row["data"])) if row else None
+
+    def stream(self, job_id):
+        """
+        SSE frames for one subscriber. Workers may live on other hosts, so
+        this polls the row - a single indexed read every half second - and
+        refreshes subscriber_seen every SUBSCRIBER_HEARTBEAT_INTERVAL.
+        """
+        sequence = 0
+        last_sent = time.monotonic()
+        last_seen = None
+        while True:
+            with self._connect() as db:
+                if last_seen is None or time.monotonic() - last_seen >= SUBSCRIBER_HEARTBEAT_INTERVAL:
+                    last_seen = time.monotonic()
+                    db.execute("UPDATE jobs SET subscriber_seen = ? WHERE job_id = ?",
+                               (time.time(), job_id))
+                row = db.execute("SELECT sequence, event, data FROM jobs WHERE job_id = ?",
+                                 (job_id,)).fetchone()
+            if row is None:
+                return
+
+            if row["sequence"] > sequence:
+                sequence = row["sequence"]
+                last_sent = time.monotonic()
+                yield format_sse(row["event"], json.loads(row["data"]), sequence)
+                if row["event"] in TERMINAL_EVENTS:
+                    return
+            elif time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    def subscriber_seen(self, job_id):
+        """When an event stream for the job was last open, on any front end (or None)"""
+        with self._connect() as db:
+            row = db.execute("SELECT subscriber_seen FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["subscriber_seen"] if row else None
+
+    def wait_for_result(self, job_id, timeout=None):
+        """Block until the job finishes; returns (event, data) or None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            state = self.get(job_id)
+            if state is None or state[0] in TERMINAL_EVENTS:
+                return state
+            time.sleep(STREAM_POLL_INTERVAL)
+        return None
+
+    # Worker side -----------------------------------------------------------
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, fast_lane_only=False):
+        """
+        Lease the next job to this worker: fast lane first, then the client with
+        the fewest running jobs, then the oldest. Returns the job dict or None.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_expired(db, now)
+                row = db.execute(
+                    "SELECT job_id FROM jobs AS queued WHERE status = 'queued'"
+                    " AND (? = 0 OR pages <= ?)"
+                    " ORDER BY pages <= ? DESC,"
+                    " (SELECT COUNT(*) FROM jobs AS running WHERE running.status = 'running'"
+                    "  AND running.client = queued.client),"
+                    " created LIMIT 1",
+                    (int(fast_lane_only), FAST_LANE_PAGES, FAST_LANE_PAGES)).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                db.execute(
+                    "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires = ?,"
+                    " attempts = attempts + 1, claimed = COALESCE(claimed, ?), updated = ?"
+                    " WHERE job_id = ?",
+                    (worker_id, now + lease_seconds, now, now, row["job_id"]))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return self.job(row["job_id"])
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend the lease; False means the lease was lost to another worker"""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND worker_id = ?"
+                " AND status = 'running'",
+                (time.time() + lease_seconds, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def cancel_reason(self, job_id):
+        """Why a running job should stop, or None to keep going"""
+        with self._connect() as db:
+            row = db.execute("SELECT cancel_reason FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["cancel_reason"] if row else None
+
+    # complete(), fail() and finish_cancelled() return False when worker_id no
+    # longer owns the job - another worker's result wins, this one is dropped
+
+    def complete(self, job_id, worker_id, result, work_path=None):
+        """work_path: the worker's output, moved to output_path if the job is still its own"""
+        return self._finish(job_id, worker_id, "done", "complete", dict(result, stage="complete"), work_path)
+
+    def fail(self, job_id, worker_id, error):
+        return self._finish(job_id, worker_id, "failed", "error", {"stage": "error", "error": error})
+
+    def finish_cancelled(self, job_id, worker_id, reason):
+        return self._finish(job_id, worker_id, "cancelled", "cancelled", {"stage": "cancelled", "reason": reason})
+
+    def _finish(self, job_id, worker_id, status, event, data, work_path=None):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = db.execute(
+                    "UPDATE jobs SET status = ?, lease_expires = NULL, sequence = sequence + 1,"
+                    " event = ?, data = ?, updated = ? WHERE job_id = ? AND worker_id = ?"
+                    " AND status = 'running'",
+                    (status, event, json.dumps(dict(data, job_id=job_id)), time.time(),
+                     job_id, worker_id))
+                owned = cursor.rowcount == 1
+                # Renamed while the row is locked, so no new owner can be claiming it
+                if owned and work_path:
+                    os.replace(work_path, self.output_path(job_id))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return owned
+
+    def requeue_expired(self):
+        """Return jobs with dead leases to the queue; returns how many"""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            count = self._requeue_expired(db, time.time())
+            db.execute("COMMIT")
+        return count
+
+    def _requeue_expired(self, db, now):
+        expired = db.execute(
+            "SELECT job_id, attempts, cancel_reason FROM jobs"
+            " WHERE status = 'running' AND lease_expires < ?", (now,)).fetchall()
+        for row in expired:
+            if row["cancel_reason"]:
+                # Cancelled while its worker was dying - nothing left to retry
+                data = json.dumps({"stage": "cancelled", "job_id": row["job_id"],
+                                   "reason": row["cancel_reason"]})
+                db.execute(
+                    "UPDATE jobs SET status = 'cancelled', worker_id = NULL, lease_expires = NULL,"
+                    " sequence = sequence + 1, event = 'cancelled', data = ?, updated = ?"
+                    " WHERE job_id = ?", (data, now, row["job_id"]))
+            elif row["attempts"] >= MAX_ATTEMPTS:
+                data = json.dumps({"stage": "error", "job_id": row["job_id"],
+                                   "error": f"Job abandoned after {row['attempts']} worker attempts"})
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', worker_id = NULL, lease_expires = NULL,"
+                    " sequence = sequence + 1, event = 'error', data = ?, updated = ?"
+                    " WHERE job_id = ?", (data, now, row["job_id"]))
+            else:
+                db.execute(
+                    "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_expires = NULL,"
+                    " updated = ? WHERE job_id = ?", (now, row["job_id"]))
+        return len(expired)
+
+    def lane_snapshot(self):
+        """Queued jobs and queue waits per lane, for /metrics"""
+        now = time.time()
+        with self._connect() as db:
+            queued = db.execute("SELECT pages, created FROM jobs WHERE status = 'queued'").fetchall()
+            claimed = db.execute("SELECT pages, claimed - created AS wait FROM jobs"
+                                 " WHERE claimed IS NOT NULL ORDER BY claimed DESC LIMIT ?",
+                                 (WAIT_WINDOW,)).fetchall()
+
+        return {name: dict(
+            wait_summary([row["wait"] for row in claimed if lane_for(row["pages"]) == name]),
+            queued_jobs=sum(1 for row in queued if lane_for(row["pages"]) == name),
+            oldest_queued_seconds=round(max([now - row["created"] for row in queued
+                                             if lane_for(row["pages"]) == name], default=0), 1))
+            for name in LANES}
+
+    def purge(self, older_than):
+        """Delete finished jobs and their files older than `older_than` seconds"""
+        cutoff = time.time() - older_than
+        with self._connect() as db:
+            rows = db.execute("SELECT job_id FROM jobs WHERE status IN ('done', 'failed', 'cancelled')"
+                              " AND updated < ?", (cutoff,)).fetchall()
+            for row in rows:
+                leftovers = glob.glob(os.path.join(self.outputs_dir, f"{row['job_id']}.*.part"))
+                for path in [self.input_path(row["job_id"]), self.output_path(row["job_id"])] + leftovers:
+                    if os.path.exists(path):
+                        os.remove(path)
+                shutil.rmtree(self.checkpoint_dir(row["job_id"]), ignore_errors=True)
+                db.execute("DELETE FROM jobs WHERE job_id = ?", (row["job_id"],))
+        return len(rows)
+
+
+class _WorkerEvents:
+    """JobEventBus publish() for one worker - see SpoolQueue.worker_events"""
+
+    def __init__(self, spool, worker_id):
+        self.spool = spool
+        self.worker_id = worker_id
+
+    def publish(self, job_id, event, data):
+        self.spool.publish(job_id, event, data, worker_id=self.worker_id)
+
+
+class _Connection:
+    """sqlite3 connection that closes on leaving the with-block"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.close()
@@ -0,0 +1,25 @@
+@echo off
+echo 🚀 PDF Optimizer Pro - Production Server Launcher
+echo ✨ Sage's compression behind a production web server, with a shared job spool
+echo.
+echo 💡 Web interface will be available at: http://localhost:8000
+echo.
+
+REM Check if virtual environment Python is available
+if not exist ".venv\Scripts\python.exe" (
+    echo ❌ Virtual environment not found! Please run setup first.
+    pause
+    exit /b 1
+)
+
+REM gunicorn cannot run on Windows - waitress serves the app here
+.venv\Scripts\python.exe -c "import flask, flask_cors, fitz, waitress" >nul 2>&1
+if errorlevel 1 (
+    echo 📦 Installing required packages...
+    .venv\Scripts\python.exe -m pip install flask flask-cors PyMuPDF Pillow waitress
+)
+
+echo ✅ Starting PDF Optimizer Production Server...
+.venv\Scripts\python.exe serve.py --app web
+
+pause
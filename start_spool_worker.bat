@@ -0,0 +1,24 @@
+@echo off
+echo ⚙️ PDF Optimizer Pro - Spool Worker Launcher
+echo ✨ Compresses jobs queued by the web servers in a shared spool folder
+echo.
+
+REM Check if virtual environment Python is available
+if not exist ".venv\Scripts\python.exe" (
+    echo ❌ Virtual environment not found! Please run setup first.
+    pause
+    exit /b 1
+)
+
+REM The spool folder must be the same one the web servers use
+if "%PDF_OPTIMIZER_SPOOL_DIR%"=="" (
+    echo ❌ PDF_OPTIMIZER_SPOOL_DIR is not set!
+    echo    Example: set PDF_OPTIMIZER_SPOOL_DIR=\\fileserver\pdf-spool
+    pause
+    exit /b 1
+)
+
+echo ✅ Starting workers on %PDF_OPTIMIZER_SPOOL_DIR%...
+.venv\Scripts\python.exe pdf_worker.py --spool "%PDF_OPTIMIZER_SPOOL_DIR%"
+
+pause
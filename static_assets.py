@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+🗂️ PDF Optimizer Pro - Static Asset Cache
+Serving the site's CSS, JavaScript, images and pages from memory
+
+Every web asset (WEB_ASSET_EXTENSIONS) under the asset folders is read once
+at startup and given a content-hash ETag - design sources such as
+Images/Raw/*.psd and the _notes folders are neither loaded nor served. Text
+assets (CSS, JavaScript, HTML, SVG, icons, fonts) are gzipped - and
+brotli-compressed when the brotli package is installed - up front, so a
+request costs a dictionary lookup:
+
+🏷️ If-None-Match matching the ETag - 304 Not Modified, no body
+📦 Accept-Encoding picks brotli, then gzip, then the plain file
+⏳ Cache-Control - assets are cached for ASSET_MAX_AGE seconds; pages are
+   revalidated on every view, which costs a 304 when nothing changed
+
+Brotli at quality 11 is slow (about half a second for the whole site), so a
+cache built with defer_brotli=True serves gzip until precompress() - run by
+the server's background warm-up - has added the brotli copies.
+
+Files edited on disk are picked up when the server restarts.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# How long browsers may reuse CSS, JavaScript and images without asking
+ASSET_MAX_AGE = int(os.environ.get("PDF_OPTIMIZER_ASSET_MAX_AGE", str(7 * 24 * 3600)))
+
+# Files load_directory() serves; anything else under an asset folder is left on disk
+WEB_ASSET_EXTENSIONS = {
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".avif",
+    ".woff", ".woff2", ".ttf", ".otf"
+}
+
+# Worth compressing: text/* plus these
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "text/javascript", "application/json", "application/xml",
+    "image/svg+xml", "image/x-icon", "image/vnd.microsoft.icon",
+    "font/ttf", "font/otf", "application/vnd.ms-fontobject"
+}
+
+
+class Asset:
+    """One file (or rendered page) with its precompressed variants"""
+
+    def __init__(self, body, mimetype, cache_control, defer_brotli=False):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.compressible = mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES
+        self.brotli_pending = False
+
+        # encoding -> (body, etag); identity is always there
+        self.variants = {"identity": (body, self.etag)}
+        if self.compressible:
+            self._add_variant("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+            self.brotli_pending = brotli is not None
+            if not defer_brotli:
+                self.add_brotli()
+
+    def add_brotli(self):
+        """The brotli variant, if it is still to be made"""
+        if self.brotli_pending:
+            self._add_variant("br", brotli.compress(self.variants["identity"][0], quality=11))
+            self.brotli_pending = False
+
+    def _add_variant(self, encoding, compressed):
+        # Tiny files can grow when compressed
+        if len(compressed) < len(self.variants["identity"][0]):
+            self.variants[encoding] = (compressed, f"{self.etag}-{encoding}")
+
+    def choose(self, accept_encodings):
+        """(encoding, body, etag) of the best variant the client accepts"""
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accept_encodings[encoding] > 0:
+                return (encoding,) + self.variants[encoding]
+        return ("identity",) + self.variants["identity"]
+
+
+class StaticAssetCache:
+    """In-memory copies of the asset folders, keyed by URL path"""
+
+    def __init__(self, root=".", defer_brotli=False):
+        self.root = root
+        self.defer_brotli = defer_brotli
+        self._assets = {}
+
+    def load_directory(self, directory, cache_control=None):
+        """Every web asset under root/directory, served as '<directory>/<relative path>'"""
+        cache_control = cache_control or f"public, max-age={ASSET_MAX_AGE}"
+        base = os.path.join(self.root, directory)
+        for folder, _, filenames in os.walk(base):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in WEB_ASSET_EXTENSIONS:
+                    continue
+                path = os.path.join(folder, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                self.load_file(name, cache_control)
+
+    def load_file(self, name, cache_control="no-cache"):
+        """One file under root, served as name"""
+        path = os.path.join(self.root, *name.split("/"))
+        if not os.path.isfile(path):
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self._assets[name] = Asset(body, mimetype, cache_control, self.defer_brotli)
+
+    def add_page(self, name, html, cache_control="no-cache"):
+        """A page rendered once in memory, e.g. a template"""
+        self._assets[name] = Asset(html.encode("utf-8"), "text/html", cache_control)
+
+    def precompress(self):
+        """Make the brotli variants that defer_brotli put off"""
+        for asset in list(self._assets.values()):
+            asset.add_brotli()
+
+    def __contains__(self, name):
+        return name in self._assets
+
+    def response(self, request, name):
+        """Flask response for name, a 304 when the client's copy is current, or None if unknown"""
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+
+        encoding, body, etag = asset.choose(request.accept_encodings)
+        headers = {
+            "ETag": f'"{etag}"',
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag:
+            return Response(status=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        mimetype = asset.mimetype
+        if mimetype.startswith("text/") or mimetype in ("application/javascript", "application/json"):
+            mimetype += "; charset=utf-8"
+        return Response(body, content_type=mimetype, headers=headers)
+
+    def snapshot(self):
+        """Sizes held in memory, for /metrics"""
+        variants = [v for asset in self._assets.values() for v in asset.variants.items()]
+        return {
+            "files": len(self._assets),
+            "bytes": sum(len(body) for encoding, (body, _) in variants if encoding == "identity"),
+            "precompressed_bytes": sum(len(body) for encoding, (body, _) in variants
+                                       if encoding != "identity"),
+            "brotli": brotli is not None,
+            "brotli_pending": sum(asset.brotli_pending for asset in self._assets.values())
+        }
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+🧱 PDF Optimizer Pro - Lossless Structural Optimizer
+Making a PDF smaller without rendering a single page
+
+Page-to-Images redraws every page as a picture. The lossless method keeps
+the pages exactly as they are - text stays selectable, vector art stays
+sharp, images keep every pixel - and only rewrites how the file is stored:
+
+🔤 Fonts - embedded fonts are cut down to the glyphs the document uses
+🗜️ Streams - Flate streams are recompressed at zlib level 9 (kept only when
+   smaller); uncompressed content, image and font streams are deflated
+♻️ Duplicates - identical fonts, images and other objects are merged into
+   one, and objects nothing refers to are dropped
+🧹 Pages - content streams are cleaned and resources no page uses removed
+🏷️ Metadata - XMP packets and page thumbnails are removed (XMP is kept for
+   PDF/A files, which need it); the title/author info stays
+📦 Object streams - small objects are packed into compressed object streams
+
+Links, form fields, JavaScript, annotations and attachments are left alone,
+and JPEG / JPEG 2000 images are never re-encoded. Most of the work is
+MuPDF's own save options; the rest runs here before the save.
+"""
+
+import zlib
+
+# /optimize "method" field: Sage's rendering engine, or this one
+OPTIMIZE_METHODS = ("page-to-images", "lossless")
+
+# save() options for the lossless method's "standard" output format
+LOSSLESS_SAVE_OPTIONS = {
+    "garbage": 4,          # Merge duplicate objects and drop unused ones
+    "clean": True,         # Sanitize content streams
+    "deflate": True,
+    "deflate_images": True,
+    "deflate_fonts": True,
+    "use_objstms": 1
+}
+
+RECOMPRESS_LEVEL = 9
+
+# Cancellation is checked every this many streams
+CANCEL_CHECK_STREAMS = 200
+
+
+def recompress_streams(doc, cancel_token=None, level=RECOMPRESS_LEVEL):
+    """
+    Recompress every plain FlateDecode stream at the given zlib level, keeping
+    the new data only when it is smaller. Streams with decode parameters
+    (PNG predictors) or filter chains are left as they are.
+    Returns: (streams_recompressed, bytes_saved)
+    """
+    recompressed = 0
+    saved = 0
+    for xref in range(1, doc.xref_length()):
+        if cancel_token and xref % CANCEL_CHECK_STREAMS == 0:
+            cancel_token.raise_if_cancelled()
+        if not doc.xref_is_stream(xref):
+            continue
+        if doc.xref_get_key(xref, "Filter") != ("name", "/FlateDecode"):
+            continue
+        if doc.xref_get_key(xref, "DecodeParms")[0] != "null":
+            continue
+
+        raw = doc.xref_stream_raw(xref)
+        try:
+            data = zlib.decompress(raw)
+        except zlib.error:
+            continue  # Damaged stream - MuPDF copes, so leave it for MuPDF
+        packed = zlib.compress(data, level)
+        if len(packed) >= len(raw):
+            continue
+
+        # compress=False stores the bytes as given and drops /Filter - put it back
+        doc.update_stream(xref, packed, compress=False)
+        doc.xref_set_key(xref, "Filter", "/FlateDecode")
+        recompressed += 1
+        saved += len(raw) - len(packed)
+    return recompressed, saved
+
+
+def is_pdfa(doc):
+    """True when the XMP packet declares PDF/A conformance"""
+    return "pdfaid:part" in (doc.get_xml_metadata() or "")
+
+
+def optimize_structure(doc, progress=None, cancel_token=None):
+    """
+    Everything the lossless method does before saving, in place.
+    Returns a report dict for the job's stats.
+    """
+    report = {}
+
+    if progress:
+        progress.stage("fonts")
+    try:
+        doc.subset_fonts()
+        report["fonts_subset"] = True
+    except Exception as e:
+        report["fonts_subset"] = False
+        report["fonts_note"] = f"font subsetting skipped: {str(e)}"
+
+    if cancel_token:
+        cancel_token.raise_if_cancelled()
+    if progress:
+        progress.stage("cleaning")
+    keep_xmp = is_pdfa(doc)
+    doc.scrub(attached_files=False, clean_pages=True, embedded_files=False, hidden_text=False,
+              javascript=False, metadata=False, redactions=False, redact_images=0,
+              remove_links=False, reset_fields=False, reset_responses=False,
+              thumbnails=True, xml_metadata=not keep_xmp)
+    report["xmp_metadata_kept"] = keep_xmp
+
+    if progress:
+        progress.stage("recompressing")
+    if doc.metadata.get("encryption"):
+        # Raw streams of an encrypted file are not plain Flate data
+        report["streams_recompressed"] = 0
+        report["stream_bytes_saved"] = 0
+    else:
+        recompressed, saved = recompress_streams(doc, cancel_token)
+        report["streams_recompressed"] = recompressed
+        report["stream_bytes_saved"] = saved
+    return report
@@ -10,143 +10,99 @@ Users upload via web → Server runs Sage's Python → Returns compressed PDF
 import os
 import sys
 import tempfile
-import shutil
-from flask import Flask, request, jsonify, send_file, render_template_string, send_from_directory
+from flask import Flask, request, jsonify, send_file, render_template_string, Response
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import subprocess
+import threading
+import contextlib
 import uuid
 from pathlib import Path
+from admission_control import AdmissionController, estimate_job_cost
+from job_scheduler import PageScheduler, client_key, lane_for
+from job_events import JobEventBus, ProgressReporter
+from job_cancellation import CancellationRegistry
+from spool_queue import SpoolQueue, MAX_BACKLOG, SPOOL_RETRY_AFTER
+from static_assets import StaticAssetCache
+from inline_results import INLINE_MAX_BYTES, inline_requested, inline_headers, remove_quietly
+from engine_warmup import EngineWarmUp, WARM_UP, import_modules
+from job_profiler import (JobProfiler, PROFILE_DIR, PROFILE_TOKEN_HEADER, profile_requested,
+                          check_profile_token, spool_profile_dir, profile_paths, load_profile,
+                          with_profile_url)
+from sage_compression import (UPLOAD_FOLDER, COMPRESSED_FOLDER, RENDER_RESOLUTION, RENDER_WORKING_SET_FACTOR,
+                              make_folders, allowed_file, cleanup_old_files, run_sage_compression,
+                              build_compression_result)
 
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = 'temp_uploads'
-COMPRESSED_FOLDER = 'temp_compressed' 
-ALLOWED_EXTENSIONS = {'pdf'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB max
 
 # Ensure temp directories exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(COMPRESSED_FOLDER, exist_ok=True)
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def cleanup_old_files():
-    """Clean up files older than 1 hour"""
-    import time
-    current_time = time.time()
-    for folder in [UPLOAD_FOLDER, COMPRESSED_FOLDER]:
-        for filename in os.listdir(folder):
-            file_path = os.path.join(folder, filename)
-            if os.path.isfile(file_path):
-                if current_time - os.path.getctime(file_path) > 3600:  # 1 hour
-                    try:
-                        os.remove(file_path)
-                        print(f"Cleaned up old file: {filename}")
-                    except:
-                        pass
-
-def run_sage_compression(input_file, output_file, quality='balanced'):
-    """Run Sage's compression algorithm via the Python script"""
-    
-    # Path to Sage's compression script
-    sage_script = os.path.join('Complete_Technology_Package', 'pdf_optimizer_final_with_banner.py')
-    
-    if not os.path.exists(sage_script):
-        raise Exception("Sage's compression script not found")
-    
-    # Quality mapping to Sage's settings
-    quality_args = {
-        'maximum': '--quality=90 --image-quality=85',
-        'balanced': '--quality=85 --image-quality=75', 
-        'aggressive': '--quality=75 --image-quality=65'
-    }
-    
-    try:
-        # Run Sage's script in headless mode (we'll need to modify it for CLI)
-        # For now, let's use a direct PyMuPDF approach based on Sage's algorithm
-        
-        import fitz  # PyMuPDF
-        
-        # Open the PDF
-        doc = fitz.open(input_file)
-        
-        # Apply Sage's page-to-images compression
-        quality_settings = {
-            'maximum': (90, 85),
-            'balanced': (85, 75),
-            'aggressive': (75, 65)
-        }
-        
-        pdf_quality, image_quality = quality_settings.get(quality, (85, 75))
-        
-        # Process each page using Sage's exact method
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Convert page to image (Sage's method)
-            mat = fitz.Matrix(1.0, 1.0)  # Standard resolution
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to PIL for compression
-            from PIL import Image
-            import io
-            
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
-            
-            # Apply JPEG compression (Sage's approach)
-            img_buffer = io.BytesIO()
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            img.save(img_buffer, format='JPEG', quality=image_quality, optimize=True)
-            img_buffer.seek(0)
-            
-            # Replace page with compressed image
-            compressed_img = fitz.open(stream=img_buffer.getvalue(), filetype="jpeg")
-            img_page = compressed_img[0]
-            
-            # Get page dimensions
-            rect = page.rect
-            
-            # Clear page and insert compressed image
-            page.clean_contents()
-            page.insert_image(rect, stream=img_buffer.getvalue())
-        
-        # Save the compressed PDF
-        doc.save(output_file, garbage=4, deflate=True)
-        doc.close()
-        
-        return True
-        
-    except Exception as e:
-        print(f"Compression error: {str(e)}")
-        return False
+make_folders()
+
+# Memory-aware admission control - overload becomes latency, not a crash
+admission = AdmissionController.from_environment()
+
+# Fair page-by-page sharing of the workers, with a fast lane for small documents
+page_scheduler = PageScheduler()
+
+# Worker mode: with PDF_OPTIMIZER_SPOOL_DIR set, jobs go into the shared spool
+# queue and pdf_worker.py processes (on any host) compress them
+SPOOL_DIR = os.environ.get('PDF_OPTIMIZER_SPOOL_DIR')
+SPOOL_RESULT_TIMEOUT = 600
+spool = SpoolQueue(SPOOL_DIR) if SPOOL_DIR else None
+
+# Live job progress for GET /jobs/<id>/events
+job_events = spool if spool else JobEventBus()
+
+# DELETE /jobs/<id> and abandoned event streams stop jobs between pages
+job_cancellations = CancellationRegistry(spool)
+
+# CSS, JavaScript and images are read (and gzipped) once, at startup
+static_assets = StaticAssetCache(app.root_path, defer_brotli=WARM_UP)
+for asset_dir in ('CSS', 'Images', 'JavaScript'):
+    static_assets.load_directory(asset_dir)
+static_assets.load_file('PDF_Optimizer.html')
+
+# PyMuPDF and friends, and the slow brotli copies, load while the socket comes up
+warm_up = EngineWarmUp([('engine', import_modules),
+                        ('static_assets', static_assets.precompress)]).start()
+
+# Static file serving - from the in-memory asset cache
+def serve_asset(name):
+    response = static_assets.response(request, name)
+    if response is None:
+        return jsonify({'error': 'Not found'}), 404
+    return response
 
-# Static file serving
 @app.route('/CSS/<path:filename>')
 def serve_css(filename):
-    return send_from_directory('CSS', filename)
+    return serve_asset(f'CSS/{filename}')
 
 @app.route('/Images/<path:filename>')  
 def serve_images(filename):
-    return send_from_directory('Images', filename)
+    return serve_asset(f'Images/{filename}')
 
 @app.route('/JavaScript/<path:filename>')
 def serve_js(filename):
-    return send_from_directory('JavaScript', filename)
+    return serve_asset(f'JavaScript/{filename}')
 
 @app.route('/PDF_Optimizer.html')
 def serve_main_app():
-    return send_from_directory('.', 'PDF_Optimizer.html')
+    return serve_asset('PDF_Optimizer.html')
 
 @app.route('/')
 def index():
     """Serve the web interface"""
+    if 'index' not in static_assets:
+        # Rendered on the first visit only; later ones are a cache hit (or a 304)
+        static_assets.add_page('index', render_index())
+    return serve_asset('index')
+
+def render_index():
+    """The web interface page"""
     return render_template_string('''
 <!DOCTYPE html>
 <html>
@@ -186,7 +142,7 @@ def index():
     </button>
     
     <div class="progress" id="progress">
-        <p>🔧 Running Sage's compression algorithm...</p>
+        <p id="progressText">🔧 Running Sage's compression algorithm...</p>
         <div style="background: #ddd; height: 20px; border-radius: 10px;">
             <div style="background: #d4af37; height: 100%; width: 0%; border-radius: 10px; transition: width 0.3s;" id="progressBar"></div>
         </div>
@@ -196,6 +152,15 @@ def index():
     
     <script>
         let selectedFile = null;
+        let currentJobId = null;  // Cancelled on re-submit or when the tab closes
+        let jobSequence = 0;
+        
+        function cancelCurrentJob() {
+            if (!currentJobId) return;
+            fetch(`/jobs/${currentJobId}`, { method: 'DELETE', keepalive: true }).catch(() => {});
+            currentJobId = null;
+        }
+        window.addEventListener('pagehide', cancelCurrentJob);
         
         document.getElementById('pdfFile').addEventListener('change', function(e) {
             selectedFile = e.target.files[0];
@@ -208,32 +173,29 @@ def index():
         async function compressPDF() {
             if (!selectedFile) return;
             
+            cancelCurrentJob();
+            const sequence = ++jobSequence;
+            
             const formData = new FormData();
             formData.append('pdf', selectedFile);
             formData.append('quality', document.getElementById('quality').value);
             
             document.getElementById('progress').style.display = 'block';
             document.getElementById('result').style.display = 'none';
-            
-            // Simulate progress
-            let progress = 0;
-            const progressInterval = setInterval(() => {
-                progress += Math.random() * 15 + 5;
-                if (progress > 95) progress = 95;
-                document.getElementById('progressBar').style.width = progress + '%';
-            }, 500);
+            document.getElementById('progressBar').style.width = '0%';
             
             try {
-                const response = await fetch('/compress', {
+                const response = await fetch('/compress?async=1', {
                     method: 'POST',
                     body: formData
                 });
                 
-                clearInterval(progressInterval);
-                document.getElementById('progressBar').style.width = '100%';
-                
                 if (response.ok) {
-                    const result = await response.json();
+                    const job = await response.json();
+                    currentJobId = job.job_id;
+                    const result = await followJob(job.events_url);
+                    currentJobId = null;
+                    document.getElementById('progressBar').style.width = '100%';
                     document.getElementById('result').innerHTML = `
                         <h3>✅ Compression Complete!</h3>
                         <p><strong>Original Size:</strong> ${result.original_size}</p>
@@ -248,7 +210,7 @@ def index():
                     throw new Error(error.error);
                 }
             } catch (error) {
-                clearInterval(progressInterval);
+                if (sequence !== jobSequence) return;  // Replaced by a newer job
                 document.getElementById('result').innerHTML = `
                     <h3>❌ Compression Failed</h3>
                     <p>${error.message}</p>
@@ -258,6 +220,35 @@ def index():
             
             document.getElementById('progress').style.display = 'none';
         }
+        
+        // Real progress from the server's page loop via Server-Sent Events
+        function followJob(eventsUrl) {
+            return new Promise((resolve, reject) => {
+                const source = new EventSource(eventsUrl);
+                
+                source.addEventListener('progress', (e) => {
+                    const data = JSON.parse(e.data);
+                    const percent = data.total_pages ? (data.pages_done / data.total_pages) * 95 : 0;
+                    const eta = data.eta_seconds !== null ? ` - about ${Math.ceil(data.eta_seconds)}s left` : '';
+                    document.getElementById('progressBar').style.width = percent + '%';
+                    document.getElementById('progressText').textContent =
+                        `🔧 ${data.stage}: page ${data.pages_done}/${data.total_pages}` +
+                        ` (${(data.bytes_written / 1024 / 1024).toFixed(2)} MB written)${eta}`;
+                });
+                source.addEventListener('complete', (e) => {
+                    source.close();
+                    resolve(JSON.parse(e.data));
+                });
+                source.addEventListener('cancelled', (e) => {
+                    source.close();
+                    reject(new Error(`Job cancelled (${JSON.parse(e.data).reason})`));
+                });
+                source.addEventListener('error', (e) => {
+                    source.close();
+                    reject(new Error(e.data ? JSON.parse(e.data).error : 'Lost connection to server'));
+                });
+            });
+        }
     </script>
 </body>
 </html>
@@ -273,6 +264,7 @@ def compress_pdf():
     
     file = request.files['pdf']
     quality = request.form.get('quality', 'balanced')
+    output_format = request.form.get('output_format', 'standard')
     
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
@@ -280,7 +272,31 @@ def compress_pdf():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type. Please upload a PDF.'}), 400
     
+    # Engine modules load on first use (or in the background warm-up)
+    from pdf_output import OUTPUT_FORMATS
+    from scan_cleanup import parse_scan_cleanup
+    
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({'error': f"Unknown output format - choose from: {', '.join(OUTPUT_FORMATS)}"}), 400
+    
+    scan_cleanup, cleanup_error = parse_scan_cleanup(request.form.get('scan_cleanup', ''))
+    if cleanup_error:
+        return jsonify({'error': cleanup_error}), 400
+    
+    profile = wants_profile()
+    if profile:
+        # Profiling is for admins only
+        profile_error = check_profile_token(request.headers.get(PROFILE_TOKEN_HEADER))
+        if profile_error:
+            return jsonify({'error': profile_error}), 403
+    
+    inline = wants_inline()
+    
     try:
+        # Small inline jobs are compressed right here - no spool write, no second hop
+        if spool and not (inline and (request.content_length or 0) <= INLINE_MAX_BYTES):
+            return enqueue_spool_job(file, quality, output_format, inline, profile, scan_cleanup)
+        
         # Generate unique ID for this compression job
         job_id = str(uuid.uuid4())
         
@@ -289,37 +305,237 @@ def compress_pdf():
         input_path = os.path.join(UPLOAD_FOLDER, f"{job_id}_{filename}")
         file.save(input_path)
         
-        # Get original file size
-        original_size = os.path.getsize(input_path)
+        # Price the job and wait for room in the memory budget
+        try:
+            cost = estimate_job_cost(input_path, RENDER_RESOLUTION, RENDER_WORKING_SET_FACTOR)
+        except Exception as e:
+            os.remove(input_path)
+            return jsonify({'error': f'Could not read PDF: {str(e)}'}), 400
+        
+        ticket = admission.try_admit(cost, lane=lane_for(cost.pages))
+        if ticket is None:
+            os.remove(input_path)
+            retry_after = admission.retry_after_seconds()
+            return jsonify({
+                'error': 'Server is busy compressing other PDFs - please retry shortly',
+                'retry_after': retry_after
+            }), 429, {'Retry-After': str(retry_after)}
+        
+        page_gate = page_scheduler.job(client_key(request), cost.pages)
+        profiler = JobProfiler(job_id) if profile else None
         
         # Compress using Sage's algorithm
         output_filename = f"compressed_{job_id}_{filename}"
         output_path = os.path.join(COMPRESSED_FOLDER, output_filename)
         
-        success = run_sage_compression(input_path, output_path, quality)
-        
-        if not success:
-            return jsonify({'error': 'Compression failed'}), 500
+        if wants_async() and not inline:
+            # Answer now; progress and the result arrive on /jobs/<id>/events
+            job_events.create(job_id, total_pages=cost.pages)
+            progress = ProgressReporter(job_events, job_id)
+            cancel_token = job_cancellations.register(job_id)
+            worker = threading.Thread(target=run_compression_job,
+                                      args=(job_id, input_path, output_path, quality, ticket, progress,
+                                            output_format, cancel_token, page_gate, profiler, scan_cleanup),
+                                      daemon=True)
+            worker.start()
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'events_url': f'/jobs/{job_id}/events',
+                'status_url': f'/jobs/{job_id}'
+            }), 202
         
-        # Get compressed file size
-        compressed_size = os.path.getsize(output_path)
-        savings = round(((original_size - compressed_size) / original_size) * 100, 1)
-        
-        return jsonify({
-            'success': True,
-            'download_id': job_id,
-            'original_size': f"{original_size / 1024 / 1024:.2f} MB",
-            'compressed_size': f"{compressed_size / 1024 / 1024:.2f} MB", 
-            'savings': savings,
-            'algorithm': "Sage's Page-to-Images Algorithm"
-        })
+        status, result = run_compression_job(job_id, input_path, output_path, quality, ticket,
+                                             output_format=output_format, page_gate=page_gate,
+                                             profiler=profiler, scan_cleanup=scan_cleanup)
+        if inline and status == 200:
+            return inline_pdf_response(result, os.path.getsize(input_path), output_path,
+                                       f"optimized_{filename}", remove=(input_path, output_path))
+        return jsonify(result), status
         
     except Exception as e:
         return jsonify({'error': f'Compression error: {str(e)}'}), 500
 
+def wants_async():
+    """Clients opt into 202 + progress events with ?async=1"""
+    return request.args.get('async', request.form.get('async', '')) in ('1', 'true')
+
+def wants_profile():
+    """Admins ask for a profiled job with ?profile=1 (and the X-Profile-Token header)"""
+    return profile_requested(request.args.get('profile', request.form.get('profile', '')))
+
+def wants_inline():
+    """Clients get the PDF itself as the response with ?inline=1 or Accept: application/pdf"""
+    return inline_requested(request.args.get('inline', request.form.get('inline', '')),
+                            request.headers.get('Accept', ''))
+
+def inline_pdf_response(result, original_size, output_path, download_name, remove=()):
+    """The finished PDF as the response body, with the JSON result in headers"""
+    response = send_file(output_path, mimetype='application/pdf', as_attachment=True,
+                         download_name=download_name)
+    response.headers.update(inline_headers(result, original_size, output_path))
+    if remove:
+        # Sent once and gone - nothing waits on disk for a /download. Close callbacks
+        # only run when Werkzeug iterates the body itself, not on direct passthrough
+        response.direct_passthrough = False
+        response.call_on_close(lambda: remove_quietly(*remove))
+    return response
+
+def enqueue_spool_job(file, quality, output_format, inline=False, profile=False, scan_cleanup=()):
+    """Worker mode: write the upload into the spool and queue it for pdf_worker.py"""
+    if spool.backlog() >= MAX_BACKLOG:
+        return jsonify({
+            'error': 'Server is busy compressing other PDFs - please retry shortly',
+            'retry_after': SPOOL_RETRY_AFTER
+        }), 429, {'Retry-After': str(SPOOL_RETRY_AFTER)}
+    
+    job_id = str(uuid.uuid4())
+    input_path = spool.input_path(job_id)
+    file.save(input_path)
+    original_size = os.path.getsize(input_path)
+    
+    try:
+        cost = estimate_job_cost(input_path, RENDER_RESOLUTION, RENDER_WORKING_SET_FACTOR)
+    except Exception as e:
+        os.remove(input_path)
+        return jsonify({'error': f'Could not read PDF: {str(e)}'}), 400
+    
+    spool.enqueue(job_id, 'compress', quality, secure_filename(file.filename),
+                  options={'output_format': output_format, 'profile': profile,
+                           'scan_cleanup': list(scan_cleanup)},
+                  client=client_key(request), total_pages=cost.pages)
+    
+    accepted = jsonify({
+        'success': True,
+        'job_id': job_id,
+        'events_url': f'/jobs/{job_id}/events',
+        'status_url': f'/jobs/{job_id}'
+    }), 202
+    if wants_async() and not inline:
+        return accepted
+    
+    # Synchronous clients wait for a worker to finish, as they always have
+    state = spool.wait_for_result(job_id, SPOOL_RESULT_TIMEOUT)
+    if state is None:
+        return accepted
+    event, data = state
+    if event == 'error':
+        return jsonify({'error': data['error']}), 500
+    if event == 'cancelled':
+        return jsonify({'error': f"Job cancelled: {data['reason']}", 'cancelled': True}), 409
+    if inline:
+        # The spool keeps its copy until expiry, as for any finished job
+        return inline_pdf_response(data, original_size, spool.output_path(job_id),
+                                   f"optimized_{secure_filename(file.filename)}")
+    return jsonify(data)
+
+def run_compression_job(job_id, input_path, output_path, quality, ticket, progress=None,
+                        output_format='standard', cancel_token=None, page_gate=None, profiler=None,
+                        scan_cleanup=()):
+    """Run one admitted job; returns (http_status, response_data)"""
+    original_size = os.path.getsize(input_path)
+    
+    # A profiled job's engine reports progress through the profiler
+    engine_progress = profiler.wrap(progress) if profiler else progress
+    stats = {}
+    try:
+        with ticket, (page_gate or contextlib.nullcontext()), (profiler or contextlib.nullcontext()):
+            success = run_sage_compression(input_path, output_path, quality, progress=engine_progress,
+                                           output_format=output_format, cancel_token=cancel_token,
+                                           page_gate=page_gate, stats=stats, scan_cleanup=scan_cleanup)
+    finally:
+        job_cancellations.discard(job_id)
+    
+    cancelled = not success and cancel_token and cancel_token.cancelled
+    if profiler:
+        profiler.save('complete' if success else 'cancelled' if cancelled else 'failed', stats)
+    
+    if cancelled:
+        # Nobody will download it - drop the upload now rather than in an hour
+        for path in (input_path, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+        if progress:
+            progress.cancelled(cancel_token.reason)
+        return 409, with_profile_url({'error': f'Job cancelled: {cancel_token.reason}', 'cancelled': True},
+                                     job_id, profiler)
+    
+    if not success:
+        if progress:
+            progress.fail('Compression failed')
+        return 500, with_profile_url({'error': 'Compression failed'}, job_id, profiler)
+    
+    if page_gate:
+        stats.update(page_gate.report())
+    result = with_profile_url(build_compression_result(job_id, original_size, output_path, stats),
+                              job_id, profiler)
+    if progress:
+        progress.complete(result)
+    return 200, result
+
+@app.route('/jobs/<job_id>/events')
+def job_progress_events(job_id):
+    """Server-Sent Events stream of real progress for an async job"""
+    if job_events.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    # When the last subscriber goes away for good, nobody wants the result
+    frames = job_cancellations.watch_stream(job_id, job_events.stream(job_id))
+    return Response(frames, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Latest progress or result for a job"""
+    state = job_events.get(job_id)
+    if state is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    event, data = state
+    return jsonify(dict(data, event=event))
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job - it stops before its next page"""
+    if job_cancellations.cancel(job_id, 'cancelled by client'):
+        return jsonify({'success': True, 'job_id': job_id, 'cancelling': True}), 202
+    
+    state = job_events.get(job_id)
+    if state is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify({'error': 'Job has already finished', 'event': state[0]}), 409
+
+@app.route('/jobs/<job_id>/profile')
+def job_profile(job_id):
+    """A profiled job's report, or its cProfile data with ?format=pstats (admin token required)"""
+    error = check_profile_token(request.headers.get(PROFILE_TOKEN_HEADER))
+    if error:
+        return jsonify({'error': error}), 403
+    
+    directory = spool_profile_dir(spool) if spool else PROFILE_DIR
+    report = load_profile(directory, job_id)
+    if report is None:
+        return jsonify({'error': 'No profile for this job'}), 404
+    if request.args.get('format') == 'pstats':
+        pstats_path = profile_paths(directory, job_id)[1]
+        if not os.path.exists(pstats_path):
+            return jsonify({'error': "This job's profile has no cProfile data", 'note': report.get('note')}), 404
+        return send_file(pstats_path, as_attachment=True, download_name=f'profile_{job_id}.prof',
+                         mimetype='application/octet-stream')
+    return jsonify(report)
+
 @app.route('/download/<job_id>')
 def download_file(job_id):
     """Download compressed PDF"""
+    if spool:
+        job = spool.job(job_id)
+        if job and job['status'] == 'done':
+            return send_file(spool.output_path(job_id), as_attachment=True,
+                             download_name=f"optimized_{job['filename']}")
+        return jsonify({'error': 'File not found'}), 404
+    
     # Find the compressed file for this job
     for filename in os.listdir(COMPRESSED_FOLDER):
         if filename.startswith(f"compressed_{job_id}_"):
@@ -334,7 +550,22 @@ def download_file(job_id):
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'algorithm': 'Sage Page-to-Images Ready'})
+    return jsonify({
+        'status': 'healthy',
+        'algorithm': 'Sage Page-to-Images Ready',
+        'load': admission.snapshot(),
+        'warm_up': warm_up.report()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Scheduler metrics: per-lane queue waits for admission and page permits"""
+    return jsonify({
+        'admission': admission.snapshot(),
+        'scheduler': page_scheduler.snapshot(),
+        'spool': spool.lane_snapshot() if spool else None,
+        'static_assets': static_assets.snapshot()
+    })
 
 if __name__ == '__main__':
     print("🌐 PDF Optimizer Pro Web Server")